@@ -0,0 +1,14 @@
+import pytest
+
+
+@pytest.fixture
+def strict_query_budgets(settings):
+    """Превышение бюджета из @query_budget роняет запрос исключением."""
+    settings.QUERY_BUDGET_ACTION = 'raise'
+
+
+@pytest.fixture
+def query_budget():
+    """Контекстный менеджер: with query_budget(5, duplicates=0): ..."""
+    from core.queries import assert_query_budget
+    return assert_query_budget
@@ -0,0 +1,10 @@
+import pytest
+
+
+@pytest.fixture(autouse=True, scope='session')
+def view_buffer():
+    from django.conf import settings
+    from posts.hits import buffer
+    settings.VIEW_FLUSH_BACKGROUND = False
+    yield
+    buffer.take()
@@ -0,0 +1,25 @@
+import pytest
+from posts.models import Post
+
+
+class TestQueryBudget:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_index_fits_budget(self, client, user, group,
+                               strict_query_budgets):
+        Post.objects.bulk_create(
+            Post(text=f'Тестовый пост {number}', author=user, group=group)
+            for number in range(12)
+        )
+        response = client.get('/')
+        assert response.status_code == 200
+        assert response['X-Query-Duplicates'] == '0', (
+            'Главная страница делает одинаковые запросы для каждого поста'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_post_detail_query_count(self, client, post_with_group,
+                                     query_budget):
+        with query_budget(6):
+            response = client.get(f'/posts/{post_with_group.id}/')
+        assert response.status_code == 200
@@ -0,0 +1,120 @@
+"""Сериализация постов и комментариев для API.
+
+Каждое поле ответа знает, какие столбцы ему нужны: по ?fields= строится
+.only() выборки, а авторы и группы всей страницы подгружаются одним
+запросом на модель. Если установлен orjson, JSON собирает он.
+"""
+import json
+
+from posts.hits import view_count
+from posts.models import Group, User
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+POST_FIELDS = {
+    'id': ('id',),
+    'text': ('text',),
+    'pub_date': ('pub_date',),
+    'updated': ('updated',),
+    'comments_count': ('comments_count',),
+    'views': ('views_count',),
+    'image': ('image',),
+    'author': ('author_id',),
+    'group': ('group_id',),
+}
+COMMENT_FIELDS = {
+    'id': ('id',),
+    'text': ('text',),
+    'created': ('created',),
+    'author': ('author_id',),
+    'parent': ('parent_id',),
+    'depth': ('depth',),
+    'replies_count': ('replies_count',),
+}
+AUTHOR_COLUMNS = ('id', 'username', 'first_name', 'last_name')
+GROUP_COLUMNS = ('id', 'slug', 'title')
+
+
+class FieldsError(ValueError):
+    pass
+
+
+def requested_fields(request, available):
+    """Поля из ?fields=a,b в порядке запроса; без параметра — все."""
+    value = request.GET.get('fields')
+    if not value:
+        return list(available)
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in available]
+    if unknown:
+        raise FieldsError(f'Неизвестные поля: {", ".join(unknown)}')
+    return list(dict.fromkeys(fields))
+
+
+def columns(fields, available, keys):
+    """Столбцы для .only(): нужные полям ответа и ключам курсора."""
+    result = dict.fromkeys(keys)
+    for name in fields:
+        result.update(dict.fromkeys(available[name]))
+    return list(result)
+
+
+def author_data(user):
+    return {'id': user.pk, 'username': user.username,
+            'name': user.get_full_name()}
+
+
+def group_data(group):
+    return {'id': group.pk, 'slug': group.slug, 'title': group.title}
+
+
+def related(objects, fields):
+    """Авторы и группы объектов по id, если они есть среди полей."""
+    authors, groups = {}, {}
+    if 'author' in fields:
+        users = User.objects.filter(
+            pk__in={obj.author_id for obj in objects}).only(*AUTHOR_COLUMNS)
+        authors = {user.pk: author_data(user) for user in users}
+    if 'group' in fields:
+        group_ids = {obj.group_id for obj in objects if obj.group_id}
+        if group_ids:
+            found = Group.objects.filter(pk__in=group_ids).only(
+                *GROUP_COLUMNS)
+            groups = {group.pk: group_data(group) for group in found}
+    return authors, groups
+
+
+def value(obj, name, authors, groups):
+    if name == 'author':
+        return authors.get(obj.author_id)
+    if name == 'group':
+        return groups.get(obj.group_id)
+    if name == 'image':
+        return obj.image.url if obj.image else None
+    if name == 'views':
+        return view_count(obj)
+    if name == 'parent':
+        return obj.parent_id
+    return getattr(obj, name)
+
+
+def serialize(objects, fields):
+    objects = list(objects)
+    authors, groups = related(objects, fields)
+    return [{name: value(obj, name, authors, groups) for name in fields}
+            for obj in objects]
+
+
+def isoformat(moment):
+    if hasattr(moment, 'isoformat'):
+        return moment.isoformat()
+    raise TypeError(f'{type(moment).__name__} не сериализуется в JSON')
+
+
+def dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, default=isoformat, ensure_ascii=False).encode()
@@ -0,0 +1,135 @@
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class PostsApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='Ivan', first_name='Иван', last_name='Петров')
+        cls.reader = User.objects.create_user(username='Petr')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        cls.posts = [Post.objects.create(text=f'Пост {number}',
+                                         author=cls.author, group=cls.group)
+                     for number in range(5)]
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def get(self, name, *args, **params):
+        return self.client.get(reverse(f'api:{name}', args=args), params)
+
+    def test_feed_is_paginated_by_cursor(self):
+        first = self.get('posts', limit=3).json()
+        self.assertEqual([post['text'] for post in first['results']],
+                         ['Пост 4', 'Пост 3', 'Пост 2'])
+        self.assertIsNone(first['previous'])
+        second = self.client.get(first['next']).json()
+        self.assertEqual([post['text'] for post in second['results']],
+                         ['Пост 1', 'Пост 0'])
+        self.assertIsNone(second['next'])
+
+    def test_oversized_cursor_gives_first_page(self):
+        data = self.get('posts', limit=3,
+                        after='1000-99999999999999999999999').json()
+        self.assertEqual([post['text'] for post in data['results']],
+                         ['Пост 4', 'Пост 3', 'Пост 2'])
+
+    def test_sparse_fields_limit_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            data = self.get('posts', fields='id,author').json()
+        self.assertEqual(set(data['results'][0]), {'id', 'author'})
+        self.assertEqual(data['results'][0]['author'],
+                         {'id': self.author.pk, 'username': 'Ivan',
+                          'name': 'Иван Петров'})
+        posts_sql = next(query['sql'] for query in queries.captured_queries
+                         if 'FROM "posts_post"' in query['sql'])
+        self.assertNotIn('"posts_post"."text"', posts_sql)
+
+    def test_unknown_field_is_rejected(self):
+        response = self.get('posts', fields='id,password')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['detail'])
+
+    def test_authors_and_groups_are_loaded_in_bulk(self):
+        Post.objects.create(text='Другой автор', author=self.reader)
+        with CaptureQueriesContext(connection) as queries:
+            self.get('posts')
+        many = len(queries)
+        Post.objects.create(text='Ещё один', author=self.reader)
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.get('posts')
+        self.assertEqual(len(queries), many)
+
+    def test_group_and_author_feeds(self):
+        self.assertEqual(len(self.get('group_posts', 'group').json()[
+            'results']), 5)
+        self.assertEqual(len(self.get('author_posts', 'Petr').json()[
+            'results']), 0)
+        self.assertEqual(self.get('group_posts', 'none').status_code, 404)
+
+    def test_feed_is_cacheable_and_revalidated(self):
+        response = self.get('posts')
+        self.assertIn('max-age=60', response['Cache-Control'])
+        again = self.client.get(reverse('api:posts'),
+                                HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+        Post.objects.create(text='Новый', author=self.author)
+        again = self.client.get(reverse('api:posts'),
+                                HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 200)
+
+    def test_feed_etag_expires_with_counters(self):
+        response = self.get('posts')
+        Comment.objects.create(post=self.posts[0], author=self.reader,
+                               text='Комментарий')
+        later = time.time() + 60
+        with mock.patch('posts.caching.time.time', return_value=later):
+            again = self.client.get(reverse('api:posts'),
+                                    HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 200)
+
+    def test_follow_feed_requires_login(self):
+        self.assertEqual(self.get('follow').status_code, 401)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.client.force_login(self.reader)
+        response = self.get('follow', fields='id')
+        self.assertEqual(len(response.json()['results']), 5)
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_post_detail_and_comments(self):
+        post = self.posts[0]
+        first = Comment.objects.create(post=post, author=self.reader,
+                                       text='Первый')
+        Comment.objects.create(post=post, author=self.author, text='Второй',
+                               parent=first)
+        data = self.get('post_detail', post.pk, fields='text,group').json()
+        self.assertEqual(data, {'text': 'Пост 0', 'group': {
+            'id': self.group.pk, 'slug': 'group', 'title': 'Группа'}})
+        comments = self.get('comments', post.pk).json()['results']
+        self.assertEqual([comment['text'] for comment in comments],
+                         ['Первый', 'Второй'])
+        self.assertEqual([(comment['parent'], comment['replies_count'])
+                          for comment in comments],
+                         [(None, 1), (first.pk, 0)])
+        self.assertEqual(self.get('post_detail', 0).status_code, 404)
+        self.assertEqual(self.get('comments', 0).status_code, 404)
+
+    def test_post_is_not_writable(self):
+        response = self.client.post(reverse('api:posts'))
+        self.assertEqual(response.status_code, 405)
@@ -0,0 +1,165 @@
+from functools import wraps
+
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import condition, require_safe
+
+from core.queries import query_budget
+from posts.caching import (follow_tags, group_tags, index_tags, page_etag,
+                           post_etag, post_last_modified, post_state,
+                           tag_versions)
+from posts.feed import follow_feed_paginator
+from posts.models import Comment, Group, Post, User
+from posts.utils import CursorPaginator
+
+from .serializers import (COMMENT_FIELDS, POST_FIELDS, FieldsError, columns,
+                          dumps, requested_fields, serialize)
+
+API_PER_PAGE: int = 20
+API_MAX_PER_PAGE: int = 100
+API_MAX_AGE: int = 60
+POST_KEYS = ('pub_date', 'id')
+COMMENT_KEYS = ('created', 'id')
+
+
+def json_response(data, status=200):
+    return HttpResponse(dumps(data), status=status,
+                        content_type='application/json')
+
+
+def error(message, status):
+    return json_response({'detail': message}, status)
+
+
+def api_view(view):
+    """Только GET/HEAD; ошибка в ?fields= превращается в ответ 400."""
+    @require_safe
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except FieldsError as exc:
+            return error(str(exc), 400)
+    return wrapper
+
+
+def tagged(tags, private=False):
+    """ETag ленты из версий тегов кэша страниц и Cache-Control.
+
+    Пока ни один тег не сброшен, посты ленты не меняются, поэтому на
+    If-None-Match сразу уходит 304 без выборки постов. Числа комментариев
+    и просмотров теги не сбрасывают: ETag меняется и раз в API_MAX_AGE
+    секунд.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            names = tags(request, *args, **kwargs)
+            state = [request.get_full_path()] + tag_versions(names)
+            etag = page_etag('\n'.join(state), API_MAX_AGE)
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                response['ETag'] = etag
+                visibility = 'private' if private else 'public'
+                patch_cache_control(response, max_age=API_MAX_AGE,
+                                    **{visibility: True})
+            return response
+        return wrapper
+    return decorator
+
+
+def per_page(request):
+    try:
+        limit = int(request.GET.get('limit', API_PER_PAGE))
+    except ValueError:
+        return API_PER_PAGE
+    return min(max(limit, 1), API_MAX_PER_PAGE)
+
+
+def page_response(request, paginator, fields):
+    page = paginator.get_page(request)
+    return json_response({
+        'results': serialize(page.object_list, fields),
+        'next': (request.path + paginator.next_link
+                 if page.has_next() else None),
+        'previous': (request.path + paginator.previous_link
+                     if page.has_previous() else None),
+    })
+
+
+def post_list(request, queryset):
+    fields = requested_fields(request, POST_FIELDS)
+    posts = queryset.only(*columns(fields, POST_FIELDS, POST_KEYS))
+    return page_response(request, CursorPaginator(posts, per_page(request)),
+                         fields)
+
+
+def author_tags(request, username):
+    return [f'author:{username}']
+
+
+@query_budget(4)
+@api_view
+@tagged(index_tags)
+def posts(request):
+    return post_list(request, Post.objects.all())
+
+
+@query_budget(5)
+@api_view
+@tagged(group_tags)
+def group_posts(request, slug):
+    group = Group.objects.filter(slug=slug).only('pk').first()
+    if group is None:
+        return error('Группа не найдена', 404)
+    return post_list(request, Post.objects.filter(group=group))
+
+
+@query_budget(5)
+@api_view
+@tagged(author_tags)
+def author_posts(request, username):
+    author = User.objects.filter(username=username).only('pk').first()
+    if author is None:
+        return error('Автор не найден', 404)
+    return post_list(request, Post.objects.filter(author=author))
+
+
+@query_budget(8)
+@api_view
+@tagged(follow_tags, private=True)
+def follow(request):
+    if not request.user.is_authenticated:
+        return error('Нужна авторизация', 401)
+    fields = requested_fields(request, POST_FIELDS)
+    posts = Post.objects.only(*columns(fields, POST_FIELDS, POST_KEYS))
+    paginator = follow_feed_paginator(request.user, per_page(request), posts)
+    return page_response(request, paginator, fields)
+
+
+@query_budget(5)
+@api_view
+@condition(etag_func=post_etag, last_modified_func=post_last_modified)
+def post_detail(request, post_id):
+    fields = requested_fields(request, POST_FIELDS)
+    post = Post.objects.filter(pk=post_id).only(
+        *columns(fields, POST_FIELDS, ('id',))).first()
+    if post is None:
+        return error('Пост не найден', 404)
+    return json_response(serialize([post], fields)[0])
+
+
+@query_budget(5)
+@api_view
+@condition(etag_func=post_etag, last_modified_func=post_last_modified)
+def comments(request, post_id):
+    if post_state(request, post_id) is None:
+        return error('Пост не найден', 404)
+    fields = requested_fields(request, COMMENT_FIELDS)
+    queryset = Comment.objects.filter(post_id=post_id).order_by(
+        *COMMENT_KEYS).only(*columns(fields, COMMENT_FIELDS, COMMENT_KEYS))
+    paginator = CursorPaginator(queryset, per_page(request),
+                                keys=COMMENT_KEYS, newest_first=False)
+    return page_response(request, paginator, fields)
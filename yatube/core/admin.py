@@ -0,0 +1,15 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'task', 'status', 'priority', 'run_at',
+                    'attempts', 'worker', 'finished')
+    list_filter = ('status', 'task')
+    search_fields = ('task', 'key')
+    readonly_fields = ('task', 'args', 'created', 'finished', 'locked_at',
+                       'worker', 'error')
+
+
+admin.site.register(Job, JobAdmin)
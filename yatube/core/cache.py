@@ -0,0 +1,185 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+GENERATION_KEY = 'twotier:generation'
+
+
+def new_generation():
+    # После очистки общего кэша поколение не должно совпасть с тем,
+    # что процессы запомнили до неё.
+    return time.time_ns()
+
+
+class TwoTierCache(BaseCache):
+    """Общий кэш (LOCATION — его алиас) с маленьким LRU в памяти процесса.
+
+    В локальный уровень попадают только «горячие» ключи с префиксами
+    LOCAL_PREFIXES и живут там не дольше LOCAL_TIMEOUT секунд. Удаление
+    горячего ключа или запись ключа с префиксом VERSIONED_PREFIXES
+    увеличивает поколение в общем кэше; процесс сверяет поколение не чаще
+    раза в CHECK_INTERVAL секунд и при расхождении сбрасывает свой уровень.
+    Остальные ключи (например, страницы, адресуемые версиями тегов) при
+    перезаписи не меняются по смыслу и поколение не трогают.
+    Локально значение хранится упакованным и распаковывается при каждом
+    чтении: запросы процесса не должны делить один объект.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.shared_alias = location or 'shared'
+        self.local_timeout = options.get('LOCAL_TIMEOUT', 2)
+        self.local_max_entries = options.get('LOCAL_MAX_ENTRIES', 1000)
+        self.local_prefixes = tuple(options.get(
+            'LOCAL_PREFIXES', ('tag:', 'page:index:', 'user:')))
+        self.versioned_prefixes = tuple(options.get(
+            'VERSIONED_PREFIXES', ('tag:',)))
+        self.check_interval = options.get('CHECK_INTERVAL', 0.5)
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = None
+        self._checked_at = 0
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def is_hot(self, key):
+        return key.startswith(self.local_prefixes)
+
+    def generation(self):
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            current = self.shared.get(GENERATION_KEY)
+            if current is None:
+                self.shared.add(GENERATION_KEY, new_generation(), None)
+                current = self.shared.get(GENERATION_KEY)
+            with self._lock:
+                if current != self._generation:
+                    self._local.clear()
+                    self._generation = current
+                self._checked_at = now
+        return self._generation
+
+    def bump_generation(self):
+        try:
+            current = self.shared.incr(GENERATION_KEY)
+        except ValueError:
+            self.shared.add(GENERATION_KEY, new_generation(), None)
+            current = self.shared.get(GENERATION_KEY)
+        with self._lock:
+            self._local.clear()
+            self._generation = current
+            self._checked_at = time.monotonic()
+
+    def local_get(self, key, version):
+        full_key = self.make_key(key, version)
+        generation = self.generation()
+        with self._lock:
+            entry = self._local.get(full_key)
+            if entry is None:
+                return None
+            pickled, expires, stored_generation = entry
+            if expires <= time.monotonic() or (
+                    stored_generation != generation):
+                del self._local[full_key]
+                return None
+            self._local.move_to_end(full_key)
+        return (pickle.loads(pickled),)
+
+    def local_set(self, key, value, version):
+        full_key = self.make_key(key, version)
+        generation = self.generation()
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._local[full_key] = (
+                pickled, time.monotonic() + self.local_timeout, generation)
+            self._local.move_to_end(full_key)
+            while len(self._local) > self.local_max_entries:
+                self._local.popitem(last=False)
+
+    def local_delete(self, key, version):
+        with self._lock:
+            self._local.pop(self.make_key(key, version), None)
+
+    def changed(self, keys, version, deleted=False):
+        hot = [key for key in keys if self.is_hot(key)]
+        for key in hot:
+            self.local_delete(key, version)
+        if any(deleted or key.startswith(self.versioned_prefixes)
+               for key in hot):
+            self.bump_generation()
+
+    def get(self, key, default=None, version=None):
+        if self.is_hot(key):
+            entry = self.local_get(key, version)
+            if entry is not None:
+                return entry[0]
+        value = self.shared.get(key, version=version)
+        if value is None:
+            return default
+        if self.is_hot(key):
+            self.local_set(key, value, version)
+        return value
+
+    def get_many(self, keys, version=None):
+        found = {}
+        missing = []
+        for key in keys:
+            entry = self.local_get(key, version) if self.is_hot(key) else None
+            if entry is None:
+                missing.append(key)
+            else:
+                found[key] = entry[0]
+        if missing:
+            fetched = self.shared.get_many(missing, version=version)
+            for key, value in fetched.items():
+                if self.is_hot(key):
+                    self.local_set(key, value, version)
+            found.update(fetched)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        self.changed([key], version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version=version)
+        self.changed(list(data), version)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.add(key, value, timeout, version=version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self.shared.delete(key, version=version)
+        self.changed([key], version, deleted=True)
+
+    def delete_many(self, keys, version=None):
+        self.shared.delete_many(keys, version=version)
+        self.changed(list(keys), version, deleted=True)
+
+    def has_key(self, key, version=None):
+        return self.get(key, version=version) is not None
+
+    def incr(self, key, delta=1, version=None):
+        value = self.shared.incr(key, delta, version=version)
+        self.changed([key], version, deleted=True)
+        return value
+
+    def clear(self):
+        current = self.shared.get(GENERATION_KEY) or 0
+        self.shared.clear()
+        self.shared.set(GENERATION_KEY, current + 1, None)
+        self.bump_generation()
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
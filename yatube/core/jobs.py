@@ -0,0 +1,199 @@
+"""Очередь фоновых задач в базе данных, без внешнего брокера.
+
+Задачи регистрируются декоратором @task в модулях tasks.py приложений и
+ставятся в очередь enqueue(); строка Job пишется в той же транзакции,
+что и данные, поэтому исполнитель не увидит задачу раньше коммита.
+Исполнители (manage.py run_jobs) могут работать в нескольких процессах:
+задачу забирает тот, чей UPDATE ... WHERE status = 'queued' изменил
+строку. Упавшая задача повторяется с растущей задержкой, а задачи из
+JOB_SCHEDULE ставятся заново через заданный интервал.
+"""
+import datetime
+import json
+import logging
+import os
+import signal
+import socket
+import time
+import traceback
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+CLAIM_BATCH_SIZE: int = 10
+MAINTENANCE_INTERVAL: int = 30
+
+registry = {}
+
+
+class Task:
+    def __init__(self, function, name, priority, max_attempts):
+        self.function = function
+        self.name = name
+        self.priority = priority
+        self.max_attempts = max_attempts
+
+    def __call__(self, *args):
+        return self.function(*args)
+
+    def delay(self, *args, **options):
+        return enqueue(self.name, *args, **options)
+
+
+def task(name, priority=0, max_attempts=3):
+    """Регистрирует функцию как задачу очереди под именем name."""
+    def decorator(function):
+        registry[name] = Task(function, name, priority, max_attempts)
+        return registry[name]
+    return decorator
+
+
+def enqueue(name, *args, run_at=None, delay=None, priority=None, key=None):
+    """Ставит задачу name(*args) в очередь.
+
+    run_at или delay (в секундах) откладывают выполнение. Если задан key
+    и задача с таким ключом ещё ждёт, новая не создаётся и возвращается
+    ждущая.
+    """
+    registered = registry[name]
+    if run_at is None:
+        run_at = timezone.now()
+    if delay:
+        run_at += datetime.timedelta(seconds=delay)
+    fields = {
+        'task': name,
+        'args': json.dumps(args),
+        'run_at': run_at,
+        'priority': (registered.priority if priority is None
+                     else priority),
+        'max_attempts': registered.max_attempts,
+    }
+    if key is None:
+        return Job.objects.create(**fields)
+    try:
+        with transaction.atomic():
+            return Job.objects.get_or_create(key=key, defaults=fields)[0]
+    except IntegrityError:
+        return Job.objects.get(key=key)
+
+
+def schedule_periodic(now=None):
+    """Ставит задачи JOB_SCHEDULE, у которых ещё нет ждущей копии.
+
+    Следующий запуск — через интервал после последнего завершения.
+    """
+    now = now or timezone.now()
+    for name, interval in settings.JOB_SCHEDULE.items():
+        if name not in registry:
+            logger.warning('Задача %s из JOB_SCHEDULE не найдена', name)
+            continue
+        last = Job.objects.filter(task=name, status=Job.DONE).order_by(
+            '-finished').values_list('finished', flat=True).first()
+        run_at = now
+        if last is not None:
+            run_at = max(now, last + datetime.timedelta(seconds=interval))
+        enqueue(name, run_at=run_at, key=f'periodic:{name}')
+
+
+def requeue_stale(now=None):
+    """Возвращает в очередь задачи исполнителей, переставших отвечать."""
+    now = now or timezone.now()
+    stale = Job.objects.filter(
+        status=Job.RUNNING,
+        locked_at__lt=now - datetime.timedelta(
+            seconds=settings.JOB_LOCK_TIMEOUT))
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, finished=now, key=None,
+        error='Исполнитель не завершил задачу')
+    stale.update(status=Job.QUEUED, worker='', locked_at=None)
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim(worker, now=None):
+    """Забирает самую приоритетную готовую задачу или возвращает None."""
+    now = now or timezone.now()
+    ready = Job.objects.filter(status=Job.QUEUED, run_at__lte=now).order_by(
+        '-priority', 'run_at', 'pk').values_list('pk', flat=True)
+    for pk in ready[:CLAIM_BATCH_SIZE]:
+        taken = Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            status=Job.RUNNING, worker=worker, locked_at=now,
+            attempts=F('attempts') + 1)
+        if taken:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def execute(job):
+    registered = registry.get(job.task)
+    try:
+        if registered is None:
+            raise LookupError(f'Задача {job.task} не зарегистрирована')
+        registered.function(*json.loads(job.args))
+    except Exception:
+        logger.exception('Задача %s не выполнена', job)
+        fail(job, traceback.format_exc())
+    else:
+        # Аргументы выполненной задачи больше не нужны, а хранить их
+        # JOB_KEEP_DAYS незачем.
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.DONE, finished=timezone.now(), key=None, error='',
+            args='[]')
+    finally:
+        close_old_connections()
+
+
+def fail(job, error):
+    now = timezone.now()
+    if job.attempts < job.max_attempts:
+        retry = settings.JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.QUEUED, worker='', locked_at=None, error=error,
+            run_at=now + datetime.timedelta(seconds=retry))
+    else:
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.FAILED, finished=now, key=None, error=error)
+
+
+def work(poll=1.0, burst=False, limit=None):
+    """Цикл исполнителя до SIGTERM/SIGINT; с burst — пока есть задачи.
+
+    Текущая задача при сигнале дорабатывается до конца. Раз в
+    MAINTENANCE_INTERVAL секунд исполнитель ставит периодические задачи
+    и возвращает в очередь брошенные; в режиме burst периодические
+    задачи не ставятся.
+    """
+    stop = []
+    handlers = {signum: signal.signal(signum, lambda *args: stop.append(1))
+                for signum in (signal.SIGTERM, signal.SIGINT)}
+    worker = worker_name()
+    done = 0
+    maintained = 0.0
+    try:
+        while not stop and (limit is None or done < limit):
+            if time.monotonic() - maintained > MAINTENANCE_INTERVAL:
+                if not burst:
+                    schedule_periodic()
+                requeue_stale()
+                maintained = time.monotonic()
+            job = claim(worker)
+            if job is None:
+                if burst:
+                    break
+                close_old_connections()
+                time.sleep(poll)
+                continue
+            execute(job)
+            done += 1
+    finally:
+        for signum, handler in handlers.items():
+            signal.signal(signum, handler)
+    return done
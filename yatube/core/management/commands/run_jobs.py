@@ -0,0 +1,36 @@
+from multiprocessing import Process
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.jobs import work
+
+
+class Command(BaseCommand):
+    help = ('Исполняет фоновые задачи из очереди; несколько процессов '
+            'делят очередь без внешнего брокера')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1)
+        parser.add_argument('--poll', type=float, default=1.0,
+                            help='пауза в секундах, когда очередь пуста')
+        parser.add_argument('--burst', action='store_true',
+                            help='выйти, когда готовых задач не останется')
+        parser.add_argument('--max-jobs', type=int,
+                            help='выйти после стольких задач на процесс')
+
+    def handle(self, *args, processes, poll, burst, max_jobs, **options):
+        kwargs = {'poll': poll, 'burst': burst, 'limit': max_jobs}
+        if processes <= 1:
+            done = work(**kwargs)
+            self.stdout.write(f'Выполнено задач: {done}')
+            return
+        # Соединения родителя не должны достаться дочерним процессам.
+        connections.close_all()
+        workers = [Process(target=work, kwargs=kwargs)
+                   for _ in range(processes)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.stdout.write(f'Исполнители завершены: {processes}')
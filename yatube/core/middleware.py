@@ -0,0 +1,84 @@
+import json
+import logging
+import random
+
+from django.conf import settings
+
+from .queries import (QUERY_COUNT_HEADER, QUERY_DUPLICATES_HEADER,
+                      QUERY_TIME_HEADER, QueryBudgetExceeded, QueryStats,
+                      track_queries)
+from .timing import PHASES, collect
+
+logger = logging.getLogger('core.queries')
+timing_logger = logging.getLogger('core.timing')
+
+
+class QueryBudgetMiddleware:
+    """Считает запросы к базе на каждый ответ и сверяет их с бюджетом.
+
+    Число, время и повторы уходят в заголовки и в лог core.queries. Если
+    страница превысила бюджет из @query_budget, при QUERY_BUDGET_ACTION
+    'warn' пишется предупреждение, при 'raise' — QueryBudgetExceeded.
+    Запросы, сделанные при отдаче потокового ответа, не учитываются.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = QueryStats()
+        request.query_budget = None
+        with track_queries(stats):
+            response = self.get_response(request)
+        milliseconds = round(stats.duration * 1000, 2)
+        if settings.QUERY_STATS_HEADERS:
+            response[QUERY_COUNT_HEADER] = stats.count
+            response[QUERY_TIME_HEADER] = milliseconds
+            response[QUERY_DUPLICATES_HEADER] = stats.duplicates
+        logger.debug('%s %s: %s запросов, %s мс, %s повторов',
+                     request.method, request.path, stats.count,
+                     milliseconds, stats.duplicates)
+        if request.query_budget is not None:
+            self.check(request, stats)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = getattr(view_func, 'query_budget', None)
+
+    def check(self, request, stats):
+        problems = request.query_budget.violations(stats)
+        if not problems:
+            return
+        message = f'{request.method} {request.path}: ' + '; '.join(problems)
+        if settings.QUERY_BUDGET_ACTION == 'raise':
+            raise QueryBudgetExceeded(message)
+        logger.warning('Превышен бюджет запросов, %s', message)
+
+
+class ServerTimingMiddleware:
+    """Для доли запросов SERVER_TIMING_SAMPLE_RATE раскладывает время
+    ответа по фазам в заголовок Server-Timing и строку JSON в лог
+    core.timing."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.SERVER_TIMING_SAMPLE_RATE:
+            return self.get_response(request)
+        with collect() as timings:
+            response = self.get_response(request)
+        response['Server-Timing'] = timings.header()
+        match = request.resolver_match
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'total_ms': round(timings.total * 1000, 2),
+        }
+        for phase in PHASES:
+            record[f'{phase}_ms'] = round(timings.phases[phase] * 1000, 2)
+            record[f'{phase}_calls'] = timings.counts[phase]
+        timing_logger.info(json.dumps(record, ensure_ascii=False))
+        return response
@@ -0,0 +1,99 @@
+"""Учёт SQL-запросов страницы: число, время в базе и повторы.
+
+Счётчик подключается через execute_wrapper и на каждый запрос делает
+только замер времени и одно обращение к словарю, поэтому его можно
+держать включённым и в бою. Повтором считается тот же текст SQL (с
+плейсхолдерами вместо параметров) — так выглядит N+1 в цикле по постам.
+"""
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+QUERY_COUNT_HEADER = 'X-Query-Count'
+QUERY_TIME_HEADER = 'X-Query-Time'
+QUERY_DUPLICATES_HEADER = 'X-Query-Duplicates'
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryStats:
+    """Запросы к базе за время одного ответа."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] = self.statements.get(sql, 0) + 1
+
+    @property
+    def duplicates(self):
+        return self.count - len(self.statements)
+
+    def most_repeated(self):
+        """Самый частый запрос и сколько раз он выполнился."""
+        if not self.statements:
+            return None, 0
+        return max(self.statements.items(), key=lambda item: item[1])
+
+
+@contextmanager
+def track_queries(stats):
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(stats))
+        yield stats
+
+
+class QueryBudget:
+    """Сколько запросов и повторов странице разрешено."""
+
+    def __init__(self, queries, duplicates=0):
+        self.queries = queries
+        self.duplicates = duplicates
+
+    def violations(self, stats):
+        problems = []
+        if stats.count > self.queries:
+            problems.append(
+                f'{stats.count} запросов при бюджете {self.queries}')
+        if stats.duplicates > self.duplicates:
+            sql, times = stats.most_repeated()
+            problems.append(
+                f'{stats.duplicates} повторов при бюджете '
+                f'{self.duplicates}, чаще всего ({times} раз): {sql}')
+        return problems
+
+
+def query_budget(queries, duplicates=0):
+    """Объявляет бюджет запросов страницы; проверяет его middleware.
+
+    Декоратор только помечает функцию и ничего не оборачивает; wraps у
+    внешних декораторов переносит пометку на обёртку.
+    """
+    def decorator(view):
+        view.query_budget = QueryBudget(queries, duplicates)
+        return view
+    return decorator
+
+
+@contextmanager
+def assert_query_budget(queries, duplicates=0):
+    """В тестах: блок должен уложиться в queries запросов и duplicates
+    повторов, иначе AssertionError со списком нарушений."""
+    stats = QueryStats()
+    with track_queries(stats):
+        yield stats
+    problems = QueryBudget(queries, duplicates).violations(stats)
+    if problems:
+        raise AssertionError('; '.join(problems))
@@ -0,0 +1,15 @@
+import datetime
+
+from django.conf import settings
+from django.utils import timezone
+
+from .jobs import task
+from .models import Job
+
+
+@task('core.purge_jobs', priority=-10)
+def purge_jobs():
+    """Удаляет завершённые задачи старше JOB_KEEP_DAYS."""
+    border = timezone.now() - datetime.timedelta(days=settings.JOB_KEEP_DAYS)
+    Job.objects.filter(status__in=(Job.DONE, Job.FAILED),
+                       finished__lt=border).delete()
@@ -0,0 +1,21 @@
+"""Запуск тестов проекта."""
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """Тесты без фонового сброса просмотров.
+
+    Фоновый поток писал бы в тестовую базу из своего соединения поверх
+    транзакций тестов. Несброшенные просмотры отбрасываются в конце, чтобы
+    сброс при выходе не понёс их в рабочую базу.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.VIEW_FLUSH_BACKGROUND = False
+
+    def teardown_test_environment(self, **kwargs):
+        from posts.hits import buffer
+        buffer.take()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,327 @@
+import datetime
+import json
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import caches
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from core.backends import user_cache_key
+from core.cache import TwoTierCache
+from core.jobs import (claim, enqueue, requeue_stale, schedule_periodic,
+                       task, work)
+from core.middleware import QueryBudgetMiddleware
+from core.models import Job
+from core.queries import (QueryBudgetExceeded, assert_query_budget,
+                          query_budget)
+from core.timing import collect, timed
+from posts import views
+from posts.models import Group, Post
+
+User = get_user_model()
+
+SHARED_DIR = tempfile.mkdtemp()
+OPTIONS = {'LOCAL_MAX_ENTRIES': 3, 'CHECK_INTERVAL': 0}
+CALLS = []
+
+
+@task('core.tests.record', priority=1)
+def record(value):
+    CALLS.append(value)
+
+
+@task('core.tests.broken', max_attempts=2)
+def broken():
+    raise RuntimeError('сломано')
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': SHARED_DIR,
+    },
+})
+class TwoTierCacheTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(SHARED_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        caches['shared'].clear()
+        # Два экземпляра ведут себя как два процесса с общим кэшем.
+        self.first = TwoTierCache('shared', {'OPTIONS': OPTIONS})
+        self.second = TwoTierCache('shared', {'OPTIONS': OPTIONS})
+
+    def test_hot_key_is_served_locally(self):
+        self.first.set('tag:index', 'v1')
+        self.assertEqual(self.first.get('tag:index'), 'v1')
+        with mock.patch.object(caches['shared'], 'get',
+                               side_effect=AssertionError):
+            with mock.patch.object(self.first, 'generation',
+                                   return_value=self.first._generation):
+                self.assertEqual(self.first.get('tag:index'), 'v1')
+
+    def test_local_reads_do_not_share_objects(self):
+        self.first.set('user:1', {'name': 'Ivan'})
+        value = self.first.get('user:1')
+        value['name'] = 'Petr'
+        self.assertEqual(self.first.get('user:1'), {'name': 'Ivan'})
+        self.assertIsNot(self.first.get('user:1'), self.first.get('user:1'))
+
+    def test_cold_key_is_not_kept_locally(self):
+        self.first.set('other', 'value')
+        self.first.get('other')
+        self.assertEqual(len(self.first._local), 0)
+
+    def test_versioned_write_reaches_other_process(self):
+        self.first.set('tag:index', 'v1')
+        self.assertEqual(self.second.get('tag:index'), 'v1')
+        self.first.set('tag:index', 'v2')
+        self.assertEqual(self.second.get('tag:index'), 'v2')
+
+    def test_delete_reaches_other_process(self):
+        self.first.set('user:1', 'Ivan')
+        self.assertEqual(self.second.get('user:1'), 'Ivan')
+        self.first.delete('user:1')
+        self.assertIsNone(self.second.get('user:1'))
+
+    def test_least_recently_used_key_is_evicted(self):
+        for number in range(4):
+            self.first.set(f'user:{number}', number)
+            self.first.get(f'user:{number}')
+        self.assertEqual(len(self.first._local), 3)
+        self.assertNotIn(self.first.make_key('user:0'), self.first._local)
+
+    def test_clear_resets_other_process(self):
+        self.first.set('tag:index', 'v1')
+        self.second.get('tag:index')
+        self.first.clear()
+        self.assertIsNone(self.second.get('tag:index'))
+
+
+@override_settings(
+    AUTHENTICATION_BACKENDS=['core.backends.CachedModelBackend'])
+class CachedModelBackendTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='Ivan')
+        self.client = Client()
+        self.client.force_login(self.user)
+        caches['default'].delete(user_cache_key(self.user.pk))
+
+    def test_session_user_is_cached(self):
+        self.client.get('/')
+        with self.assertNumQueries(1):
+            response = self.client.get('/about/author/')
+        self.assertEqual(response.context['user'].pk, self.user.pk)
+
+    def test_user_change_drops_cached_copy(self):
+        self.client.get('/')
+        self.user.first_name = 'Иван'
+        self.user.save()
+        self.assertIsNone(caches['default'].get(user_cache_key(self.user.pk)))
+
+
+def users_view(request, times=1):
+    for _ in range(times):
+        User.objects.filter(pk=1).exists()
+    return HttpResponse()
+
+
+def budgeted_view(queries, duplicates=0):
+    # Отдельная функция на каждый бюджет: декоратор помечает саму функцию.
+    def view(request, times):
+        return users_view(request, times)
+    return query_budget(queries, duplicates)(view)
+
+
+class QueryBudgetMiddlewareTest(TestCase):
+    def get(self, view, times=1):
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            return view(request, times)
+        middleware = QueryBudgetMiddleware(get_response)
+        return middleware(RequestFactory().get('/page/'))
+
+    def test_stats_are_sent_in_headers(self):
+        response = self.get(users_view, times=3)
+        self.assertEqual(response['X-Query-Count'], '3')
+        self.assertEqual(response['X-Query-Duplicates'], '2')
+        self.assertIn('X-Query-Time', response)
+
+    @override_settings(QUERY_BUDGET_ACTION='warn')
+    def test_exceeded_budget_is_logged(self):
+        view = budgeted_view(1)
+        with self.assertLogs('core.queries', 'WARNING') as logs:
+            self.get(view, times=2)
+        self.assertIn('2 запросов при бюджете 1', logs.output[0])
+
+    @override_settings(QUERY_BUDGET_ACTION='raise')
+    def test_exceeded_budget_raises_in_strict_mode(self):
+        view = budgeted_view(5, duplicates=1)
+        self.get(view, times=2)
+        with self.assertRaisesMessage(QueryBudgetExceeded, '2 повторов'):
+            self.get(view, times=3)
+
+    def test_budget_survives_outer_decorators(self):
+        self.assertEqual(views.post_create.query_budget.queries, 15)
+
+    def test_assert_query_budget(self):
+        with assert_query_budget(2, duplicates=1) as stats:
+            users_view(None, times=2)
+        self.assertEqual(stats.count, 2)
+        with self.assertRaises(AssertionError):
+            with assert_query_budget(1):
+                users_view(None, times=2)
+
+
+@override_settings(QUERY_BUDGET_ACTION='raise')
+class PostsQueryBudgetTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='Ivan')
+        group = Group.objects.create(title='Группа', slug='group')
+        for number in range(15):
+            Post.objects.create(text=f'Пост {number}', author=self.user,
+                                group=group)
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_feed_pages_fit_their_budgets(self):
+        for path in ('/', '/group/group/', '/profile/Ivan/',
+                     '/search/?q=пост'):
+            with self.subTest(path=path):
+                caches['default'].clear()
+                response = self.client.get(path)
+                self.assertEqual(response['X-Query-Duplicates'], '0')
+
+
+@override_settings(SERVER_TIMING_SAMPLE_RATE=1)
+class ServerTimingTest(TestCase):
+    def setUp(self):
+        Post.objects.create(text='Пост', author=User.objects.create_user(
+            username='Ivan'))
+        caches['default'].clear()
+
+    def test_phases_are_sent_in_header(self):
+        response = self.client.get('/')
+        entries = {entry.split(';')[0]
+                   for entry in response['Server-Timing'].split(', ')}
+        self.assertTrue({'db', 'template', 'cache', 'total'} <= entries)
+
+    def test_request_is_logged_as_json(self):
+        with self.assertLogs('core.timing', 'INFO') as logs:
+            self.client.get('/')
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'posts:main_page')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['db_calls'], 0)
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=0)
+    def test_unsampled_request_has_no_header(self):
+        self.assertNotIn('Server-Timing', self.client.get('/'))
+
+    def test_nested_calls_of_one_phase_are_counted_once(self):
+        inner = timed('cache')(lambda: None)
+        outer = timed('cache')(lambda: inner())
+        with collect() as timings:
+            outer()
+        self.assertEqual(timings.counts['cache'], 1)
+
+
+class JobQueueTest(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_jobs_run_by_priority_then_time(self):
+        enqueue('core.tests.record', 'поздний', priority=0)
+        enqueue('core.tests.record', 'важный', priority=5)
+        enqueue('core.tests.record', 'обычный')
+        self.assertEqual(work(burst=True), 3)
+        self.assertEqual(CALLS, ['важный', 'обычный', 'поздний'])
+        self.assertFalse(Job.objects.exclude(status=Job.DONE).exists())
+
+    def test_scheduled_job_waits(self):
+        job = enqueue('core.tests.record', 'потом', delay=60)
+        self.assertEqual(work(burst=True), 0)
+        self.assertIsNotNone(claim('test', job.run_at))
+
+    def test_claimed_job_is_not_taken_twice(self):
+        enqueue('core.tests.record', 'один')
+        self.assertIsNotNone(claim('first'))
+        self.assertIsNone(claim('second'))
+
+    @override_settings(JOB_RETRY_DELAY=10)
+    def test_failed_job_is_retried_then_failed(self):
+        job = enqueue('core.tests.broken')
+        with self.assertLogs('core.jobs', 'ERROR'):
+            work(burst=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertIn('сломано', job.error)
+        later = job.run_at + datetime.timedelta(seconds=1)
+        with self.assertLogs('core.jobs', 'ERROR'):
+            with mock.patch('django.utils.timezone.now',
+                            return_value=later):
+                work(burst=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+
+    def test_key_keeps_one_pending_job(self):
+        first = enqueue('core.tests.record', 1, key='once')
+        self.assertEqual(enqueue('core.tests.record', 2, key='once'), first)
+        work(burst=True)
+        self.assertEqual(CALLS, [1])
+        enqueue('core.tests.record', 3, key='once')
+        self.assertEqual(Job.objects.count(), 2)
+
+    @override_settings(JOB_SCHEDULE={'core.tests.record': 60})
+    def test_periodic_job_is_rescheduled_after_interval(self):
+        now = timezone.now()
+        schedule_periodic(now)
+        Job.objects.update(args='["тик"]')
+        work(burst=True)
+        schedule_periodic(now)
+        pending = Job.objects.get(status=Job.QUEUED)
+        self.assertGreaterEqual(pending.run_at,
+                                now + datetime.timedelta(seconds=60))
+        self.assertEqual(CALLS, ['тик'])
+
+    @override_settings(JOB_LOCK_TIMEOUT=60)
+    def test_abandoned_job_is_requeued(self):
+        enqueue('core.tests.record', 'снова')
+        job = claim('dead')
+        requeue_stale(job.locked_at + datetime.timedelta(seconds=61))
+        work(burst=True)
+        self.assertEqual(CALLS, ['снова'])
+
+    def test_command_drains_queue(self):
+        enqueue('core.tests.record', 'команда')
+        out = StringIO()
+        call_command('run_jobs', '--burst', stdout=out)
+        self.assertIn('Выполнено задач: 1', out.getvalue())
+
+    def test_password_reset_mail_is_sent_by_worker(self):
+        User.objects.create_user(username='Ivan', email='ivan@yatube.ru',
+                                 password='secret-123')
+        self.client.post('/auth/password_reset/',
+                         {'email': 'ivan@yatube.ru'})
+        self.assertEqual(len(mail.outbox), 0)
+        job = Job.objects.get()
+        self.assertEqual(job.task, 'users.send_password_reset')
+        work(burst=True)
+        self.assertEqual(mail.outbox[0].to, ['ivan@yatube.ru'])
+        token = mail.outbox[0].body.split('/reset/')[1].split('/')[1]
+        self.assertNotIn(token, job.args)
+        self.assertTrue(self.client.get(
+            mail.outbox[0].body.split('http://testserver')[1].split()[0],
+            follow=True).context['validlink'])
+        job.refresh_from_db()
+        self.assertEqual(job.args, '[]')
@@ -0,0 +1,114 @@
+"""Разбивка времени ответа по фазам: база, шаблоны, миниатюры, кэш.
+
+Замеряется только выборка запросов (SERVER_TIMING_SAMPLE_RATE); у
+остальных обёртки сводятся к одной проверке атрибута потока. Фазы могут
+пересекаться: запросы из шаблона попадают и в db, и в template.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+from django.utils.module_loading import import_string
+
+PHASES = ('db', 'template', 'thumbnail', 'cache')
+CACHE_METHODS = ('get', 'set', 'add', 'delete', 'get_many', 'set_many',
+                 'delete_many', 'incr', 'decr', 'get_or_set', 'touch')
+
+_local = threading.local()
+
+
+class Timings:
+    """Накопленное время фаз одного запроса, в секундах."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.finished = None
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.counts = dict.fromkeys(PHASES, 0)
+        self.active = set()
+
+    def __call__(self, execute, sql, params, many, context):
+        with self.measure('db'):
+            return execute(sql, params, many, context)
+
+    @contextmanager
+    def measure(self, phase):
+        # Вложенные вызовы той же фазы (get_or_set внутри вызывает get)
+        # считаются один раз.
+        if phase in self.active:
+            yield
+            return
+        self.active.add(phase)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[phase] += time.perf_counter() - started
+            self.counts[phase] += 1
+            self.active.discard(phase)
+
+    @property
+    def total(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    def header(self):
+        entries = [f'{phase};dur={self.phases[phase] * 1000:.2f};'
+                   f'desc="{self.counts[phase]}"'
+                   for phase in PHASES if self.counts[phase]]
+        entries.append(f'total;dur={self.total * 1000:.2f}')
+        return ', '.join(entries)
+
+
+def current():
+    return getattr(_local, 'timings', None)
+
+
+@contextmanager
+def collect():
+    """Замеряет фазы всего, что выполнится внутри блока."""
+    timings = Timings()
+    _local.timings = timings
+    try:
+        with connections['default'].execute_wrapper(timings):
+            yield timings
+    finally:
+        timings.finished = time.perf_counter()
+        _local.timings = None
+
+
+def timed(phase):
+    """Декоратор: время вызова идёт в фазу phase, если запрос замеряется."""
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            timings = current()
+            if timings is None:
+                return function(*args, **kwargs)
+            with timings.measure(phase):
+                return function(*args, **kwargs)
+        wrapper.timed_phase = phase
+        return wrapper
+    return decorator
+
+
+def instrument_class(cls, names, phase):
+    for name in names:
+        method = cls.__dict__.get(name)
+        if method is not None and not hasattr(method, 'timed_phase'):
+            setattr(cls, name, timed(phase)(method))
+
+
+def instrument():
+    """Оборачивает рендеринг шаблонов и методы бэкендов кэша из CACHES.
+
+    Вызывается один раз из CoreConfig.ready().
+    """
+    from django.template.backends.django import Template
+    instrument_class(Template, ('render',), 'template')
+    for params in settings.CACHES.values():
+        backend = import_string(params['BACKEND'])
+        for cls in backend.__mro__:
+            instrument_class(cls, CACHE_METHODS, 'cache')
@@ -1,8 +1,219 @@
+import datetime
+
+from django import forms
 from django.contrib import admin
-from .models import Group, Post
+from django.contrib.admin import helpers
+from django.contrib.admin.helpers import ActionForm
+from django.contrib.admin.views.main import ORDER_VAR, PAGE_VAR, ChangeList
+from django.template.response import TemplateResponse
+from django.utils import timezone
+
+from core.jobs import enqueue
+
+from .bulk import BULK_BATCH_SIZE
+from .models import Comment, Follow, Group, Post
+from .search import search_queryset
+from .utils import (EstimatedCountPaginator, decode_cursor, decode_pk,
+                    encode_cursor, keyset, pk_batches)
+
+CURSOR_VAR = 'after'
+MONTHS = ('январь', 'февраль', 'март', 'апрель', 'май', 'июнь', 'июль',
+          'август', 'сентябрь', 'октябрь', 'ноябрь', 'декабрь')
+
+
+class KeysetChangeList(ChangeList):
+    """Список, по которому дальше первых страниц идут по курсору.
+
+    При сортировке по умолчанию страница ?after= выбирается по индексу
+    ключей keyset_keys, без OFFSET и без подсчёта строк. Ключи — дата и id
+    или один id.
+    """
+
+    def get_filters_params(self, params=None):
+        params = super().get_filters_params(params)
+        params.pop(CURSOR_VAR, None)
+        return params
+
+    @property
+    def keys(self):
+        if ORDER_VAR in self.params:
+            return None
+        return self.model_admin.keyset_keys
+
+    def decode(self, cursor):
+        if self.keys is not None and len(self.keys) == 1:
+            pk = decode_pk(cursor)
+            return None if pk is None else (pk,)
+        return decode_cursor(cursor)
+
+    def encode(self, obj):
+        values = [getattr(obj, key) for key in self.keys]
+        if len(values) == 1:
+            return str(values[0])
+        return encode_cursor(*values)
+
+    def get_results(self, request):
+        cursor = self.decode(self.params.get(CURSOR_VAR))
+        if self.keys is None or cursor is None:
+            super().get_results(request)
+            paged = self.multi_page and not self.show_all
+        else:
+            self.keyset_results(request, cursor)
+            paged = True
+        # Полная страница считается непоследней: лишний запрос ради
+        # проверки дороже редкой пустой страницы в конце.
+        self.next_cursor = None
+        if self.keys is not None and paged and (
+                len(self.result_list) == self.list_per_page):
+            self.next_cursor = self.encode(
+                self.result_list[self.list_per_page - 1])
+
+    def keyset_results(self, request, cursor):
+        self.paginator = self.model_admin.get_paginator(
+            request, self.queryset, self.list_per_page)
+        self.result_count = self.paginator.count
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.result_list = keyset(self.queryset, self.keys, cursor)[
+            :self.list_per_page]
+        self.can_show_all = False
+        self.multi_page = False
+
+    @property
+    def next_link(self):
+        return self.get_query_string({CURSOR_VAR: self.next_cursor},
+                                     [PAGE_VAR])
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    """Список без точных COUNT(*): число строк — оценка, связанные
+    объекты — одним JOIN, дальние страницы — по курсору."""
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    keyset_keys = None
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+
+class DateDrillDownFilter(admin.SimpleListFilter):
+    """Год, затем месяц; фильтр — диапазон дат по индексу поля.
+
+    Годы берутся из самой ранней и самой поздней даты, двумя запросами по
+    тому же индексу, а не группировкой всей таблицы.
+    """
+
+    title = 'год и месяц'
+    parameter_name = 'period'
+    field = None
+
+    def lookups(self, request, model_admin):
+        value = self.value() or ''
+        if value[:4].isdigit():
+            year = int(value[:4])
+            return [(str(year), f'весь {year} год')] + [
+                (f'{year}-{month:02}', f'{MONTHS[month - 1]} {year}')
+                for month in range(1, 13)]
+        dates = model_admin.get_queryset(request).values_list(
+            self.field, flat=True)
+        first = dates.order_by(self.field).first()
+        last = dates.order_by(f'-{self.field}').first()
+        if first is None:
+            return []
+        return [(str(year), str(year))
+                for year in range(last.year, first.year - 1, -1)]
+
+    def queryset(self, request, queryset):
+        period = self.period()
+        if period is None:
+            return queryset
+        start, end = period
+        return queryset.filter(**{f'{self.field}__gte': start,
+                                  f'{self.field}__lt': end})
+
+    def period(self):
+        try:
+            parts = [int(part) for part in (self.value() or '').split('-')]
+            if len(parts) == 1:
+                start = datetime.datetime(parts[0], 1, 1)
+                end = start.replace(year=start.year + 1)
+            else:
+                year, month = parts
+                start = datetime.datetime(year, month, 1)
+                end = (start + datetime.timedelta(days=32)).replace(day=1)
+        except (TypeError, ValueError, OverflowError):
+            return None
+        return timezone.make_aware(start), timezone.make_aware(end)
 
 
-class PostAdmin(admin.ModelAdmin):
+class PubDateFilter(DateDrillDownFilter):
+    field = 'pub_date'
+
+
+class CreatedFilter(DateDrillDownFilter):
+    field = 'created'
+
+
+class RegroupForm(ActionForm):
+    group = forms.ModelChoiceField(Group.objects.all(), required=False,
+                                   label='Группа', empty_label='без группы')
+
+
+def enqueue_batches(name, queryset, *args):
+    """Ставит задачу name(ids, *args) на каждую пачку из BULK_BATCH_SIZE
+    постов queryset, чтобы «выбрать все» не собирало все id в одну строку
+    очереди. Возвращает число постов."""
+    total = 0
+    for ids in pk_batches(queryset, BULK_BATCH_SIZE):
+        enqueue(name, ids, *args)
+        total += len(ids)
+    return total
+
+
+def regroup_in_background(modeladmin, request, queryset):
+    group = request.POST.get('group') or None
+    total = enqueue_batches('posts.regroup_posts', queryset, group)
+    modeladmin.message_user(
+        request, f'Перенос постов в группу поставлен в очередь: {total}')
+
+
+regroup_in_background.short_description = 'Перенести в группу (в фоне)'
+
+
+def delete_in_background(modeladmin, request, queryset):
+    """Как delete_selected, ставит удаление в очередь после подтверждения.
+
+    Страница подтверждения не собирает связанные объекты: она показывает
+    только число постов, а их комментарии удалит задача.
+    """
+    if request.POST.get('post') != 'yes':
+        opts = modeladmin.model._meta
+        context = {
+            **modeladmin.admin_site.each_context(request),
+            'title': 'Вы уверены?',
+            'opts': opts,
+            'count': queryset.count(),
+            'select_across': request.POST.get('select_across') == '1',
+            'selected': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+            'media': modeladmin.media,
+        }
+        request.current_app = modeladmin.admin_site.name
+        return TemplateResponse(
+            request,
+            f'admin/{opts.app_label}/{opts.model_name}/'
+            'delete_in_background_confirmation.html', context)
+    total = enqueue_batches('posts.delete_posts', queryset)
+    modeladmin.message_user(
+        request, f'Удаление постов поставлено в очередь: {total}')
+
+
+delete_in_background.short_description = 'Удалить выбранные посты (в фоне)'
+
+
+class PostAdmin(ScalableAdmin):
 
     list_display = (
         'pk',
@@ -12,10 +223,58 @@ class PostAdmin(admin.ModelAdmin):
         'group',
     )
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
-    list_filter = ('pub_date',)
+    list_filter = ('pub_date', PubDateFilter)
+    raw_id_fields = ('author',)
     empty_value_display = '-пусто-'
+    keyset_keys = ('pub_date', 'id')
+    action_form = RegroupForm
+    actions = (regroup_in_background, delete_in_background)
+
+    def get_actions(self, request):
+        # Стандартное удаление собирает все объекты для подтверждения.
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        # Поле group редактируется в каждой строке списка: без общего
+        # списка вариантов каждая строка выбирала бы группы заново.
+        field = super().formfield_for_foreignkey(db_field, request, **kwargs)
+        if db_field.name == 'group' and request is not None:
+            if not hasattr(request, 'group_choices'):
+                # list() спросил бы у итератора длину, а это COUNT(*).
+                request.group_choices = [choice for choice in field.choices]
+            field.choices = request.group_choices
+        return field
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return search_queryset(queryset, search_term), False
+
+
+class CommentAdmin(ScalableAdmin):
+    list_display = ('pk', 'text', 'created', 'author', 'post')
+    list_select_related = ('author', 'post')
+    list_filter = ('created', CreatedFilter)
+    raw_id_fields = ('author', 'post')
+    # Путь и счётчики ветки пишутся при создании ответа.
+    readonly_fields = ('parent',)
+    ordering = ('-created', '-id')
+    keyset_keys = ('created', 'id')
+
+
+class FollowAdmin(ScalableAdmin):
+    list_display = ('pk', 'user', 'author')
+    list_select_related = ('user', 'author')
+    raw_id_fields = ('user', 'author')
+    ordering = ('-id',)
+    keyset_keys = ('id',)
 
 
 admin.site.register(Post, PostAdmin)
+admin.site.register(Comment, CommentAdmin)
+admin.site.register(Follow, FollowAdmin)
 admin.site.register(Group)
@@ -0,0 +1,323 @@
+"""Нагрузочный прогон страниц постов.
+
+Смесь запросов выполняют несколько «пользователей» одновременно: либо
+в этом процессе через тестовый клиент Django, либо по HTTP к настоящему
+серверу. По каждой странице считаются пропускная способность, задержки
+p50/p95/p99 и число SQL-запросов на ответ.
+"""
+import math
+import os
+import random
+import socket
+import statistics
+import threading
+import time
+from socketserver import ThreadingMixIn
+
+import requests
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY
+from django.contrib.auth import SESSION_KEY
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.servers.basehttp import (WSGIRequestHandler, WSGIServer,
+                                          get_internal_wsgi_application)
+from django.db import close_old_connections, connections
+from django.test import Client
+from django.urls import resolve, reverse
+
+from core.queries import QUERY_COUNT_HEADER, QueryStats, track_queries
+
+from .models import Group, Post, User
+
+DEFAULT_MIX = {
+    'index': 30,
+    'group_posts': 15,
+    'profile': 15,
+    'post_detail': 20,
+    'follow_index': 10,
+    'add_comment': 5,
+    'profile_follow': 5,
+}
+SAMPLE_SIZE: int = 1000
+# Страницы, на которых стоит форма для POST-запроса: они выдают csrftoken.
+FORM_PAGES = {'posts:add_comment': 'posts:post_detail'}
+REDIRECTS = (301, 302, 303)
+
+
+def percentile(values, share):
+    """Перцентиль по ближайшему рангу; для пустого списка — None."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(math.ceil(share / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+class Sample:
+    """Пользователи, группы и посты, по которым ходят сценарии."""
+
+    def __init__(self, size=SAMPLE_SIZE):
+        self.users = list(User.objects.filter(is_active=True).order_by(
+            'pk').values_list('pk', 'username')[:size])
+        self.groups = list(Group.objects.order_by('pk').values_list(
+            'slug', flat=True)[:size])
+        self.posts = list(Post.objects.order_by('-pub_date').values_list(
+            'pk', flat=True)[:size])
+        if not (self.users and self.posts):
+            raise ValueError('В базе нет пользователей или постов, '
+                             'сначала запустите seed_blog')
+
+
+def requests_for(name, rng, sample):
+    """Метод, путь и данные запроса страницы name."""
+    if name == 'index':
+        return 'get', reverse('posts:main_page'), None
+    if name == 'group_posts':
+        slug = rng.choice(sample.groups)
+        return 'get', reverse('posts:group_list', args=[slug]), None
+    if name == 'profile':
+        username = rng.choice(sample.users)[1]
+        return 'get', reverse('posts:profile', args=[username]), None
+    if name == 'post_detail':
+        post_id = rng.choice(sample.posts)
+        return 'get', reverse('posts:post_detail', args=[post_id]), None
+    if name == 'follow_index':
+        return 'get', reverse('posts:follow_index'), None
+    if name == 'add_comment':
+        post_id = rng.choice(sample.posts)
+        return ('post', reverse('posts:add_comment', args=[post_id]),
+                {'text': 'Комментарий из нагрузочного прогона'})
+    if name == 'profile_follow':
+        username = rng.choice(sample.users)[1]
+        return 'get', reverse('posts:profile_follow', args=[username]), None
+    raise ValueError(f'Неизвестная страница: {name}')
+
+
+class InProcessUser:
+    """Пользователь, который ходит по страницам через тестовый клиент."""
+
+    def __init__(self, user_id):
+        self.client = Client()
+        self.client.force_login(User.objects.get(pk=user_id))
+
+    def request(self, method, path, data):
+        stats = QueryStats()
+        with track_queries(stats):
+            response = getattr(self.client, method)(path, data)
+        return response.status_code, stats.count
+
+    def close(self):
+        close_old_connections()
+
+
+class HttpUser:
+    """Пользователь настоящего сервера с собственной сессией."""
+
+    def __init__(self, user_id, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+        self.session.cookies.set('sessionid', session_for(user_id))
+
+    def csrf_token(self, path):
+        token = self.session.cookies.get('csrftoken')
+        if token is None:
+            match = resolve(path)
+            form_page = reverse(FORM_PAGES[match.view_name],
+                                kwargs=match.kwargs)
+            self.session.get(self.base_url + form_page)
+            token = self.session.cookies.get('csrftoken', '')
+        return token
+
+    def request(self, method, path, data):
+        headers = {}
+        if method == 'post':
+            headers = {'X-CSRFToken': self.csrf_token(path),
+                       'Referer': self.base_url + path}
+        response = self.session.request(
+            method, self.base_url + path, data=data, headers=headers,
+            allow_redirects=False)
+        queries = response.headers.get(QUERY_COUNT_HEADER)
+        return response.status_code, int(queries) if queries else None
+
+    def close(self):
+        self.session.close()
+
+
+def session_for(user_id):
+    """Готовая сессия пользователя, как после входа на сайт."""
+    user = User.objects.get(pk=user_id)
+    session = SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.create()
+    return session.session_key
+
+
+def run_user(number, make_user, mix, sample, per_user, deadline, seed,
+             results, lock):
+    rng = random.Random(f'{seed}:{number}')
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    user = make_user(rng.choice(sample.users)[0])
+    records = []
+    try:
+        for _ in range(per_user):
+            if deadline and time.monotonic() >= deadline:
+                break
+            name = rng.choices(names, weights)[0]
+            method, path, data = requests_for(name, rng, sample)
+            started = time.perf_counter()
+            try:
+                status, queries = user.request(method, path, data)
+            except Exception:
+                status, queries = None, None
+            records.append((name, time.perf_counter() - started,
+                            failed(method, status), queries))
+    finally:
+        user.close()
+    with lock:
+        results.extend(records)
+
+
+def run(make_user, mix, concurrency, per_user, duration=None, seed=1):
+    """Гоняет смесь mix в concurrency потоков, каждый делает per_user."""
+    sample = Sample()
+    results = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration if duration else None
+    args = (make_user, mix, sample, per_user, deadline, seed, results, lock)
+    started = time.perf_counter()
+    if concurrency == 1:
+        run_user(0, *args)
+    else:
+        threads = [threading.Thread(target=run_user, args=(number, *args))
+                   for number in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return summarize(results, time.perf_counter() - started)
+
+
+def failed(method, status):
+    """Ошибка — нет ответа, код 4xx/5xx или POST без перенаправления.
+
+    Успешная форма всегда перенаправляет; страница 200 в ответ на POST
+    значит, что запрос отклонён, например проверкой CSRF.
+    """
+    if status is None or status >= 400:
+        return True
+    return method == 'post' and status not in REDIRECTS
+
+
+def stats(records, elapsed):
+    latencies = [duration * 1000 for _, duration, _, _ in records]
+    queries = [count for _, _, _, count in records if count is not None]
+    errors = sum(1 for _, _, error, _ in records if error)
+    return {
+        'requests': len(records),
+        'errors': errors,
+        'rps': round(len(records) / elapsed, 2) if elapsed else None,
+        'p50_ms': rounded(percentile(latencies, 50)),
+        'p95_ms': rounded(percentile(latencies, 95)),
+        'p99_ms': rounded(percentile(latencies, 99)),
+        'mean_ms': rounded(statistics.mean(latencies) if latencies else None),
+        'queries_mean': rounded(
+            statistics.mean(queries) if queries else None),
+        'queries_max': max(queries) if queries else None,
+    }
+
+
+def rounded(value):
+    return None if value is None else round(value, 3)
+
+
+def summarize(records, elapsed):
+    views = {}
+    for name in sorted({record[0] for record in records}):
+        views[name] = stats([record for record in records
+                             if record[0] == name], elapsed)
+    return {'elapsed_s': round(elapsed, 3),
+            'total': stats(records, elapsed), 'views': views}
+
+
+def compare(baseline, current, tolerance):
+    """Строки сравнения и признак того, что что-то стало хуже допуска."""
+    lines = []
+    worse = False
+    modes = (baseline.get('meta', {}).get('mode'),
+             current.get('meta', {}).get('mode'))
+    if modes[0] != modes[1]:
+        lines.append(f'Прогоны в разных режимах: {modes[0]} и {modes[1]}')
+    for name, now in sorted(current['views'].items()):
+        before = baseline.get('views', {}).get(name)
+        if before is None:
+            lines.append(f'{name}: нет в базовом прогоне')
+            continue
+        for key in ('p50_ms', 'p95_ms', 'p99_ms', 'queries_mean'):
+            old, new = before.get(key), now.get(key)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old * 100 if old else 0
+            mark = ''
+            if change > tolerance:
+                mark = '  ← хуже'
+                worse = True
+            lines.append(f'{name} {key}: {old} -> {new} '
+                         f'({change:+.1f}%){mark}')
+    return lines, worse
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class ThreadedServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+def serve(host, port, workers):
+    """Запускает pre-fork сервер: workers процессов на одном сокете.
+
+    Возвращает id дочерних процессов; остановить их — stop_server().
+    """
+    listener = socket.create_server((host, port))
+    application = get_internal_wsgi_application()
+    connections.close_all()
+    pids = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            server = ThreadedServer((host, port), QuietRequestHandler,
+                                    bind_and_activate=False)
+            server.socket = listener
+            server.server_name, server.server_port = host, port
+            server.setup_environ()
+            server.set_app(application)
+            try:
+                server.serve_forever()
+            finally:
+                os._exit(0)
+        pids.append(pid)
+    listener.close()
+    return pids
+
+
+def stop_server(pids):
+    for pid in pids:
+        os.kill(pid, 15)
+    for pid in pids:
+        os.waitpid(pid, 0)
+
+
+def wait_for_server(base_url, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            requests.get(base_url + reverse('posts:main_page'), timeout=1)
+            return
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    raise RuntimeError(f'Сервер {base_url} не ответил за {timeout} с')
@@ -0,0 +1,43 @@
+"""Массовые действия админки над постами.
+
+Выполняются задачами очереди (posts/tasks.py) пачками по BULK_BATCH_SIZE
+постов, каждая в своей транзакции, так что таблица не блокируется
+надолго, а уже сделанные пачки не откатываются из-за ошибки в следующей.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .caching import invalidate, post_tags
+from .models import Group, Post, PostVector, RelatedPost
+
+BULK_BATCH_SIZE: int = 500
+
+
+def batches(ids, size=BULK_BATCH_SIZE):
+    ids = sorted(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def regroup_posts(post_ids, group_id):
+    """Переносит посты в группу group_id, None — убирает из групп."""
+    group = Group.objects.filter(pk=group_id).first() if group_id else None
+    for batch in batches(post_ids):
+        with transaction.atomic():
+            posts = Post.objects.filter(pk__in=batch)
+            found = list(posts.select_related('author', 'group'))
+            tags = {tag for post in found for tag in post_tags(post)}
+            posts.update(group=group, updated=timezone.now())
+            # Группа — признак похожих постов, их списки пересчитаются.
+            PostVector.objects.filter(post_id__in=batch).delete()
+            RelatedPost.objects.filter(post_id__in=batch).delete()
+            if group is not None:
+                tags.add(f'group:{group.slug}')
+            invalidate(tags)
+
+
+def delete_posts(post_ids):
+    """Удаляет посты; счётчики, индекс и кэш чинят сигналы post_delete."""
+    for batch in batches(post_ids):
+        with transaction.atomic():
+            Post.objects.filter(pk__in=batch).delete()
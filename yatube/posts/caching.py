@@ -0,0 +1,253 @@
+import hashlib
+import time
+import uuid
+from functools import wraps
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max, OuterRef, Subquery
+from django.utils.cache import (get_conditional_response, patch_vary_headers,
+                                quote_etag)
+
+from .models import Follow, Post, RelatedPost
+
+PAGE_CACHE_TIMEOUT: int = 60
+PAGE_CACHE_GRACE: int = 60 * 5
+LOCK_TIMEOUT: int = 10
+LOCK_WAIT: float = 2.0
+LOCK_POLL: float = 0.05
+TAG_PREFIX = 'tag:'
+STATS_PREFIX = 'pagecache:'
+STATS_EVENTS = ('hit', 'miss', 'stale')
+BUMP_BATCH_SIZE: int = 500
+
+
+def new_version():
+    return uuid.uuid4().hex[:12]
+
+
+def tag_versions(tags):
+    """Текущие версии тегов; отсутствующие теги получают новую версию."""
+    keys = [TAG_PREFIX + tag for tag in tags]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            cache.add(key, new_version(), None)
+        versions.update(cache.get_many(missing))
+    return [versions.get(key, '') for key in keys]
+
+
+def bump(tags):
+    keys = [TAG_PREFIX + tag for tag in tags]
+    for start in range(0, len(keys), BUMP_BATCH_SIZE):
+        cache.set_many({key: new_version()
+                        for key in keys[start:start + BUMP_BATCH_SIZE]}, None)
+
+
+def invalidate(tags):
+    """Сбрасывает теги сразу и ещё раз после коммита транзакции.
+
+    Повторный сброс закрывает окно, в которое конкурентный запрос мог
+    закэшировать страницу по ещё не закоммиченным данным.
+    """
+    tags = list(tags)
+    bump(tags)
+    transaction.on_commit(lambda: bump(tags))
+
+
+def page_key(request, name, versions):
+    user = request.user.pk if request.user.is_authenticated else 0
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    state = hashlib.md5(':'.join(versions).encode()).hexdigest()
+    return f'page:{name}:{user}:{path}:{state}'
+
+
+def page_etag(key, timeout=PAGE_CACHE_TIMEOUT):
+    """ETag страницы: ключ уже содержит пользователя, адрес и версии.
+
+    Числа комментариев и просмотров в карточках теги не сбрасывают,
+    поэтому в ETag есть и номер интервала длиной timeout: устаревшая
+    копия у клиента живёт не дольше копии в кэше страниц.
+    """
+    bucket = int(time.time() // timeout)
+    return quote_etag(hashlib.md5(f'{key}:{bucket}'.encode()).hexdigest())
+
+
+def count(event, name):
+    key = f'{STATS_PREFIX}{event}:{name}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def page_cache_stats(names):
+    keys = {f'{STATS_PREFIX}{event}:{name}': (name, event)
+            for name in names for event in STATS_EVENTS}
+    found = cache.get_many(list(keys))
+    stats = {name: dict.fromkeys(STATS_EVENTS, 0) for name in names}
+    for key, value in found.items():
+        name, event = keys[key]
+        stats[name][event] = value
+    return stats
+
+
+def lock_key(key):
+    return f'lock:{key}'
+
+
+def wait_for(key):
+    """Ждёт, пока страницу соберёт воркер, взявший блокировку."""
+    deadline = time.time() + LOCK_WAIT
+    while time.time() < deadline:
+        time.sleep(LOCK_POLL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+    return None
+
+
+def cached_entry(key):
+    """Запись страницы и признак того, что блокировка взята этим воркером."""
+    entry = cache.get(key)
+    if entry is not None:
+        return entry, False
+    if cache.add(lock_key(key), 1, LOCK_TIMEOUT):
+        return None, True
+    return wait_for(key), False
+
+
+def cached_response(key, render):
+    """Страница из кэша или от render(lock) и событие hit/stale/miss."""
+    entry, locked = cached_entry(key)
+    if entry is None:
+        return render(locked), 'miss'
+    response, fresh_until = entry
+    if fresh_until > time.time():
+        return response, 'hit'
+    if cache.add(lock_key(key), 1, LOCK_TIMEOUT):
+        return render(True), 'miss'
+    return response, 'stale'
+
+
+def cache_tagged_page(tags, timeout=PAGE_CACHE_TIMEOUT,
+                      grace=PAGE_CACHE_GRACE):
+    """Кэширует страницу под ключом из версий тегов, которые вернул tags.
+
+    Сброс любого из тегов делает закэшированную страницу недостижимой,
+    остальные записи кэша не затрагиваются. После timeout страница ещё
+    grace секунд отдаётся как устаревшая, пока один воркер, взявший
+    блокировку в кэше, собирает свежую; остальные её не пересобирают.
+    ETag строится из ключа страницы: на If-None-Match с тем же значением
+    сразу уходит 304, без обращения к кэшу страниц и к view.
+    """
+    def decorator(view):
+        name = view.__name__
+
+        def render(request, key, lock, args, kwargs):
+            try:
+                response = view(request, *args, **kwargs)
+                if response.status_code == 200:
+                    cache.set(key, (response, time.time() + timeout),
+                              timeout + grace)
+                return response
+            finally:
+                if lock:
+                    cache.delete(lock_key(key))
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            names = tags(request, *args, **kwargs)
+            key = page_key(request, name, tag_versions(names))
+            etag = page_etag(key, timeout)
+            not_modified = get_conditional_response(request, etag=etag)
+            if not_modified is not None:
+                patch_vary_headers(not_modified, ('Cookie',))
+                return not_modified
+            response, event = cached_response(key, lambda lock: render(
+                request, key, lock, args, kwargs))
+            count(event, name)
+            response['X-Page-Cache'] = event
+            if response.status_code == 200:
+                response['ETag'] = etag
+                patch_vary_headers(response, ('Cookie',))
+            return response
+        return wrapper
+    return decorator
+
+
+def post_tags(post):
+    """Страницы, на которых виден пост: общая лента, группа и автор.
+
+    Ленты подписок адресуются версиями тегов своих авторов, поэтому пост
+    не сбрасывает тег каждого подписчика.
+    """
+    tags = ['index', f'author:{post.author.username}']
+    if post.group_id:
+        tags.append(f'group:{post.group.slug}')
+    return tags
+
+
+def subscription_tags(follow):
+    return [f'follow:{follow.user_id}', f'author:{follow.author.username}']
+
+
+def index_tags(request):
+    return ['index']
+
+
+def group_tags(request, slug):
+    return [f'group:{slug}']
+
+
+def profile_tags(request, username):
+    return [f'author:{username}', f'follow:{request.user.pk}']
+
+
+def follow_tags(request):
+    authors = Follow.objects.filter(user_id=request.user.pk).values_list(
+        'author__username', flat=True)
+    return [f'follow:{request.user.pk}'] + [
+        f'author:{username}' for username in authors]
+
+
+def post_state(request, post_id):
+    """Всё, от чего зависит страница поста, одним запросом по первичному
+    ключу; последний комментарий берётся по индексу (post, created), дата
+    расчёта похожих постов — по индексу (post, rank)."""
+    if not hasattr(request, 'post_states'):
+        request.post_states = {}
+    states = request.post_states
+    if post_id not in states:
+        states[post_id] = Post.objects.filter(pk=post_id).order_by(
+        ).annotate(
+            last_comment=Max('comments__created'),
+            related=Subquery(RelatedPost.objects.filter(
+                post=OuterRef('pk')).order_by('rank').values('computed')[:1]),
+        ).values_list(
+            'updated', 'comments_count', 'views_count', 'last_comment',
+            'related', 'author__first_name', 'author__last_name',
+            'author__stats__posts_count', 'group__title').first()
+    return states[post_id]
+
+
+def post_etag(request, post_id):
+    state = post_state(request, post_id)
+    if state is None:
+        return None
+    user = request.user.pk if request.user.is_authenticated else 0
+    parts = [str(user), request.get_full_path()]
+    parts += [str(value) for value in state]
+    return hashlib.md5('\n'.join(parts).encode()).hexdigest()
+
+
+def post_last_modified(request, post_id):
+    state = post_state(request, post_id)
+    if state is None:
+        return None
+    updated, last_comment = state[0], state[3]
+    return max(updated, last_comment) if last_comment else updated
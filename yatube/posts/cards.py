@@ -0,0 +1,57 @@
+"""Кэш отрендеренных карточек постов, общий для всех лент.
+
+Ключ карточки — id поста и отпечаток всего, что в ней показано: даты
+изменения, чисел комментариев и просмотров (с ещё не записанными из
+буфера), имени автора, группы и готовых вариантов картинки. Всё это уже
+загружено вместе со страницей, так что версия считается без запросов, а
+правка поста просто уводит ленты на новый ключ.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from django.utils.translation import get_language
+
+from .hits import view_count
+
+CARD_TEMPLATE = 'posts/includes/post_card.html'
+CARD_CACHE_TIMEOUT: int = 60 * 60 * 24
+
+
+def card_version(post):
+    author = post.author
+    group = post.group
+    parts = [
+        post.updated.isoformat() if post.updated else '',
+        str(post.comments_count),
+        str(view_count(post)),
+        author.username, author.get_full_name(),
+        f'{group.slug}:{group.title}' if group else '',
+        post.image.name,
+        ','.join(f'{variant.pk}:{variant.width}'
+                 for variant in post.image_variants.all()),
+        get_language() or '',
+    ]
+    return hashlib.md5('\n'.join(parts).encode()).hexdigest()
+
+
+def card_key(post):
+    return f'card:{post.pk}:{card_version(post)}'
+
+
+def render_cards(posts):
+    """HTML карточек в порядке posts: готовые берутся одним get_many,
+    рендерятся и кладутся одним set_many только недостающие."""
+    for post in posts:
+        post.total_views = view_count(post)
+    keys = [card_key(post) for post in posts]
+    found = cache.get_many(keys)
+    rendered = {}
+    for key, post in zip(keys, posts):
+        if key not in found:
+            rendered[key] = render_to_string(CARD_TEMPLATE, {'post': post})
+    if rendered:
+        cache.set_many(rendered, CARD_CACHE_TIMEOUT)
+        found.update(rendered)
+    return [mark_safe(found[key]) for key in keys]
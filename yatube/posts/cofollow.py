@@ -0,0 +1,133 @@
+"""Расчёт рекомендаций авторов по графу подписок и комментариев.
+
+Матрица взаимодействий A (пользователь × автор): подписка весит 1,
+комментарии к постам автора — COMMENT_WEIGHT * log(1 + их число).
+Сходство авторов — косинус их столбцов: S = Xᵀ X, где X — это A с
+нормированными столбцами. Оценки пользователя — его строка A, умноженная
+на S; авторы, на которых он уже подписан, и он сам отбрасываются. Если
+кандидатов меньше top, список добивается самыми популярными авторами.
+Пользователи обрабатываются пачками строк, в одном процессе или в пуле.
+"""
+from multiprocessing import Pool
+
+import numpy as np
+from django.db.models import Count, F
+from scipy import sparse
+
+from .models import Comment, Follow
+from .vectors import normalize_rows, top_k, without
+
+COMMENT_WEIGHT: float = 0.5
+
+
+class Graph:
+    """Матрицы подписок и взаимодействий над общим списком id."""
+
+    def __init__(self, ids, follows, interactions):
+        self.ids = ids
+        self.follows = follows
+        self.interactions = interactions
+
+    def rows(self, user_ids):
+        """Номера строк пользователей; -1 для тех, кого нет в графе."""
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        rows = np.searchsorted(self.ids, user_ids)
+        rows[rows >= len(self.ids)] = 0
+        found = self.ids[rows] == user_ids if len(self.ids) else rows < 0
+        return np.where(found, rows, -1)
+
+
+def edges(rows, columns=3):
+    return np.array(list(rows), dtype=np.float64).reshape(-1, columns)
+
+
+def load_graph():
+    follows = edges(Follow.objects.values_list('user_id', 'author_id'), 2)
+    comments = edges(
+        Comment.objects.exclude(author=F('post__author')).order_by()
+        .values('author_id', 'post__author_id').annotate(total=Count('pk'))
+        .values_list('author_id', 'post__author_id', 'total'))
+    ids = np.unique(np.concatenate(
+        [follows.ravel(), comments[:, :2].ravel()])).astype(np.int64)
+    size = len(ids)
+
+    def matrix(pairs, weights):
+        rows = np.searchsorted(ids, pairs[:, 0].astype(np.int64))
+        cols = np.searchsorted(ids, pairs[:, 1].astype(np.int64))
+        return sparse.csr_matrix((weights, (rows, cols)),
+                                 shape=(size, size))
+
+    follow_matrix = matrix(follows, np.ones(len(follows)))
+    comment_matrix = matrix(
+        comments, COMMENT_WEIGHT * np.log1p(comments[:, 2]))
+    return Graph(ids, follow_matrix, follow_matrix + comment_matrix)
+
+
+def similarity(matrix):
+    """Косинусное сходство столбцов разреженной матрицы."""
+    columns = normalize_rows(matrix.T)
+    return (columns @ columns.T).tocsr()
+
+
+def popular(graph, size):
+    followers = np.asarray(graph.follows.sum(axis=0)).ravel()
+    order = np.argsort(-followers, kind='stable')
+    return order[followers[order] > 0][:size]
+
+
+_state = None
+
+
+def init_worker(graph, scores_matrix, fallback, top):
+    global _state
+    _state = (graph, scores_matrix, fallback, top)
+
+
+def recommend_rows(rows):
+    """Для каждой строки графа — номера столбцов рекомендованных авторов."""
+    graph, scores_matrix, fallback, top = _state
+    rows = np.asarray(rows)
+    scores = (graph.interactions[rows] @ scores_matrix).tocsr()
+    seen = graph.follows[rows].astype(bool) + sparse.csr_matrix(
+        (np.ones(len(rows), dtype=bool), (np.arange(len(rows)), rows)),
+        shape=scores.shape)
+    scores = without(scores, seen)
+    result = []
+    for index, row in enumerate(rows):
+        chosen = list(top_k(scores, index, top)[0])
+        if len(chosen) < top:
+            excluded = set(chosen) | set(seen[index].indices)
+            chosen += [column for column in fallback
+                       if column not in excluded][:top - len(chosen)]
+        result.append(chosen)
+    return result
+
+
+def recommend(user_ids, top=10, chunk_size=2000, processes=1):
+    """Словарь «id пользователя → id авторов» по убыванию сходства."""
+    graph = load_graph()
+    fallback = list(popular(graph, top * 3))
+    rows = graph.rows(user_ids)
+    known = [row for row in rows if row >= 0]
+    chunks = [known[start:start + chunk_size]
+              for start in range(0, len(known), chunk_size)]
+    args = (graph, similarity(graph.interactions), fallback, top)
+    if processes <= 1 or len(chunks) <= 1:
+        init_worker(*args)
+        columns = [result for chunk in chunks
+                   for result in recommend_rows(chunk)]
+    else:
+        with Pool(processes, initializer=init_worker,
+                  initargs=args) as pool:
+            columns = [result for chunk in pool.map(recommend_rows, chunks)
+                       for result in chunk]
+    by_row = dict(zip(known, columns))
+    ids = graph.ids
+    recommendations = {}
+    for user_id, row in zip(user_ids, rows):
+        if row >= 0:
+            chosen = by_row[row]
+        else:
+            chosen = fallback[:top]
+        recommendations[user_id] = [int(ids[column]) for column in chosen]
+    return recommendations
@@ -0,0 +1,92 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from .models import AuthorStats, Comment, Follow, Post
+
+
+def grouped_counts(queryset, field, ids):
+    return dict(
+        queryset.filter(**{f'{field}__in': ids}).order_by().values(field)
+        .annotate(total=Count('pk')).values_list(field, 'total')
+    )
+
+
+def author_counts(user_ids):
+    """Точные значения счётчиков для пачки пользователей."""
+    posts = grouped_counts(Post.objects, 'author', user_ids)
+    followers = grouped_counts(Follow.objects, 'author', user_ids)
+    following = grouped_counts(Follow.objects, 'user', user_ids)
+    return {
+        pk: {
+            'posts_count': posts.get(pk, 0),
+            'followers_count': followers.get(pk, 0),
+            'following_count': following.get(pk, 0),
+        }
+        for pk in user_ids
+    }
+
+
+def shifted(deltas):
+    return {field: Greatest(F(field) + delta, 0)
+            for field, delta in deltas.items()}
+
+
+def change_author_stats(user_id, **deltas):
+    """Сдвигает счётчики автора, создавая строку по точному подсчёту."""
+    stats = AuthorStats.objects.filter(user_id=user_id)
+    if stats.update(**shifted(deltas)):
+        return
+    if any(delta < 0 for delta in deltas.values()):
+        return
+    try:
+        with transaction.atomic():
+            AuthorStats.objects.create(
+                user_id=user_id, **author_counts([user_id])[user_id])
+    except IntegrityError:
+        stats.update(**shifted(deltas))
+
+
+def change_comments_count(post_id, delta):
+    Post.objects.filter(pk=post_id).update(**shifted(
+        {'comments_count': delta}))
+
+
+def reconcile_authors(user_ids):
+    """Исправляет расхождения счётчиков авторов, возвращает их число."""
+    with transaction.atomic():
+        current = {
+            stats.user_id: stats for stats in
+            AuthorStats.objects.select_for_update().filter(
+                user_id__in=user_ids)
+        }
+        fixed, missing = [], []
+        for pk, counts in author_counts(user_ids).items():
+            stats = current.get(pk)
+            if stats is None:
+                missing.append(AuthorStats(user_id=pk, **counts))
+                continue
+            if any(getattr(stats, field) != value
+                   for field, value in counts.items()):
+                for field, value in counts.items():
+                    setattr(stats, field, value)
+                fixed.append(stats)
+        AuthorStats.objects.bulk_create(missing)
+        AuthorStats.objects.bulk_update(
+            fixed, ['posts_count', 'followers_count', 'following_count'])
+    return len(fixed) + len(missing)
+
+
+def reconcile_posts(post_ids):
+    with transaction.atomic():
+        posts = list(Post.objects.select_for_update().filter(
+            pk__in=post_ids).only('pk', 'comments_count'))
+        counts = grouped_counts(Comment.objects, 'post', post_ids)
+        fixed = []
+        for post in posts:
+            total = counts.get(post.pk, 0)
+            if post.comments_count != total:
+                post.comments_count = total
+                fixed.append(post)
+        Post.objects.bulk_update(fixed, ['comments_count'])
+    return len(fixed)
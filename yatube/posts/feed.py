@@ -0,0 +1,124 @@
+from django.conf import settings
+from django.db.models import Q
+
+from .models import AuthorStats, FeedEntry, Follow, Post
+from .utils import CursorPaginator, keyset
+
+BULK_BATCH_SIZE: int = 500
+
+
+def is_popular(author_id):
+    return AuthorStats.objects.filter(
+        user_id=author_id,
+        followers_count__gt=settings.FEED_FANOUT_LIMIT).exists()
+
+
+def fan_out(post):
+    """Кладёт новый пост в ленты подписчиков автора и отмечает его.
+
+    Выполняется фоновой задачей; пока пост не отмечен, ленты подписчиков
+    читают его прямо из постов.
+    """
+    if settings.FEED_INBOX_ENABLED and not is_popular(post.author_id):
+        followers = Follow.objects.filter(
+            author_id=post.author_id).values_list('user_id', flat=True)
+        FeedEntry.objects.bulk_create(
+            [FeedEntry(user_id=user_id, post_id=post.pk,
+                       author_id=post.author_id, pub_date=post.pub_date)
+             for user_id in followers.iterator()],
+            batch_size=BULK_BATCH_SIZE, ignore_conflicts=True)
+    Post.objects.filter(pk=post.pk).update(fanned_out=True)
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту подписчика последние посты нового автора."""
+    if not settings.FEED_INBOX_ENABLED or is_popular(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-id').values_list('pk', 'pub_date')
+    FeedEntry.objects.bulk_create(
+        [FeedEntry(user_id=user_id, post_id=pk, author_id=author_id,
+                   pub_date=pub_date)
+         for pk, pub_date in posts[:settings.FEED_BACKFILL_SIZE]],
+        batch_size=BULK_BATCH_SIZE, ignore_conflicts=True)
+
+
+def left_popular(author_id):
+    """Автор только что опустился до FEED_FANOUT_LIMIT подписчиков."""
+    return settings.FEED_INBOX_ENABLED and AuthorStats.objects.filter(
+        user_id=author_id,
+        followers_count=settings.FEED_FANOUT_LIMIT).exists()
+
+
+def backfill_followers(author_id):
+    """Раскладывает последние посты автора по ящикам всех подписчиков.
+
+    Нужна, когда автор перестаёт быть популярным: посты, написанные сверх
+    предела, в ящики не попали, а напрямую лента их больше не читает.
+    """
+    if not settings.FEED_INBOX_ENABLED or is_popular(author_id):
+        return
+    posts = list(Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-id').values_list('pk', 'pub_date')[
+        :settings.FEED_BACKFILL_SIZE])
+    followers = Follow.objects.filter(
+        author_id=author_id).values_list('user_id', flat=True)
+    for user_id in followers.iterator():
+        FeedEntry.objects.bulk_create(
+            [FeedEntry(user_id=user_id, post_id=pk, author_id=author_id,
+                       pub_date=pub_date) for pk, pub_date in posts],
+            batch_size=BULK_BATCH_SIZE, ignore_conflicts=True)
+
+
+def trim(user_id, author_id):
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+class FeedPaginator(CursorPaginator):
+    """Лента подписок: ящик пользователя плюс посты популярных авторов
+    и посты, ещё не разложенные по ящикам.
+
+    Ключи записей ящика совпадают с ключами постов (pub_date, id), поэтому
+    обе выборки сливаются в одну ленту с общими курсорами.
+    """
+
+    def __init__(self, user, per_page, posts):
+        self.user = user
+        self.posts = posts
+        entries = FeedEntry.objects.filter(user=user).order_by(
+            '-pub_date', '-post_id')
+        super().__init__(entries, per_page)
+
+    def fetch(self, values, forward, limit, offset=0):
+        descending = self.newest_first == forward
+        inbox = keyset(self.object_list, ('pub_date', 'post_id'),
+                       values, descending)
+        keys = set(inbox.values_list('pub_date', 'post_id')[:offset + limit])
+        followed = Follow.objects.filter(user=self.user)
+        popular = followed.filter(
+            author__stats__followers_count__gt=settings.FEED_FANOUT_LIMIT
+        ).values_list('author_id', flat=True)
+        pending = Q(fanned_out=False,
+                    author_id__in=followed.values_list('author_id'))
+        posts = keyset(Post.objects.filter(Q(author_id__in=popular) | pending),
+                       self.keys, values, descending)
+        keys.update(posts.values_list('pub_date', 'id')[:offset + limit])
+        keys = sorted(keys, reverse=descending)[offset:offset + limit]
+        found = self.posts.in_bulk([pk for pub_date, pk in keys])
+        return [found[pk] for pub_date, pk in keys if pk in found]
+
+
+def follow_feed_paginator(user, per_page, posts=None):
+    """Пагинатор ленты подписок; posts — выборка, из которой берутся
+    сами посты (по умолчанию с автором, группой и картинками)."""
+    if posts is None:
+        posts = Post.objects.select_related(
+            'author', 'group').prefetch_related('image_variants')
+    if settings.FEED_INBOX_ENABLED:
+        return FeedPaginator(user, per_page, posts)
+    return CursorPaginator(
+        posts.filter(author__following__user=user), per_page)
+
+
+def follow_feed_page(request, per_page):
+    return follow_feed_paginator(request.user, per_page).get_page(request)
@@ -19,7 +19,14 @@ class CommentForm(forms.ModelForm):
 
     class Meta:
         model = Comment
-        fields = ['text']
+        fields = ['text', 'parent']
         labels = {
             'text': 'Текст комментария'
         }
+        widgets = {'parent': forms.HiddenInput}
+
+    def __init__(self, *args, post=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Отвечать можно только на комментарии того же поста.
+        if post is not None:
+            self.fields['parent'].queryset = post.comments.exclude(path='')
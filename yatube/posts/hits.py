@@ -0,0 +1,125 @@
+"""Буферизованные счётчики просмотров постов.
+
+Просмотр не пишет в базу: он увеличивает счётчик в памяти процесса, а
+накопленное уходит в базу одним UPDATE ... CASE на пачку постов раз в
+VIEW_FLUSH_INTERVAL секунд или когда в буфере VIEW_FLUSH_SIZE постов.
+По времени буфер сбрасывает фоновый поток процесса: буфер живёт в памяти
+веб-процесса, и исполнитель очереди до него не дотянется. Если процесс
+упадёт, теряются только просмотры с последней записи.
+Повторный просмотр того же поста той же сессией (пользователем, а без
+сессии — адресом и браузером) в течение VIEW_DEDUP_TIMEOUT не считается.
+"""
+import atexit
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, close_old_connections
+from django.db.models import Case, F, PositiveIntegerField, Value, When
+
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+VIEW_BATCH_SIZE: int = 500
+
+
+class ViewBuffer:
+    """Несохранённые просмотры процесса: {id поста: число}."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = Counter()
+        self.flushed = time.monotonic()
+        self.flusher_pid = None
+
+    def add(self, post_id):
+        with self.lock:
+            self.start()
+            self.pending[post_id] += 1
+            due = (len(self.pending) >= settings.VIEW_FLUSH_SIZE
+                   or time.monotonic() - self.flushed
+                   >= settings.VIEW_FLUSH_INTERVAL)
+        if due:
+            self.flush()
+
+    def get(self, post_id):
+        with self.lock:
+            return self.pending.get(post_id, 0)
+
+    def take(self):
+        with self.lock:
+            pending, self.pending = self.pending, Counter()
+            self.flushed = time.monotonic()
+        return pending
+
+    def flush(self):
+        pending = self.take()
+        if not pending:
+            return
+        try:
+            write_views(pending)
+        except DatabaseError:
+            logger.exception('Просмотры не записаны, остаются в буфере')
+            with self.lock:
+                self.pending.update(pending)
+
+    def start(self):
+        # Поток заводится при первом просмотре в каждом процессе: после
+        # fork поток родителя в дочернем процессе не работает.
+        if (self.flusher_pid == os.getpid()
+                or not settings.VIEW_FLUSH_BACKGROUND):
+            return
+        self.flusher_pid = os.getpid()
+        threading.Thread(target=self.run, name='view-flusher',
+                         daemon=True).start()
+
+    def run(self):
+        while True:
+            time.sleep(settings.VIEW_FLUSH_INTERVAL)
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+
+buffer = ViewBuffer()
+atexit.register(buffer.flush)
+
+
+def write_views(counts):
+    items = sorted(counts.items())
+    for start in range(0, len(items), VIEW_BATCH_SIZE):
+        batch = items[start:start + VIEW_BATCH_SIZE]
+        Post.objects.filter(pk__in=[pk for pk, _ in batch]).update(
+            views_count=F('views_count') + Case(
+                *[When(pk=pk, then=Value(count)) for pk, count in batch],
+                default=Value(0), output_field=PositiveIntegerField()))
+
+
+def viewer(request):
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    if request.session.session_key:
+        return f'session:{request.session.session_key}'
+    meta = request.META
+    return (f"client:{meta.get('REMOTE_ADDR', '')}:"
+            f"{meta.get('HTTP_USER_AGENT', '')}")
+
+
+def record_view(request, post_id):
+    """Засчитывает просмотр, если этот зритель недавно пост не видел."""
+    seen = hashlib.md5(viewer(request).encode()).hexdigest()
+    if cache.add(f'views:seen:{seen}:{post_id}', 1,
+                 settings.VIEW_DEDUP_TIMEOUT):
+        buffer.add(post_id)
+
+
+def view_count(post):
+    """Сохранённые просмотры поста вместе с ещё не записанными."""
+    return post.views_count + buffer.get(post.pk)
@@ -0,0 +1,106 @@
+import json
+import subprocess
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.benchmark import (DEFAULT_MIX, HttpUser, InProcessUser, compare,
+                             run, serve, stop_server, wait_for_server)
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name not in DEFAULT_MIX:
+            raise CommandError(f'Неизвестная страница: {name}')
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+            text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ('Нагружает страницы постов смесью запросов и сохраняет '
+            'задержки, пропускную способность и число SQL-запросов. '
+            'Пишет в базу комментарии и подписки — запускайте на базе, '
+            'заполненной seed_blog.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=8,
+                            help='сколько пользователей ходят одновременно')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='запросов на одного пользователя')
+        parser.add_argument('--duration', type=float,
+                            help='остановиться через столько секунд')
+        parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX,
+                            help='веса страниц: index=30,post_detail=20')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--url', help='адрес уже запущенного сервера')
+        parser.add_argument('--serve', type=int, metavar='WORKERS',
+                            help='поднять сервер из WORKERS процессов')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--output', help='куда сохранить отчёт в JSON')
+        parser.add_argument('--compare', metavar='BASELINE',
+                            help='сравнить с сохранённым отчётом')
+        parser.add_argument('--tolerance', type=float, default=20.0,
+                            help='допустимое ухудшение при сравнении, %%')
+
+    def handle(self, *args, **options):
+        url = options['url']
+        pids = []
+        if options['serve']:
+            url = f'http://127.0.0.1:{options["port"]}'
+            pids = serve('127.0.0.1', options['port'], options['serve'])
+        try:
+            if url:
+                wait_for_server(url)
+                mode = 'http'
+
+                def make_user(user_id):
+                    return HttpUser(user_id, url)
+            else:
+                mode = 'in-process'
+                make_user = InProcessUser
+            report = run(make_user, options['mix'], options['concurrency'],
+                         options['requests'], options['duration'],
+                         options['seed'])
+        finally:
+            stop_server(pids)
+        report['meta'] = {
+            'mode': mode, 'url': url, 'workers': options['serve'],
+            'concurrency': options['concurrency'],
+            'requests_per_user': options['requests'],
+            'duration': options['duration'], 'mix': options['mix'],
+            'seed': options['seed'], 'commit': git_commit(),
+        }
+        self.print_report(report)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                lines, worse = compare(json.load(file), report,
+                                       options['tolerance'])
+            for line in lines:
+                self.stdout.write(line)
+            if worse:
+                raise CommandError('Есть ухудшения сверх допуска')
+
+    def print_report(self, report):
+        rows = [('всего', report['total'])] + list(report['views'].items())
+        self.stdout.write(
+            f'{"страница":<16}{"запросов":>9}{"ошибок":>8}{"rps":>9}'
+            f'{"p50":>9}{"p95":>9}{"p99":>9}{"SQL":>7}')
+        for name, row in rows:
+            self.stdout.write(
+                f'{name:<16}{row["requests"]:>9}{row["errors"]:>8}'
+                f'{row["rps"] or 0:>9}{row["p50_ms"] or 0:>9}'
+                f'{row["p95_ms"] or 0:>9}{row["p99_ms"] or 0:>9}'
+                f'{row["queries_mean"] or "-":>7}')
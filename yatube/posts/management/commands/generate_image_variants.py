@@ -0,0 +1,47 @@
+import os
+from multiprocessing import Pool
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from posts.models import Post
+from posts.thumbnails import generate_thumbnails
+
+
+def generate(post_id):
+    try:
+        generate_thumbnails(post_id)
+    except Exception as error:
+        return post_id, str(error)
+    finally:
+        close_old_connections()
+    return post_id, None
+
+
+class Command(BaseCommand):
+    help = 'Готовит варианты картинок постов для srcset'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int,
+                            default=os.cpu_count())
+        parser.add_argument('--all', action='store_true',
+                            help='пересоздать и уже готовые варианты')
+
+    def handle(self, *args, processes, **options):
+        posts = Post.objects.exclude(image='').order_by('pk')
+        if not options['all']:
+            posts = posts.filter(image_variants__isnull=True)
+        post_ids = list(posts.values_list('pk', flat=True).distinct())
+        # Дочерние процессы не должны унаследовать открытое соединение.
+        connections.close_all()
+        done = failed = 0
+        with Pool(processes) as pool:
+            for post_id, error in pool.imap_unordered(
+                    generate, post_ids, chunksize=8):
+                if error is None:
+                    done += 1
+                else:
+                    failed += 1
+                    self.stderr.write(f'Пост {post_id}: {error}')
+        self.stdout.write(
+            f'Готово картинок: {done}, с ошибками: {failed}')
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from posts.caching import STATS_EVENTS, page_cache_stats
+
+CACHED_VIEWS = ('index', 'group_posts', 'profile', 'follow_index')
+
+
+class Command(BaseCommand):
+    help = 'Показывает попадания, промахи и устаревшие ответы кэша страниц'
+
+    def handle(self, *args, **options):
+        for name, stats in page_cache_stats(CACHED_VIEWS).items():
+            line = ' '.join(f'{event}={stats[event]}'
+                            for event in STATS_EVENTS)
+            self.stdout.write(f'{name}: {line}')
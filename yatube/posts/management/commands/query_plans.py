@@ -0,0 +1,128 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Group, Post
+from posts.seeding import Seeder, run_chunks
+from posts.utils import keyset
+from posts.views import COMMENTS_PER_PAGE, POST_PER_PAGE
+
+INDEXED_MODELS = (Post, Comment, Follow)
+KEYS = ('pub_date', 'id')
+
+
+def seed(options):
+    seeder = Seeder(options['seed'], timezone.now())
+    seeder.create_users(options['users'])
+    seeder.create_groups(options['groups'])
+    seeder.load_ids()
+    run_chunks(seeder, 'create_posts', options['posts'])
+    run_chunks(seeder, 'create_follows', options['users'])
+    seeder.load_post_ids()
+    run_chunks(seeder, 'create_comments', options['comments'])
+
+
+def view_queries():
+    """Запросы, которые делают страницы сайта, на типичных данных."""
+    author = Post.objects.values_list('author', flat=True).first()
+    reader = Follow.objects.values_list('user', flat=True).first()
+    group = Group.objects.order_by('pk').first()
+    post = Comment.objects.values_list('post', flat=True).first()
+    middle = Post.objects.order_by('-pub_date', '-id').values_list(
+        'pub_date', 'id')[Post.objects.count() // 2]
+    page = POST_PER_PAGE + 1
+    posts = Post.objects.all()
+    return {
+        'index': keyset(posts, KEYS)[:page],
+        'index_after': keyset(posts, KEYS, middle)[:page],
+        'group_list': keyset(posts.filter(group=group), KEYS)[:page],
+        'profile': keyset(posts.filter(author=author), KEYS)[:page],
+        'follow_index': keyset(
+            posts.filter(author__following__user=reader), KEYS)[:page],
+        'post_detail_comments': keyset(
+            Comment.objects.filter(post=post), ('created', 'id'),
+            descending=False)[:COMMENTS_PER_PAGE + 1],
+        'followers': Follow.objects.filter(author=author),
+        'is_following': Follow.objects.filter(user=reader, author=author),
+    }
+
+
+def measure(queries, repeat):
+    results = {}
+    for name, queryset in queries.items():
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            list(queryset.all())
+            timings.append((time.perf_counter() - started) * 1000)
+        results[name] = {'ms': round(statistics.median(timings), 3),
+                         'plan': queryset.explain()}
+    return results
+
+
+def declared_indexes():
+    return [(model, index) for model in INDEXED_MODELS
+            for index in model._meta.indexes]
+
+
+class Command(BaseCommand):
+    help = ('Во временной базе сравнивает планы и время запросов страниц '
+            'без составных индексов и с ними')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=50000)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--comments', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', help='файл для отчёта в JSON')
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False)
+        try:
+            report = self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+        for name, after in report['after'].items():
+            before = report['before'][name]
+            self.stdout.write(
+                f'{name}: {before["ms"]} мс -> {after["ms"]} мс')
+            for label, plan in (('было', before['plan']),
+                                ('стало', after['plan'])):
+                lines = plan.splitlines()
+                self.stdout.write(f'  {label}: {lines[0]}')
+                for line in lines[1:]:
+                    self.stdout.write(f'         {line}')
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+
+    def run(self, options):
+        seed(options)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        queries = view_queries()
+        indexes = declared_indexes()
+        with connection.schema_editor() as editor:
+            for model, index in indexes:
+                editor.remove_index(model, index)
+        before = measure(queries, options['repeat'])
+        with connection.schema_editor() as editor:
+            for model, index in indexes:
+                editor.add_index(model, index)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        after = measure(queries, options['repeat'])
+        settings = {key: options[key] for key in (
+            'posts', 'users', 'groups', 'comments', 'repeat', 'seed')}
+        return {'options': settings,
+                'vendor': connection.vendor,
+                'indexes': [index.name for model, index in indexes],
+                'before': before, 'after': after}
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.feed import backfill
+from posts.models import FeedEntry, Follow, Post
+from posts.utils import pk_batches
+
+
+class Command(BaseCommand):
+    help = 'Заново раскладывает посты по лентам подписчиков'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, batch_size, **options):
+        FeedEntry.objects.all().delete()
+        follows = 0
+        for ids in pk_batches(Follow.objects, batch_size):
+            with transaction.atomic():
+                for user_id, author_id in Follow.objects.filter(
+                        pk__in=ids).values_list('user_id', 'author_id'):
+                    backfill(user_id, author_id)
+            follows += len(ids)
+        Post.objects.filter(fanned_out=False).update(fanned_out=True)
+        self.stdout.write(f'Ленты пересобраны по подпискам: {follows}')
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Post
+from posts.search import clear_index, index_posts
+from posts.utils import pk_batches
+
+
+class Command(BaseCommand):
+    help = 'Заново строит полнотекстовый индекс постов пачками'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--keep', action='store_true',
+                            help='не очищать индекс перед построением')
+
+    def handle(self, *args, batch_size, keep, **options):
+        if not keep:
+            clear_index()
+        indexed = 0
+        for ids in pk_batches(Post.objects, batch_size):
+            with transaction.atomic():
+                index_posts(ids)
+            indexed += len(ids)
+        self.stdout.write(f'Проиндексировано постов: {indexed}')
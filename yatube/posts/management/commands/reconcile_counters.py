@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import reconcile_authors, reconcile_posts
+from posts.models import Post, User
+from posts.utils import pk_batches
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов, подписок и комментариев'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, batch_size, **options):
+        authors = sum(reconcile_authors(ids)
+                      for ids in pk_batches(User.objects, batch_size))
+        posts = sum(reconcile_posts(ids)
+                    for ids in pk_batches(Post.objects, batch_size))
+        self.stdout.write(
+            f'Исправлено счётчиков: авторов {authors}, постов {posts}')
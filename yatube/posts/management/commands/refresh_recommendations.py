@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from posts.caching import invalidate
+from posts.cofollow import recommend
+from posts.models import Recommendations, User
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает рекомендации авторов по совместным подпискам '
+            'для пользователей с устаревшим или отсутствующим списком')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='пересчитать всех пользователей')
+        parser.add_argument('--top', type=int, default=10)
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='строк матрицы на одну задачу пула')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='строк таблицы на одну транзакцию')
+        parser.add_argument('--processes', type=int, default=1)
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(is_active=True)
+        if not options['all']:
+            users = users.filter(Q(recommendations__isnull=True)
+                                 | Q(recommendations__stale=True))
+        user_ids = list(users.order_by('pk').values_list('pk', flat=True))
+        if user_ids:
+            result = recommend(user_ids, options['top'],
+                               options['chunk_size'], options['processes'])
+            self.save(result, options['batch_size'])
+        self.stdout.write(f'Рекомендации пересчитаны: {len(user_ids)}')
+
+    def save(self, result, batch_size):
+        user_ids = list(result)
+        for start in range(0, len(user_ids), batch_size):
+            batch = user_ids[start:start + batch_size]
+            with transaction.atomic():
+                Recommendations.objects.filter(user_id__in=batch).delete()
+                Recommendations.objects.bulk_create(
+                    [Recommendations(
+                        user_id=user_id, stale=False,
+                        authors=','.join(map(str, result[user_id])))
+                     for user_id in batch])
+            invalidate([f'follow:{user_id}' for user_id in batch])
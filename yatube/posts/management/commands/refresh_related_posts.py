@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from posts.similarity import RELATED_TOP, pending, refresh
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает похожие посты для новых и изменённых постов, '
+            'а с --all — для всех')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='пересчитать все посты')
+        parser.add_argument('--top', type=int, default=RELATED_TOP)
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='строк матрицы сходства за один шаг')
+
+    def handle(self, *args, **options):
+        post_ids = None
+        if not options['all']:
+            post_ids = pending()
+        written = 0
+        if post_ids is None or post_ids:
+            written = refresh(post_ids, options['top'],
+                              options['chunk_size'])
+        self.stdout.write(f'Списки похожих постов обновлены: {written}')
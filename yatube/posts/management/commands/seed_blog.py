@@ -0,0 +1,64 @@
+import datetime
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from posts.seeding import Seeder, run_chunks
+from posts.threads import fill_root_paths
+
+
+class Command(BaseCommand):
+    help = ('Создаёт синтетических пользователей, группы, посты, '
+            'комментарии и подписки для нагрузочных проверок')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=30000)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--days', type=int, default=365,
+                            help='за сколько дней до --end разбросать посты')
+        parser.add_argument('--end', type=datetime.date.fromisoformat,
+                            default=datetime.date(2024, 1, 1),
+                            help='дата самого позднего поста, ГГГГ-ММ-ДД')
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--processes', type=int, default=1)
+        parser.add_argument('--skip-derived', action='store_true',
+                            help='не пересчитывать счётчики, ленты и '
+                                 'поисковый индекс')
+
+    def handle(self, *args, **options):
+        processes = options['processes']
+        if connection.vendor == 'sqlite' and processes > 1:
+            self.stderr.write('SQLite не принимает параллельную запись, '
+                              'данные создаются в одном процессе')
+            processes = 1
+        end = datetime.datetime.combine(
+            options['end'], datetime.time(), tzinfo=timezone.utc)
+        seeder = Seeder(options['seed'], end, options['days'],
+                        options['chunk_size'])
+        seeder.create_users(options['users'])
+        seeder.create_groups(options['groups'])
+        seeder.load_ids()
+        self.report('пользователей', len(seeder.user_ids))
+        self.report('групп', len(seeder.group_ids))
+        self.report('постов', run_chunks(
+            seeder, 'create_posts', options['posts'], processes))
+        self.report('подписок', run_chunks(
+            seeder, 'create_follows', len(seeder.user_ids), processes))
+        seeder.load_post_ids()
+        if seeder.post_ids:
+            self.report('комментариев', run_chunks(
+                seeder, 'create_comments', options['comments'], processes))
+            # Без пути комментарий не становится корнем своей ветки.
+            fill_root_paths()
+        if not options['skip_derived']:
+            call_command('reconcile_counters', stdout=self.stdout)
+            call_command('rebuild_feeds', stdout=self.stdout)
+            call_command('rebuild_search_index', stdout=self.stdout)
+
+    def report(self, label, amount):
+        self.stdout.write(f'Создано {label}: {amount}')
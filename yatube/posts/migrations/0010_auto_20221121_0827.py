@@ -1,17 +0,0 @@
-# Generated by Django 3.0 on 2022-11-21 08:27
-
-from django.db import migrations, models
-
-
-class Migration(migrations.Migration):
-
-    dependencies = [
-        ('posts', '0009_auto_20220919_2341'),
-    ]
-
-    operations = [
-        migrations.AddConstraint(
-            model_name='follow',
-            constraint=models.UniqueConstraint(fields=('user', 'author'), name='unique_sub'),
-        ),
-    ]
@@ -0,0 +1,74 @@
+# Generated by Django 3.0 on 2026-10-18 16:11
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+BATCH_SIZE = 1000
+
+
+def grouped_counts(queryset, field, ids):
+    return dict(
+        queryset.filter(**{f'{field}__in': ids}).order_by().values(field)
+        .annotate(total=Count('pk')).values_list(field, 'total')
+    )
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    Follow = apps.get_model('posts', 'Follow')
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    user_ids = list(User.objects.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(user_ids), BATCH_SIZE):
+        ids = user_ids[start:start + BATCH_SIZE]
+        posts = grouped_counts(Post.objects, 'author', ids)
+        followers = grouped_counts(Follow.objects, 'author', ids)
+        following = grouped_counts(Follow.objects, 'user', ids)
+        AuthorStats.objects.bulk_create([
+            AuthorStats(user_id=pk,
+                        posts_count=posts.get(pk, 0),
+                        followers_count=followers.get(pk, 0),
+                        following_count=following.get(pk, 0))
+            for pk in ids
+        ])
+    post_ids = list(
+        Comment.objects.order_by('post').values_list('post', flat=True)
+        .distinct())
+    for start in range(0, len(post_ids), BATCH_SIZE):
+        ids = post_ids[start:start + BATCH_SIZE]
+        for post_id, total in grouped_counts(
+                Comment.objects, 'post', ids).items():
+            Post.objects.filter(pk=post_id).update(comments_count=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0010_auto_20220925_2156'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Постов')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Подписок')),
+            ],
+            options={
+                'verbose_name': 'Счётчики автора',
+                'verbose_name_plural': 'Счётчики авторов',
+            },
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Комментариев'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations
+
+SEARCH_TABLE = 'posts_search'
+CREATE_SQL = {
+    'sqlite': [
+        f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+        f"body, tokenize='unicode61 remove_diacritics 0')",
+    ],
+    'postgresql': [
+        f'CREATE TABLE {SEARCH_TABLE} ('
+        f'post_id integer PRIMARY KEY, document tsvector NOT NULL)',
+        f'CREATE INDEX {SEARCH_TABLE}_document_idx '
+        f'ON {SEARCH_TABLE} USING GIN (document)',
+    ],
+}
+
+
+def create_search_table(apps, schema_editor):
+    for sql in CREATE_SQL.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor in CREATE_SQL:
+        schema_editor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+class Migration(migrations.Migration):
+    """Таблица полнотекстового индекса постов.
+
+    Заполняется командой rebuild_search_index, дальше обновляется
+    сигналами при сохранении и удалении постов.
+    """
+
+    dependencies = [
+        ('posts', '0013_image_variants'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.0 on 2026-10-18 16:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0016_post_updated'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Recommendations',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='recommendations', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('authors', models.TextField(blank=True, help_text='id авторов через запятую', verbose_name='Авторы')),
+                ('stale', models.BooleanField(default=True, verbose_name='Устарели')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Дата расчёта')),
+            ],
+            options={
+                'verbose_name': 'Рекомендации',
+                'verbose_name_plural': 'Рекомендации',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='recommendations',
+            index=models.Index(fields=['stale'], name='recommendations_stale_idx'),
+        ),
+    ]
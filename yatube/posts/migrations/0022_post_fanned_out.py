@@ -0,0 +1,29 @@
+# Generated by Django 3.0 on 2026-10-18 17:33
+
+from django.db import migrations, models
+
+
+def mark_fanned_out(apps, schema_editor):
+    # Прежние посты раскладывались по лентам при публикации.
+    Post = apps.get_model('posts', 'Post')
+    Post.objects.update(fanned_out=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0021_comment_threads'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='fanned_out',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Разложен по лентам'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(fanned_out=False), fields=['-pub_date', '-id'], name='post_fanout_pending_idx'),
+        ),
+        migrations.RunPython(mark_fanned_out, migrations.RunPython.noop),
+    ]
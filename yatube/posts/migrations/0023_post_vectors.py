@@ -0,0 +1,31 @@
+# Generated by Django 3.0 on 2026-10-18 17:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0022_post_fanned_out'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostVector',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='vector', serialize=False, to='posts.Post')),
+                ('columns', models.BinaryField(verbose_name='Столбцы признаков')),
+                ('weights', models.BinaryField(verbose_name='Веса признаков')),
+                ('stale', models.BooleanField(default=True, verbose_name='Соседи не посчитаны')),
+            ],
+            options={
+                'verbose_name': 'Признаки поста',
+                'verbose_name_plural': 'Признаки постов',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='postvector',
+            index=models.Index(fields=['stale'], name='post_vector_stale_idx'),
+        ),
+    ]
@@ -1,9 +1,20 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
 
+class AtomicSaveModel(models.Model):
+    """Запись и связанные с ней счётчики сохраняются в одной транзакции."""
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
 class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
@@ -13,12 +24,16 @@ class Group(models.Model):
         return self.title
 
 
-class Post(models.Model):
+class Post(AtomicSaveModel):
     text = models.TextField()
     pub_date = models.DateTimeField(
         'Дата создания',
         auto_now_add=True
     )
+    updated = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -34,17 +49,69 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    comments_count = models.PositiveIntegerField(
+        'Комментариев',
+        default=0,
+        editable=False
+    )
+    views_count = models.PositiveIntegerField(
+        'Просмотров',
+        default=0,
+        editable=False
+    )
+    fanned_out = models.BooleanField(
+        'Разложен по лентам',
+        default=False,
+        editable=False
+    )
 
     class Meta:
         ordering = ['-pub_date']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'],
+                         name='post_date_idx'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_date_idx'),
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_date_idx'),
+            models.Index(fields=['-pub_date', '-id'],
+                         condition=models.Q(fanned_out=False),
+                         name='post_fanout_pending_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
 
-class Comment(models.Model):
+class PostImageVariant(models.Model):
+    """Уменьшенная копия картинки поста для srcset."""
+
+    JPEG = 'jpeg'
+    WEBP = 'webp'
+    FORMATS = [(JPEG, 'JPEG'), (WEBP, 'WebP')]
+
+    post = models.ForeignKey(Post,
+                             on_delete=models.CASCADE,
+                             related_name='image_variants')
+    image = models.ImageField('Файл', upload_to='posts/variants/',
+                              width_field='width', height_field='height')
+    format = models.CharField('Формат', max_length=4, choices=FORMATS)
+    width = models.PositiveIntegerField('Ширина')
+    height = models.PositiveIntegerField('Высота')
+
+    class Meta:
+        ordering = ['format', 'width']
+        verbose_name = 'Вариант картинки'
+        verbose_name_plural = 'Варианты картинок'
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'format', 'width'],
+                                    name='unique_image_variant')
+        ]
+
+
+class Comment(AtomicSaveModel):
     post = models.ForeignKey(Post,
                              on_delete=models.CASCADE,
                              related_name='comments')
@@ -59,9 +126,41 @@ class Comment(models.Model):
         'Дата создания',
         auto_now_add=True
     )
+    parent = models.ForeignKey('self',
+                               on_delete=models.CASCADE,
+                               blank=True, null=True,
+                               related_name='children',
+                               verbose_name='Ответ на')
+    thread = models.ForeignKey('self',
+                               on_delete=models.CASCADE,
+                               blank=True, null=True,
+                               related_name='+',
+                               editable=False)
+    path = models.CharField('Путь', max_length=255, default='',
+                            editable=False)
+    depth = models.PositiveSmallIntegerField('Глубина', default=0,
+                                             editable=False)
+    position = models.PositiveIntegerField('Номер в ветке', default=0,
+                                           editable=False)
+    replies_count = models.PositiveIntegerField('Ответов', default=0,
+                                                editable=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', 'created', 'id'],
+                         name='comment_post_created_idx'),
+            models.Index(fields=['-created', '-id'],
+                         name='comment_created_idx'),
+            models.Index(fields=['post', 'created', 'id'],
+                         condition=models.Q(parent__isnull=True),
+                         name='comment_root_idx'),
+            models.Index(fields=['post', 'path'], name='comment_path_idx'),
+            models.Index(fields=['thread', 'position'],
+                         name='comment_thread_idx'),
+        ]
 
-class Follow(models.Model):
+
+class Follow(AtomicSaveModel):
     user = models.ForeignKey(User,
                              on_delete=models.CASCADE,
                              related_name='follower'
@@ -77,3 +176,125 @@ class Follow(models.Model):
             models.UniqueConstraint(fields=['user', 'author'],
                                     name='unique_sub')
         ]
+        indexes = [
+            models.Index(fields=['author', 'user'],
+                         name='follow_author_user_idx'),
+        ]
+
+
+class AuthorStats(models.Model):
+    user = models.OneToOneField(User,
+                                on_delete=models.CASCADE,
+                                primary_key=True,
+                                related_name='stats')
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+
+    class Meta:
+        verbose_name = 'Счётчики автора'
+        verbose_name_plural = 'Счётчики авторов'
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(User,
+                             on_delete=models.CASCADE,
+                             related_name='feed')
+    post = models.ForeignKey(Post,
+                             on_delete=models.CASCADE,
+                             related_name='feed_entries')
+    author = models.ForeignKey(User,
+                               on_delete=models.CASCADE,
+                               related_name='+')
+    pub_date = models.DateTimeField('Дата создания')
+
+    class Meta:
+        verbose_name = 'Запись ленты подписок'
+        verbose_name_plural = 'Лента подписок'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='unique_feed_entry')
+        ]
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-post'],
+                         name='feed_user_date_idx'),
+            models.Index(fields=['user', 'author'],
+                         name='feed_user_author_idx'),
+        ]
+
+
+class Recommendations(models.Model):
+    """Авторы, которых стоит почитать пользователю, по убыванию сходства.
+
+    Заполняется командой refresh_recommendations; stale ставится, когда
+    пользователь подписался, отписался или оставил комментарий.
+    """
+
+    user = models.OneToOneField(User,
+                                on_delete=models.CASCADE,
+                                primary_key=True,
+                                related_name='recommendations')
+    authors = models.TextField('Авторы', blank=True,
+                               help_text='id авторов через запятую')
+    stale = models.BooleanField('Устарели', default=True)
+    updated = models.DateTimeField('Дата расчёта', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Рекомендации'
+        verbose_name_plural = 'Рекомендации'
+        indexes = [
+            models.Index(fields=['stale'], name='recommendations_stale_idx'),
+        ]
+
+    def author_ids(self):
+        return [int(pk) for pk in self.authors.split(',') if pk]
+
+
+class PostVector(models.Model):
+    """Хэшированные признаки текста и группы поста для похожих постов.
+
+    Хранятся, чтобы refresh_related_posts не разбирал заново тексты всех
+    постов; stale ставится, пока соседи поста не посчитаны. При правке
+    текста или группы строка удаляется и строится заново.
+    """
+
+    post = models.OneToOneField(Post,
+                                on_delete=models.CASCADE,
+                                primary_key=True,
+                                related_name='vector')
+    columns = models.BinaryField('Столбцы признаков')
+    weights = models.BinaryField('Веса признаков')
+    stale = models.BooleanField('Соседи не посчитаны', default=True)
+
+    class Meta:
+        verbose_name = 'Признаки поста'
+        verbose_name_plural = 'Признаки постов'
+        indexes = [
+            models.Index(fields=['stale'], name='post_vector_stale_idx'),
+        ]
+
+
+class RelatedPost(models.Model):
+    """Похожий пост: rank-й по косинусному сходству TF-IDF с post.
+
+    Заполняется командой refresh_related_posts; у поста, текст или группа
+    которого изменились, строки удаляются и считаются заново.
+    """
+
+    post = models.ForeignKey(Post,
+                             on_delete=models.CASCADE,
+                             related_name='related_posts')
+    related = models.ForeignKey(Post,
+                                on_delete=models.CASCADE,
+                                related_name='+')
+    rank = models.PositiveSmallIntegerField('Место')
+    score = models.FloatField('Сходство')
+    computed = models.DateTimeField('Дата расчёта', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Похожий пост'
+        verbose_name_plural = 'Похожие посты'
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'rank'],
+                                    name='unique_related_rank')
+        ]
@@ -0,0 +1,31 @@
+"""Чтение и пометка устаревших рекомендаций «кого почитать».
+
+Сам расчёт делает команда refresh_recommendations (posts/cofollow.py);
+страницы только читают готовую строку Recommendations пользователя.
+"""
+from .models import Recommendations, User
+
+RECOMMENDATIONS_ON_PAGE: int = 5
+
+
+def recommended_authors(user, limit=RECOMMENDATIONS_ON_PAGE, exclude=()):
+    """Авторы из готовых рекомендаций в порядке сходства, два запроса.
+
+    Авторы, на которых пользователь подписался после расчёта, не
+    показываются, пока команда не пересчитает список.
+    """
+    if not user.is_authenticated:
+        return []
+    row = Recommendations.objects.filter(user=user).only('authors').first()
+    if row is None:
+        return []
+    ids = [pk for pk in row.author_ids() if pk not in exclude]
+    authors = User.objects.filter(pk__in=ids).exclude(
+        following__user=user).only('username', 'first_name', 'last_name')
+    by_id = {author.pk: author for author in authors}
+    return [by_id[pk] for pk in ids if pk in by_id][:limit]
+
+
+def mark_stale(user_id):
+    Recommendations.objects.filter(user_id=user_id, stale=False).update(
+        stale=True)
@@ -0,0 +1,193 @@
+import math
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Post
+from .stemmer import WORD_RE, stem, stems
+from .utils import MAX_PK, CursorPaginator
+
+SEARCH_TABLE = 'posts_search'
+MAX_TERMS: int = 10
+SNIPPET_WORDS: int = 30
+SNIPPET_LEAD: int = 5
+SCORE_CURSOR_RE = re.compile(r'^(-?[0-9.e+-]{1,32})_(\d{1,19})$')
+
+VENDORS = ('sqlite', 'postgresql')
+
+
+def vendor():
+    return connection.vendor if connection.vendor in VENDORS else None
+
+
+def terms(query):
+    """Основы слов запроса без повторов, не больше MAX_TERMS."""
+    return list(dict.fromkeys(stems(query)))[:MAX_TERMS]
+
+
+def match_expression(query):
+    return ' '.join(f'"{term}"' for term in terms(query))
+
+
+def placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+
+def index_posts(post_ids):
+    """Переиндексирует посты; удалённые пропадают из индекса."""
+    if vendor() is None or not post_ids:
+        return
+    post_ids = list(post_ids)
+    rows = list(Post.objects.filter(pk__in=post_ids).values_list(
+        'pk', 'text'))
+    unindex_posts(post_ids)
+    if not rows:
+        return
+    with connection.cursor() as cursor:
+        if vendor() == 'sqlite':
+            cursor.executemany(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, body) VALUES (%s, %s)',
+                [(pk, ' '.join(stems(text))) for pk, text in rows])
+        else:
+            cursor.executemany(
+                f'INSERT INTO {SEARCH_TABLE} (post_id, document) '
+                f"VALUES (%s, to_tsvector('russian', %s))", rows)
+
+
+def unindex_posts(post_ids):
+    if vendor() is None or not post_ids:
+        return
+    post_ids = list(post_ids)
+    column = 'rowid' if vendor() == 'sqlite' else 'post_id'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} '
+            f'WHERE {column} IN ({placeholders(post_ids)})', post_ids)
+
+
+def clear_index():
+    if vendor() is not None:
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+
+
+def matching_sql(query):
+    """SQL, выбирающий (id поста, score); меньший score — выше в выдаче."""
+    if vendor() == 'sqlite':
+        return (f'SELECT rowid AS post_id, bm25({SEARCH_TABLE}) AS score '
+                f'FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s',
+                [match_expression(query)])
+    return (f'SELECT post_id, -ts_rank_cd(document, query)::float8 AS score '
+            f"FROM {SEARCH_TABLE}, plainto_tsquery('russian', %s) query "
+            f'WHERE document @@ query', [query])
+
+
+def search_queryset(queryset, query):
+    """Сужает queryset до постов, подходящих под запрос, без ранжирования."""
+    if not terms(query):
+        return queryset.none()
+    if vendor() is None:
+        return queryset.filter(text__icontains=query)
+    sql, params = matching_sql(query)
+    return queryset.filter(
+        pk__in=RawSQL(f'SELECT post_id FROM ({sql}) matches', params))
+
+
+def ranked(query, values, forward, limit, offset):
+    """Пары (score, id) в порядке выдачи, начиная после values."""
+    if vendor() is None:
+        posts = search_queryset(Post.objects, query)
+        if values is not None:
+            posts = posts.filter(**{
+                'pk__gt' if forward else 'pk__lt': values[1]})
+        posts = posts.order_by('pk' if forward else '-pk')
+        return [(0.0, pk) for pk in posts.values_list(
+            'pk', flat=True)[offset:offset + limit]]
+    sql, params = matching_sql(query)
+    direction, compare = ('', '>') if forward else (' DESC', '<')
+    where = ''
+    if values is not None:
+        where = (f'WHERE score {compare} %s '
+                 f'OR (score = %s AND post_id {compare} %s)')
+        params = params + [values[0], values[0], values[1]]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT score, post_id FROM ({sql}) matches {where} '
+            f'ORDER BY score{direction}, post_id{direction} '
+            f'LIMIT %s OFFSET %s', params + [limit, offset])
+        return cursor.fetchall()
+
+
+def highlight(text, query_terms):
+    """Фрагмент текста вокруг первого совпадения, совпадения в <mark>."""
+    found = set(query_terms)
+    words = list(WORD_RE.finditer(text))
+    hits = [index for index, word in enumerate(words)
+            if stem(word.group()) in found]
+    first = max((hits[0] if hits else 0) - SNIPPET_LEAD, 0)
+    window = words[first:first + SNIPPET_WORDS]
+    if not window:
+        return escape(text)
+    start = window[0].start() if first else 0
+    end = window[-1].end()
+    parts = ['…'] if first else []
+    position = start
+    for word in window:
+        parts.append(escape(text[position:word.start()]))
+        if stem(word.group()) in found:
+            parts.append(f'<mark>{escape(word.group())}</mark>')
+        else:
+            parts.append(escape(word.group()))
+        position = word.end()
+    if end < len(text.rstrip()):
+        parts.append('…')
+    return mark_safe(''.join(parts))
+
+
+class SearchPaginator(CursorPaginator):
+    """Выдача поиска по убыванию релевантности, курсор — (score, id)."""
+
+    def __init__(self, query, per_page):
+        super().__init__(Post.objects.none(), per_page)
+        self.search_query = query
+        self.terms = terms(query)
+
+    def fetch(self, values, forward, limit, offset=0):
+        if not self.terms:
+            return []
+        rows = ranked(self.search_query, values, forward, limit, offset)
+        found = Post.objects.select_related(
+            'author', 'group').prefetch_related('image_variants').in_bulk(
+                [pk for score, pk in rows])
+        posts = []
+        for score, pk in rows:
+            if pk in found:
+                post = found[pk]
+                post.search_score = score
+                post.highlighted = highlight(post.text, self.terms)
+                posts.append(post)
+        return posts
+
+    def cursor(self, obj):
+        return f'{obj.search_score!r}_{obj.pk}'
+
+    def decode(self, cursor):
+        match = SCORE_CURSOR_RE.match(cursor or '')
+        if match is None:
+            return None
+        try:
+            score = float(match.group(1))
+        except ValueError:
+            return None
+        pk = int(match.group(2))
+        if not math.isfinite(score) or pk > MAX_PK:
+            return None
+        return score, pk
+
+
+def search_page(request, per_page):
+    query = request.GET.get('q', '').strip()
+    return query, SearchPaginator(query, per_page).get_page(request)
@@ -0,0 +1,207 @@
+"""Синтетические данные для нагрузочных проверок.
+
+Всё, что создаётся, зависит только от seed: пачки строятся генератором,
+засеянным номером пачки, поэтому результат не меняется от числа
+процессов и порядка их работы.
+"""
+import bisect
+import itertools
+import random
+from datetime import timedelta
+from multiprocessing import Pool
+
+from django.db import close_old_connections, connections
+from faker import Faker
+
+from .models import Comment, Follow, Group, Post, User
+
+BULK_BATCH_SIZE: int = 500
+USERNAME_PREFIX = 'seed_'
+VOCABULARY_SIZE: int = 3000
+NAMES_SIZE: int = 500
+# Показатель степенного распределения популярности авторов и постов.
+POPULARITY_EXPONENT: float = 1.1
+# Число подписок пользователя — распределение Парето с этим параметром.
+FOLLOWING_SHAPE: float = 1.3
+
+
+def chunk_rng(seed, kind, number):
+    return random.Random(f'{seed}:{kind}:{number}')
+
+
+def vocabulary(seed):
+    fake = Faker('ru_RU')
+    fake.seed_instance(seed)
+    return sorted({word for word in fake.words(VOCABULARY_SIZE)
+                   if len(word) > 1})
+
+
+def zipf_weights(size):
+    """Накопленные веса: элемент с рангом r популярнее в r**s раз."""
+    weights = (1 / (rank ** POPULARITY_EXPONENT)
+               for rank in range(1, size + 1))
+    return list(itertools.accumulate(weights))
+
+
+def pick(rng, items, cumulative):
+    point = rng.random() * cumulative[-1]
+    return items[bisect.bisect_left(cumulative, point)]
+
+
+def fiction_text(rng, words, paragraphs=(3, 12)):
+    """Длинный «художественный» текст из абзацев и предложений."""
+    result = []
+    for _ in range(rng.randint(*paragraphs)):
+        sentences = []
+        for _ in range(rng.randint(3, 9)):
+            sentence = ' '.join(rng.choice(words)
+                                for _ in range(rng.randint(5, 16)))
+            sentences.append(sentence.capitalize() + rng.choice('..!?…'))
+        result.append(' '.join(sentences))
+    return '\n\n'.join(result)
+
+
+def chunks(total, size):
+    return [(number, start, min(start + size, total))
+            for number, start in enumerate(range(0, total, size))]
+
+
+class Seeder:
+    """Создаёт пользователей, группы, посты, комментарии и подписки."""
+
+    def __init__(self, seed, end, days=365, chunk_size=5000):
+        self.seed = seed
+        self.end = end
+        self.days = days
+        self.chunk_size = chunk_size
+        self.words = vocabulary(seed)
+        self.user_ids = []
+        self.author_weights = []
+        self.group_ids = []
+        self.post_ids = []
+        self.post_weights = []
+
+    def create_users(self, total):
+        fake = Faker('ru_RU')
+        fake.seed_instance(self.seed)
+        first_names = [fake.first_name() for _ in range(NAMES_SIZE)]
+        last_names = [fake.last_name() for _ in range(NAMES_SIZE)]
+        for number, start, stop in chunks(total, self.chunk_size):
+            rng = chunk_rng(self.seed, 'users', number)
+            User.objects.bulk_create(
+                [User(username=f'{USERNAME_PREFIX}{self.seed}_{index}',
+                      first_name=rng.choice(first_names),
+                      last_name=rng.choice(last_names), password='!')
+                 for index in range(start, stop)],
+                batch_size=BULK_BATCH_SIZE)
+
+    def create_groups(self, total):
+        rng = chunk_rng(self.seed, 'groups', 0)
+        Group.objects.bulk_create(
+            [Group(title=f'{rng.choice(self.words).capitalize()} {index}',
+                   slug=f'{USERNAME_PREFIX}{self.seed}-{index}',
+                   description=fiction_text(rng, self.words, (1, 1)))
+             for index in range(total)],
+            batch_size=BULK_BATCH_SIZE)
+
+    def load_ids(self):
+        """Связывает номера сущностей с их id в том порядке, что и seed."""
+        prefix = f'{USERNAME_PREFIX}{self.seed}_'
+        users = User.objects.filter(username__startswith=prefix)
+        self.user_ids = [pk for _, pk in sorted(
+            (int(username[len(prefix):]), pk)
+            for username, pk in users.values_list('username', 'pk'))]
+        self.author_weights = zipf_weights(len(self.user_ids))
+        prefix = f'{USERNAME_PREFIX}{self.seed}-'
+        groups = Group.objects.filter(slug__startswith=prefix)
+        self.group_ids = [pk for _, pk in sorted(
+            (int(slug[len(prefix):]), pk)
+            for slug, pk in groups.values_list('slug', 'pk'))]
+
+    def load_post_ids(self):
+        self.post_ids = list(Post.objects.filter(
+            author_id__in=self.user_ids).order_by(
+                '-pub_date', '-id').values_list('pk', flat=True))
+        self.post_weights = zipf_weights(len(self.post_ids))
+
+    def create_posts(self, number, start, stop):
+        rng = chunk_rng(self.seed, 'posts', number)
+        groups = self.group_ids + [None]
+        seconds = self.days * 24 * 60 * 60
+        posts = [Post(text=fiction_text(rng, self.words),
+                      author_id=pick(rng, self.user_ids,
+                                     self.author_weights),
+                      group_id=rng.choice(groups),
+                      pub_date=self.end - timedelta(
+                          seconds=rng.randrange(seconds)))
+                 for _ in range(start, stop)]
+        pub_date = Post._meta.get_field('pub_date')
+        pub_date.auto_now_add = False
+        try:
+            Post.objects.bulk_create(posts, batch_size=BULK_BATCH_SIZE)
+        finally:
+            pub_date.auto_now_add = True
+        return len(posts)
+
+    def create_comments(self, number, start, stop):
+        rng = chunk_rng(self.seed, 'comments', number)
+        comments = [Comment(post_id=pick(rng, self.post_ids,
+                                         self.post_weights),
+                            author_id=rng.choice(self.user_ids),
+                            text=fiction_text(rng, self.words, (1, 1)))
+                    for _ in range(start, stop)]
+        Comment.objects.bulk_create(comments, batch_size=BULK_BATCH_SIZE)
+        return len(comments)
+
+    def create_follows(self, number, start, stop):
+        """Подписки пользователей start..stop на авторов.
+
+        Число подписок у пользователя — по Парето, выбор автора — по
+        степенному закону, так что у немногих авторов огромная аудитория.
+        """
+        rng = chunk_rng(self.seed, 'follows', number)
+        limit = len(self.user_ids) - 1
+        follows = []
+        for index in range(start, stop):
+            user_id = self.user_ids[index]
+            amount = min(int(rng.paretovariate(FOLLOWING_SHAPE)), limit)
+            chosen = {pick(rng, self.user_ids, self.author_weights)
+                      for _ in range(amount)}
+            chosen.discard(user_id)
+            follows.extend(Follow(user_id=user_id, author_id=author_id)
+                           for author_id in sorted(chosen))
+        Follow.objects.bulk_create(follows, batch_size=BULK_BATCH_SIZE,
+                                   ignore_conflicts=True)
+        return len(follows)
+
+
+_seeder = None
+
+
+def init_worker(seeder):
+    global _seeder
+    _seeder = seeder
+
+
+def run_chunk(method, number, start, stop):
+    try:
+        return getattr(_seeder, method)(number, start, stop)
+    finally:
+        close_old_connections()
+
+
+def run_chunks(seeder, method, total, processes=1):
+    """Выполняет метод пачками: в пуле процессов или по очереди.
+
+    Сидер с уже загруженными id передаётся процессу один раз, при запуске.
+    """
+    jobs = [(method, number, start, stop)
+            for number, start, stop in chunks(total, seeder.chunk_size)]
+    if processes <= 1:
+        init_worker(seeder)
+        return sum(run_chunk(*job) for job in jobs)
+    # Дочерние процессы должны открыть свои соединения с базой.
+    connections.close_all()
+    with Pool(processes, initializer=init_worker,
+              initargs=(seeder,)) as pool:
+        return sum(pool.starmap(run_chunk, jobs))
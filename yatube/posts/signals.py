@@ -0,0 +1,101 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core.jobs import enqueue
+
+from .caching import invalidate, post_tags, subscription_tags
+from .counters import change_author_stats, change_comments_count
+from .feed import backfill, left_popular, trim
+from .models import (AuthorStats, Comment, Follow, Group, Post, PostVector,
+                     RelatedPost, User)
+from .recommendations import mark_stale
+from .search import index_posts, unindex_posts
+from .threads import attach, detach, place
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        AuthorStats.objects.get_or_create(user=instance)
+        invalidate([f'author:{instance.username}'])
+
+
+@receiver(pre_save, sender=Post)
+def post_changing(sender, instance, raw=False, **kwargs):
+    old = None
+    if instance.pk and not raw:
+        old = Post.objects.select_related('author', 'group').filter(
+            pk=instance.pk).first()
+    instance.old_cache_tags = post_tags(old) if old else []
+    instance.content_changed = old is not None and (
+        (old.text, old.group_id) != (instance.text, instance.group_id))
+
+
+@receiver(post_save, sender=Post)
+def post_created(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        change_author_stats(instance.author_id, posts_count=1)
+        enqueue('posts.fan_out', instance.pk)
+    if instance.content_changed:
+        PostVector.objects.filter(post=instance).delete()
+        RelatedPost.objects.filter(post=instance).delete()
+    index_posts([instance.pk])
+    invalidate(set(post_tags(instance) + instance.old_cache_tags))
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    change_author_stats(instance.author_id, posts_count=-1)
+    unindex_posts([instance.pk])
+    invalidate(post_tags(instance))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate(['index', f'group:{instance.slug}'])
+
+
+@receiver(pre_save, sender=Comment)
+def comment_placing(sender, instance, raw=False, **kwargs):
+    if instance._state.adding and not raw:
+        place(instance)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        attach(instance)
+        change_comments_count(instance.post_id, 1)
+        mark_stale(instance.author_id)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    detach(instance)
+    change_comments_count(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        change_author_stats(instance.author_id, followers_count=1)
+        change_author_stats(instance.user_id, following_count=1)
+        backfill(instance.user_id, instance.author_id)
+        mark_stale(instance.user_id)
+        invalidate(subscription_tags(instance))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    change_author_stats(instance.author_id, followers_count=-1)
+    change_author_stats(instance.user_id, following_count=-1)
+    trim(instance.user_id, instance.author_id)
+    if left_popular(instance.author_id):
+        enqueue('posts.backfill_followers', instance.author_id,
+                key=f'posts.backfill_followers:{instance.author_id}')
+    mark_stale(instance.user_id)
+    invalidate(subscription_tags(instance))
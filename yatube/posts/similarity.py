@@ -0,0 +1,190 @@
+"""Похожие посты по TF-IDF текста и группе.
+
+Признаки поста — основы слов текста (posts/stemmer.py) и его группа,
+хэшированные в N_FEATURES столбцов, так что словарь не хранится. Они
+сохраняются в PostVector, и текст разбирается только у новых и
+изменённых постов; idf каждый раз считается по сохранённым признакам.
+Вес признака — (1 + log tf) * idf, строки нормируются, и сходство
+постов — скалярное произведение строк. Соседи считаются пачками по chunk_size
+строк: в памяти одновременно только матрица признаков и сходство одной
+пачки со всеми постами.
+
+Новый или изменённый пост получает свой список соседей, а в списки
+других постов попадает, если оказался ближе их последнего соседа.
+Сходства уже сохранённых пар при этом не пересчитываются, поэтому
+изредка стоит пересчитывать всё (--all).
+"""
+import zlib
+from collections import Counter, defaultdict
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, Min
+from scipy import sparse
+
+from .models import Post, PostVector, RelatedPost
+from .stemmer import stems
+from .utils import pk_batches
+from .vectors import normalize_rows, top_k, without
+
+N_FEATURES: int = 2 ** 18
+GROUP_WEIGHT: float = 2.0
+RELATED_TOP: int = 5
+MIN_SCORE: float = 0.05
+
+
+def feature(token):
+    # crc32, а не hash(): столбцы не должны зависеть от PYTHONHASHSEED.
+    return zlib.crc32(token.encode()) % N_FEATURES
+
+
+def post_features(text, group_id):
+    counts = Counter(feature(term) for term in stems(text))
+    columns = list(counts)
+    weights = [1 + np.log(count) for count in counts.values()]
+    if group_id:
+        columns.append(feature(f'group:{group_id}'))
+        weights.append(GROUP_WEIGHT)
+    return columns, weights
+
+
+def build_vectors(batch_size=2000):
+    """Сохраняет признаки постов, у которых их ещё нет; возвращает число."""
+    built = 0
+    for ids in pk_batches(Post.objects.filter(vector__isnull=True),
+                          batch_size):
+        vectors = []
+        for pk, text, group_id in Post.objects.filter(pk__in=ids).values_list(
+                'pk', 'text', 'group_id'):
+            columns, weights = post_features(text, group_id)
+            vectors.append(PostVector(
+                post_id=pk,
+                columns=np.array(columns, dtype=np.int32).tobytes(),
+                weights=np.array(weights, dtype=np.float32).tobytes()))
+        PostVector.objects.bulk_create(vectors, ignore_conflicts=True)
+        built += len(vectors)
+    return built
+
+
+def pending(batch_size=2000):
+    """id постов, соседи которых ещё не посчитаны."""
+    build_vectors(batch_size)
+    return list(PostVector.objects.filter(stale=True).order_by(
+        'post_id').values_list('post_id', flat=True))
+
+
+def load_vectors(batch_size=2000):
+    """id всех постов и нормированная матрица их TF-IDF признаков."""
+    build_vectors(batch_size)
+    ids, rows, columns, weights = [], [], [], []
+    vectors = PostVector.objects.order_by('post_id').values_list(
+        'post_id', 'columns', 'weights')
+    for row, (pk, post_columns, post_weights) in enumerate(
+            vectors.iterator(chunk_size=batch_size)):
+        post_columns = np.frombuffer(post_columns, dtype=np.int32)
+        ids.append(pk)
+        rows.append(np.full(len(post_columns), row))
+        columns.append(post_columns)
+        weights.append(np.frombuffer(post_weights, dtype=np.float32))
+    if ids:
+        rows, columns, weights = (np.concatenate(parts) for parts in (
+            rows, columns, weights))
+    counts = sparse.csr_matrix((weights, (rows, columns)),
+                               shape=(len(ids), N_FEATURES))
+    frequency = np.bincount(counts.indices, minlength=N_FEATURES)
+    idf = np.log((1 + len(ids)) / (1 + frequency)) + 1
+    return np.array(ids, dtype=np.int64), normalize_rows(
+        counts @ sparse.diags(idf))
+
+
+def chunk_scores(matrix, rows):
+    """Сходство постов rows со всеми постами, без самих себя."""
+    scores = (matrix[rows] @ matrix.T).tocsr()
+    scores.data[scores.data < MIN_SCORE] = 0
+    selves = sparse.csr_matrix(
+        (np.ones(len(rows)), (np.arange(len(rows)), rows)),
+        shape=scores.shape)
+    return without(scores, selves)
+
+
+def store(neighbours):
+    """Заменяет сохранённые списки соседей: {id поста: [(id, score)]}.
+
+    Пост без соседей тоже отмечается посчитанным.
+    """
+    with transaction.atomic():
+        PostVector.objects.filter(post_id__in=list(neighbours)).update(
+            stale=False)
+        RelatedPost.objects.filter(post_id__in=list(neighbours)).delete()
+        RelatedPost.objects.bulk_create(
+            [RelatedPost(post_id=post_id, related_id=related_id, rank=rank,
+                         score=score)
+             for post_id, pairs in neighbours.items()
+             for rank, (related_id, score) in enumerate(pairs)])
+
+
+def thresholds(top):
+    """Для постов с полным списком — сходство последнего соседа."""
+    return dict(RelatedPost.objects.order_by().values('post_id').annotate(
+        lowest=Min('score'), total=Count('pk')).filter(
+        total__gte=top).values_list('post_id', 'lowest'))
+
+
+def merge(candidates, top):
+    """Добавляет кандидатов в сохранённые списки других постов."""
+    merged = defaultdict(dict)
+    for post_id, related_id, score in RelatedPost.objects.filter(
+            post_id__in=list(candidates)).values_list(
+            'post_id', 'related_id', 'score'):
+        merged[post_id][related_id] = score
+    neighbours = {}
+    for post_id, pairs in candidates.items():
+        scores = merged[post_id]
+        scores.update(pairs)
+        neighbours[post_id] = sorted(
+            scores.items(), key=lambda pair: (-pair[1], pair[0]))[:top]
+    return neighbours
+
+
+def refresh(post_ids=None, top=RELATED_TOP, chunk_size=500):
+    """Пересчитывает соседей постов post_ids, а без них — всех постов.
+
+    Возвращает число постов, чьи списки были перезаписаны.
+    """
+    ids, matrix = load_vectors()
+    if post_ids is None:
+        rows = np.arange(len(ids))
+    else:
+        rows = np.flatnonzero(np.isin(ids, list(post_ids)))
+    incremental = post_ids is not None
+    lowest = thresholds(top) if incremental else {}
+    targets = set(ids[rows].tolist())
+    candidates = defaultdict(dict)
+    written = 0
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        scores = chunk_scores(matrix, chunk)
+        neighbours = {}
+        for index, row in enumerate(chunk):
+            columns, values = top_k(scores, index, top)
+            post_id = int(ids[row])
+            neighbours[post_id] = [(int(ids[column]), float(value))
+                                   for column, value in zip(columns, values)]
+            if incremental:
+                collect(candidates, scores, index, post_id, ids, lowest,
+                        targets)
+        store(neighbours)
+        written += len(neighbours)
+    if candidates:
+        store(merge(candidates, top))
+    return written + len(candidates)
+
+
+def collect(candidates, scores, index, post_id, ids, lowest, targets):
+    """Посты, в чьи списки post_id входит: он ближе их последнего соседа."""
+    start, end = scores.indptr[index], scores.indptr[index + 1]
+    for column, score in zip(scores.indices[start:end],
+                             scores.data[start:end]):
+        other = int(ids[column])
+        if other not in targets and score > lowest.get(other, 0):
+            candidates[other][post_id] = float(score)
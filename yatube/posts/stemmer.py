@@ -0,0 +1,121 @@
+"""Стеммер Snowball для русского языка.
+
+Поисковый индекс хранит основы слов, поэтому «рассказы», «рассказа» и
+«рассказом» находятся по любой из этих форм.
+"""
+import re
+from functools import lru_cache
+
+VOWELS = 'аеиоуыэюя'
+WORD_RE = re.compile(r'[0-9a-zа-яё]+', re.IGNORECASE)
+
+PERFECTIVE_GERUND = (
+    (('в', 'вши', 'вшись'), True),
+    (('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'), False),
+)
+ADJECTIVE = (
+    (('ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+      'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+      'ая', 'яя', 'ою', 'ею'), False),
+)
+PARTICIPLE = (
+    (('ем', 'нн', 'вш', 'ющ', 'щ'), True),
+    (('ивш', 'ывш', 'ующ'), False),
+)
+REFLEXIVE = ((('ся', 'сь'), False),)
+VERB = (
+    (('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет',
+      'ют', 'ны', 'ть', 'ешь', 'нно'), True),
+    (('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+      'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+      'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'), False),
+)
+NOUN = (
+    (('а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии',
+      'и', 'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам',
+      'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия',
+      'ья', 'я'), False),
+)
+DERIVATIONAL = ((('ост', 'ость'), False),)
+SUPERLATIVE = ((('ейш', 'ейше'), False),)
+
+
+def suffixes(groups):
+    """Окончания группы по длине, от длинных к коротким.
+
+    Для каждой длины хранится словарь «окончание → только после а/я».
+    """
+    by_length = {}
+    for endings, after_a in groups:
+        for suffix in endings:
+            by_length.setdefault(len(suffix), {})[suffix] = after_a
+    return sorted(by_length.items(), reverse=True)
+
+
+GROUPS = {name: suffixes(groups) for name, groups in (
+    ('perfective_gerund', PERFECTIVE_GERUND), ('adjective', ADJECTIVE),
+    ('participle', PARTICIPLE), ('reflexive', REFLEXIVE), ('verb', VERB),
+    ('noun', NOUN), ('derivational', DERIVATIONAL),
+    ('superlative', SUPERLATIVE),
+)}
+
+
+def region(word, start):
+    """Начало области после первой согласной, идущей за гласной."""
+    for index in range(start + 1, len(word)):
+        if word[index] not in VOWELS and word[index - 1] in VOWELS:
+            return index + 1
+    return len(word)
+
+
+def strip(word, group, limit):
+    """Отрезает самое длинное подходящее окончание, не заходя левее limit."""
+    for length, endings in GROUPS[group]:
+        start = len(word) - length
+        if start < limit:
+            continue
+        after_a = endings.get(word[start:])
+        if after_a is None:
+            continue
+        if after_a and not (start > limit and word[start - 1] in 'ая'):
+            continue
+        return word[:start], True
+    return word, False
+
+
+@lru_cache(maxsize=100000)
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    rv = next((index + 1 for index, letter in enumerate(word)
+               if letter in VOWELS), len(word))
+    r2 = region(word, region(word, 0) - 1)
+
+    word, found = strip(word, 'perfective_gerund', rv)
+    if not found:
+        word, _ = strip(word, 'reflexive', rv)
+        word, found = strip(word, 'adjective', rv)
+        if found:
+            word, _ = strip(word, 'participle', rv)
+        else:
+            word, found = strip(word, 'verb', rv)
+            if not found:
+                word, _ = strip(word, 'noun', rv)
+
+    if word.endswith('и') and len(word) - 1 >= rv:
+        word = word[:-1]
+    word, _ = strip(word, 'derivational', max(r2, rv))
+
+    word, found = strip(word, 'superlative', rv)
+    if word.endswith('нн') and len(word) - 2 >= rv:
+        word = word[:-1]
+    elif not found and word.endswith('ь') and len(word) - 1 >= rv:
+        word = word[:-1]
+    return word
+
+
+def words(text):
+    return WORD_RE.findall(text)
+
+
+def stems(text):
+    return [stem(word) for word in words(text)]
@@ -0,0 +1,177 @@
+"""Потоковые ленты Atom и RSS: общая, групп и авторов.
+
+XML пишется по одной записи: посты читаются итератором и каждая
+запись уходит клиенту сразу. Готовый документ кладётся в кэш под ключом
+из версий тегов кэша страниц, так что новая публикация уводит ленту на
+новый ключ, а тот же ключ служит ETag для ответа 304.
+"""
+import hashlib
+from io import StringIO
+
+from django.core.cache import cache
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                quote_etag)
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+from django.utils.text import Truncator
+from django.utils.xmlutils import SimplerXMLGenerator
+
+from .caching import tag_versions
+
+FEED_SIZE: int = 50
+FEED_CHUNK_SIZE: int = 10
+FEED_CACHE_TIMEOUT: int = 60 * 60 * 24
+FEED_MAX_AGE: int = 60 * 5
+TITLE_WORDS: int = 8
+
+
+class StreamingFeedMixin:
+    """Отдаёт документ кусками вместо записи в файл целиком.
+
+    Подкласс задаёт item_element и open()/close() — начало и конец
+    документа вокруг записей.
+    """
+
+    item_element = None
+
+    def __init__(self, *args, latest=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latest = latest
+
+    def latest_post_date(self):
+        # Записи не хранятся в self.items, дата ленты известна заранее.
+        return self.latest or timezone.now()
+
+    def make_item(self, **kwargs):
+        """Запись в том виде, в каком её собрал бы add_item()."""
+        self.add_item(**kwargs)
+        return self.items.pop()
+
+    def stream(self, items):
+        buffer = StringIO()
+        handler = SimplerXMLGenerator(buffer, 'utf-8')
+        handler.startDocument()
+        self.open(handler)
+        yield drain(buffer)
+        for item in items:
+            item = self.make_item(**item)
+            handler.startElement(self.item_element,
+                                 self.item_attributes(item))
+            self.add_item_elements(handler, item)
+            handler.endElement(self.item_element)
+            yield drain(buffer)
+        self.close(handler)
+        yield drain(buffer)
+
+
+class StreamingAtomFeed(StreamingFeedMixin, Atom1Feed):
+    item_element = 'entry'
+
+    def open(self, handler):
+        handler.startElement('feed', self.root_attributes())
+        self.add_root_elements(handler)
+
+    def close(self, handler):
+        handler.endElement('feed')
+
+
+class StreamingRssFeed(StreamingFeedMixin, Rss201rev2Feed):
+    item_element = 'item'
+
+    def open(self, handler):
+        handler.startElement('rss', self.rss_attributes())
+        handler.startElement('channel', self.root_attributes())
+        self.add_root_elements(handler)
+
+    def close(self, handler):
+        self.endChannelElement(handler)
+        handler.endElement('rss')
+
+
+FORMATS = {'atom': StreamingAtomFeed, 'rss': StreamingRssFeed}
+
+
+def drain(buffer):
+    chunk = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return chunk
+
+
+def post_item(request, post):
+    link = request.build_absolute_uri(
+        reverse('posts:post_detail', args=[post.pk]))
+    return {
+        'title': Truncator(post.text).words(TITLE_WORDS),
+        'link': link,
+        'unique_id': link,
+        'description': post.text,
+        'author_name': (post.author.get_full_name()
+                        or post.author.username),
+        'author_link': request.build_absolute_uri(
+            reverse('posts:profile', args=[post.author.username])),
+        'pubdate': post.pub_date,
+        'updateddate': post.updated,
+        'categories': [post.group.title] if post.group_id else (),
+    }
+
+
+def feed_key(request, kind, versions):
+    # В документе абсолютные ссылки, поэтому в ключе и адрес сайта.
+    path = hashlib.md5(request.build_absolute_uri(
+        request.path).encode()).hexdigest()
+    state = hashlib.md5(':'.join(versions).encode()).hexdigest()
+    return f'feed:{kind}:{path}:{state}'
+
+
+def cached_stream(key, chunks):
+    """Отдаёт куски дальше и, если документ дописан, кладёт его в кэш."""
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    cache.set(key, ''.join(parts), FEED_CACHE_TIMEOUT)
+
+
+def feed_response(request, kind, tags, describe):
+    """Ответ ленты формата kind.
+
+    describe() вызывается только если ленты нет в кэше и клиент не
+    прислал актуальный ETag; он возвращает заголовок, ссылку, описание и
+    queryset постов ленты либо None, если ленты не существует. Дата
+    обновления ленты — дата изменения самого свежего поста.
+    """
+    feed_class = FORMATS[kind]
+    key = feed_key(request, kind, tag_versions(tags))
+    etag = quote_etag(hashlib.md5(key.encode()).hexdigest())
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = build(request, feed_class, key, describe)
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, max_age=FEED_MAX_AGE)
+    return response
+
+
+def build(request, feed_class, key, describe):
+    content_type = feed_class.content_type
+    document = cache.get(key)
+    if document is not None:
+        return HttpResponse(document, content_type=content_type)
+    described = describe()
+    if described is None:
+        raise Http404
+    title, link, description, posts = described
+    posts = posts.select_related('author', 'group').order_by(
+        '-pub_date', '-id')[:FEED_SIZE]
+    latest = posts.values_list('updated', flat=True).first()
+    feed = feed_class(title=title, link=request.build_absolute_uri(link),
+                      description=description,
+                      feed_url=request.build_absolute_uri(),
+                      language='ru', latest=latest)
+    items = (post_item(request, post)
+             for post in posts.iterator(chunk_size=FEED_CHUNK_SIZE))
+    return StreamingHttpResponse(
+        cached_stream(key, feed.stream(items)), content_type=content_type)
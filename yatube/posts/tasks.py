@@ -0,0 +1,35 @@
+from io import StringIO
+
+from django.core.management import call_command
+
+from core.jobs import task
+
+from . import bulk, feed, thumbnails
+from .models import Post
+
+generate_thumbnails = task('posts.generate_thumbnails', priority=10)(
+    thumbnails.generate_thumbnails)
+regroup_posts = task('posts.regroup_posts')(bulk.regroup_posts)
+delete_posts = task('posts.delete_posts')(bulk.delete_posts)
+
+
+@task('posts.fan_out', priority=5)
+def fan_out(post_id):
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None:
+        feed.fan_out(post)
+
+
+@task('posts.backfill_followers', priority=5)
+def backfill_followers(author_id):
+    feed.backfill_followers(author_id)
+
+
+@task('posts.refresh_recommendations', priority=-10, max_attempts=1)
+def refresh_recommendations():
+    call_command('refresh_recommendations', stdout=StringIO())
+
+
+@task('posts.refresh_related_posts', priority=-10, max_attempts=1)
+def refresh_related_posts():
+    call_command('refresh_related_posts', stdout=StringIO())
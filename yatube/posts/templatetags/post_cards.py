@@ -0,0 +1,12 @@
+from django import template
+
+from posts.cards import render_cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts):
+    """HTML карточек постов страницы из общего кэша:
+    {% post_cards page_obj as cards %}."""
+    return render_cards(list(posts))
@@ -0,0 +1,34 @@
+from django import template
+
+from posts.models import PostImageVariant
+from posts.thumbnails import ready_thumbnail
+
+register = template.Library()
+
+# Карточка занимает всю ширину контейнера, который не шире 960px.
+SIZES = '(min-width: 992px) 960px, 100vw'
+
+
+def srcset(variants):
+    return ', '.join(f'{variant.image.url} {variant.width}w'
+                     for variant in variants)
+
+
+@register.inclusion_tag('posts/includes/picture.html')
+def post_picture(post, size='card'):
+    """Картинка поста с вариантами для srcset, пока их нет — миниатюра."""
+    if not post.image:
+        return {}
+    variants = post.image_variants.all()
+    jpeg = [variant for variant in variants
+            if variant.format == PostImageVariant.JPEG]
+    webp = [variant for variant in variants
+            if variant.format == PostImageVariant.WEBP]
+    if not jpeg:
+        return {'fallback': ready_thumbnail(post.image, size)}
+    return {
+        'image': jpeg[-1],
+        'srcset': srcset(jpeg),
+        'webp_srcset': srcset(webp),
+        'sizes': SIZES,
+    }
@@ -0,0 +1,170 @@
+import datetime
+import json
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from core.jobs import work
+from core.models import Job
+from posts.bulk import delete_posts, regroup_posts
+from posts.models import AuthorStats, Follow, Group, Post
+from posts.utils import estimated_count
+
+User = get_user_model()
+
+URL = '/admin/posts/post/'
+
+
+class PostAdminTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser('root', 'root@a.ru', 'x')
+        self.groups = [Group.objects.create(title=f'Группа {number}',
+                                            slug=f'group-{number}')
+                       for number in range(3)]
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def create_posts(self, amount):
+        for number in range(amount):
+            Post.objects.create(text=f'Пост {number}', author=self.admin,
+                                group=self.groups[number % 3])
+
+    def changelist_queries(self, url=URL):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def test_queries_do_not_grow_with_rows(self):
+        self.create_posts(5)
+        few, _ = self.changelist_queries()
+        self.create_posts(150)
+        cache.clear()
+        many, _ = self.changelist_queries()
+        self.assertEqual(few, many)
+
+    def test_count_is_cached(self):
+        self.create_posts(3)
+        self.changelist_queries()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(URL)
+        self.assertFalse([query for query in queries.captured_queries
+                          if 'COUNT(' in query['sql']])
+
+    def test_cursor_continues_after_first_page(self):
+        self.create_posts(150)
+        _, response = self.changelist_queries()
+        first = response.context['cl']
+        self.assertContains(response, 'Дальше')
+        _, response = self.changelist_queries(URL + first.next_link)
+        second = list(response.context['cl'].result_list)
+        self.assertEqual(len(second), 50)
+        self.assertEqual(second[0].text, 'Пост 49')
+        self.assertFalse(set(first.result_list) & set(second))
+
+    def test_follow_cursor_continues_after_first_page(self):
+        readers = [User.objects.create_user(username=f'reader{number}')
+                   for number in range(120)]
+        Follow.objects.bulk_create(Follow(user=reader, author=self.admin)
+                                   for reader in readers)
+        url = '/admin/posts/follow/'
+        _, response = self.changelist_queries(url)
+        first = response.context['cl']
+        _, response = self.changelist_queries(url + first.next_link)
+        second = list(response.context['cl'].result_list)
+        self.assertEqual(len(second), 20)
+        self.assertEqual(second[0].pk, list(first.result_list)[-1].pk - 1)
+        self.assertFalse(set(first.result_list) & set(second))
+
+    def test_date_drill_down(self):
+        self.create_posts(2)
+        old = Post.objects.create(text='Старый', author=self.admin)
+        Post.objects.filter(pk=old.pk).update(pub_date=timezone.make_aware(
+            datetime.datetime(2020, 5, 3)))
+        _, response = self.changelist_queries(URL + '?period=2020')
+        self.assertEqual(list(response.context['cl'].result_list), [old])
+        self.assertContains(response, 'май 2020')
+        _, response = self.changelist_queries(URL + '?period=2020-06')
+        self.assertEqual(list(response.context['cl'].result_list), [])
+
+    def test_actions_are_scheduled(self):
+        self.create_posts(3)
+        ids = list(Post.objects.values_list('pk', flat=True))
+        self.client.post(URL, {
+            'action': 'regroup_in_background',
+            '_selected_action': ids,
+            'group': self.groups[0].pk,
+        })
+        job = Job.objects.get(task='posts.regroup_posts')
+        post_ids, group = json.loads(job.args)
+        self.assertEqual((sorted(post_ids), group),
+                         (sorted(ids), str(self.groups[0].pk)))
+        self.assertEqual(Post.objects.filter(
+            group=self.groups[0]).count(), 1)
+        work(burst=True)
+        self.assertEqual(Post.objects.filter(
+            group=self.groups[0]).count(), 3)
+
+    def test_select_all_is_split_into_bounded_jobs(self):
+        self.create_posts(5)
+        with mock.patch('posts.admin.BULK_BATCH_SIZE', 2):
+            self.client.post(URL, {
+                'action': 'delete_in_background', 'select_across': '1',
+                '_selected_action': [Post.objects.first().pk], 'post': 'yes',
+            })
+        jobs = Job.objects.filter(task='posts.delete_posts')
+        self.assertEqual(sorted(len(json.loads(job.args)[0]) for job in jobs),
+                         [1, 2, 2])
+        work(burst=True)
+        self.assertFalse(Post.objects.exists())
+
+    def test_delete_is_scheduled_after_confirmation(self):
+        self.create_posts(3)
+        ids = list(Post.objects.values_list('pk', flat=True))[:2]
+        data = {'action': 'delete_in_background', '_selected_action': ids}
+        response = self.client.post(URL, data)
+        self.assertContains(response, 'Будет удалено постов: 2')
+        for pk in ids:
+            self.assertContains(response, f'value="{pk}"')
+        self.assertFalse(Job.objects.filter(
+            task='posts.delete_posts').exists())
+        self.client.post(URL, {**data, 'post': 'yes'})
+        job = Job.objects.get(task='posts.delete_posts')
+        self.assertEqual(sorted(json.loads(job.args)[0]), sorted(ids))
+        work(burst=True)
+        self.assertEqual(Post.objects.count(), 1)
+
+
+class BulkActionsTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='Ivan')
+        self.group = Group.objects.create(title='Группа', slug='group')
+        self.posts = [Post.objects.create(text=f'Пост {number}',
+                                          author=self.author)
+                      for number in range(5)]
+
+    def test_regroup_in_batches(self):
+        ids = [post.pk for post in self.posts]
+        with mock.patch('posts.bulk.BULK_BATCH_SIZE', 2):
+            regroup_posts(ids, self.group.pk)
+        self.assertEqual(self.group.posts.count(), 5)
+        regroup_posts(ids[:2], None)
+        self.assertEqual(self.group.posts.count(), 3)
+
+    def test_delete_keeps_counters(self):
+        delete_posts([post.pk for post in self.posts[:3]])
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(AuthorStats.objects.get(
+            user=self.author).posts_count, 2)
+
+    def test_estimated_count_of_filtered_queryset(self):
+        cache.clear()
+        queryset = Post.objects.filter(author=self.author)
+        self.assertEqual(estimated_count(queryset), 5)
+        Post.objects.create(text='Ещё', author=self.author)
+        self.assertEqual(estimated_count(queryset), 5)
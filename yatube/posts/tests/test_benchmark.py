@@ -0,0 +1,78 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import LiveServerTestCase, TestCase
+
+from posts.benchmark import (DEFAULT_MIX, HttpUser, InProcessUser, compare,
+                             percentile, run)
+from posts.hits import buffer
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class BenchmarkTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Ivan')
+        cls.author = User.objects.create_user(username='Petr')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='')
+        for number in range(5):
+            Post.objects.create(text=f'Пост {number}', author=cls.author,
+                                group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 95), 7)
+        self.assertIsNone(percentile([], 50))
+
+    def test_in_process_run_covers_every_view(self):
+        report = run(InProcessUser, DEFAULT_MIX, concurrency=1, per_user=80)
+        self.assertEqual(set(report['views']), set(DEFAULT_MIX))
+        self.assertEqual(report['total']['requests'], 80)
+        self.assertEqual(report['total']['errors'], 0)
+        for view in report['views'].values():
+            self.assertGreater(view['queries_mean'], 0)
+            self.assertLessEqual(view['p50_ms'], view['p99_ms'])
+
+    def test_compare_flags_regressions(self):
+        baseline = {'views': {'index': {'p95_ms': 10.0, 'queries_mean': 3}}}
+        current = {'views': {'index': {'p95_ms': 15.0, 'queries_mean': 3}}}
+        lines, worse = compare(baseline, current, tolerance=20)
+        self.assertTrue(worse)
+        self.assertIn('index p95_ms: 10.0 -> 15.0 (+50.0%)  ← хуже', lines)
+        lines, worse = compare(baseline, current, tolerance=60)
+        self.assertFalse(worse)
+
+
+class HttpBenchmarkTest(LiveServerTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='Ivan')
+        Post.objects.create(text='Пост', author=self.user)
+
+    def tearDown(self):
+        buffer.take()
+
+    def test_http_comments_pass_csrf(self):
+        report = run(lambda user_id: HttpUser(user_id, self.live_server_url),
+                     {'add_comment': 1}, concurrency=1, per_user=3)
+        self.assertEqual(report['total']['errors'], 0)
+        self.assertEqual(Comment.objects.count(), 3)
+
+    def test_rejected_post_is_an_error(self):
+        def make_user(user_id):
+            user = HttpUser(user_id, self.live_server_url)
+            user.csrf_token = lambda path: 'x' * 32
+            return user
+
+        report = run(make_user, {'add_comment': 1}, concurrency=1,
+                     per_user=2)
+        self.assertEqual(report['total']['errors'], 2)
+        self.assertFalse(Comment.objects.exists())
@@ -1,8 +1,15 @@
-from django.test import Client, TestCase
+import time
+from unittest import mock
+
+from django.test import Client, RequestFactory, TestCase
 from django.contrib.auth import get_user_model
-from posts.models import Post, Group
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponse
+from posts.caching import (PAGE_CACHE_TIMEOUT, cache_tagged_page, lock_key,
+                           page_cache_stats, page_key, tag_versions)
+from posts.models import Comment, Follow, Post, Group
 from django.urls import reverse
-import time
 
 User = get_user_model()
 
@@ -16,26 +23,225 @@ class CachePageTest(TestCase):
             title='Тестовая группа',
             slug='Group_test',
             description='Тестовое описание',)
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='Group_other',
+            description='Тестовое описание',)
 
     def setUp(self):
+        cache.clear()
         self.authorized_client = Client()
         self.authorized_client.force_login(CachePageTest.user)
-
-    def test_cache_correct_work(self):
         self.post = Post.objects.create(
             text='Тестовый текст',
             author=CachePageTest.user,
             group=CachePageTest.group
         )
-        cache_1 = self.authorized_client.get(
-            reverse('posts:main_page')).content
-        instance = Post.objects.get(pk=1)
-        instance.delete()
-        time.sleep(5)
-        cache_2 = self.authorized_client.get(
-            reverse('posts:main_page')).content
-        self.assertEquals(cache_1, cache_2, True)
-        time.sleep(16)
-        cache_3 = self.authorized_client.get(
-            reverse('posts:main_page')).content
-        self.assertNotEquals(cache_1, cache_3, True)
+
+    def get(self, name, **kwargs):
+        return self.authorized_client.get(reverse(name, kwargs=kwargs))
+
+    def silently_change_text(self, post, text):
+        """Меняет текст в базе в обход сигналов, кэш об этом не знает."""
+        Post.objects.filter(pk=post.pk).update(text=text)
+
+    def test_cache_correct_work(self):
+        self.get('posts:main_page')
+        self.silently_change_text(self.post, 'Новый текст')
+        self.assertContains(self.get('posts:main_page'), 'Тестовый текст')
+
+    def test_post_delete_invalidates_pages(self):
+        pages = (
+            ('posts:main_page', {}),
+            ('posts:group_list', {'slug': CachePageTest.group.slug}),
+            ('posts:profile', {'username': CachePageTest.user.username}),
+        )
+        for name, kwargs in pages:
+            self.assertContains(self.get(name, **kwargs), 'Тестовый текст')
+        self.post.delete()
+        for name, kwargs in pages:
+            with self.subTest(name=name):
+                self.assertNotContains(self.get(name, **kwargs),
+                                       'Тестовый текст')
+
+    def test_edit_invalidates_old_and_new_group(self):
+        self.get('posts:group_list', slug=CachePageTest.group.slug)
+        self.get('posts:group_list', slug=CachePageTest.other_group.slug)
+        self.post.group = CachePageTest.other_group
+        self.post.save()
+        self.assertNotContains(
+            self.get('posts:group_list', slug=CachePageTest.group.slug),
+            'Тестовый текст')
+        self.assertContains(
+            self.get('posts:group_list', slug=CachePageTest.other_group.slug),
+            'Тестовый текст')
+
+    def test_new_post_keeps_unrelated_entries(self):
+        """Новый пост не сбрасывает чужие страницы и посторонний кэш."""
+        other_post = Post.objects.create(
+            text='Пост другой группы', author=CachePageTest.user,
+            group=CachePageTest.other_group)
+        cache.set('unrelated', 'value')
+        self.get('posts:group_list', slug=CachePageTest.other_group.slug)
+        self.silently_change_text(other_post, 'Изменённый текст')
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Свежий пост', 'group': CachePageTest.group.pk})
+        self.assertEqual(cache.get('unrelated'), 'value')
+        self.assertContains(
+            self.get('posts:group_list', slug=CachePageTest.other_group.slug),
+            'Пост другой группы')
+        self.assertContains(self.get('posts:main_page'), 'Свежий пост')
+
+    def test_new_post_invalidates_followers_feed(self):
+        reader = User.objects.create_user(username='Petr')
+        reader_client = Client()
+        reader_client.force_login(reader)
+        Follow.objects.create(user=reader, author=CachePageTest.user)
+        reader_client.get(reverse('posts:follow_index'))
+        Post.objects.create(text='Для подписчиков', author=CachePageTest.user)
+        self.assertContains(reader_client.get(reverse('posts:follow_index')),
+                            'Для подписчиков')
+
+    def test_post_save_does_not_touch_follower_tags(self):
+        for number in range(3):
+            Follow.objects.create(
+                user=User.objects.create_user(username=f'reader{number}'),
+                author=CachePageTest.user)
+        with mock.patch('posts.caching.bump') as bump:
+            self.post.text = 'Правка'
+            self.post.save()
+        tags = {tag for call in bump.call_args_list for tag in call[0][0]}
+        self.assertFalse([tag for tag in tags if tag.startswith('follow:')])
+
+
+class StaleWhileRevalidateTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+        self.factory = RequestFactory()
+
+        @cache_tagged_page(lambda request: ['swr'], timeout=10, grace=30)
+        def view(request):
+            self.calls += 1
+            return HttpResponse(f'render {self.calls}')
+        self.view = view
+
+    def get(self):
+        request = self.factory.get('/swr/')
+        request.user = AnonymousUser()
+        return self.view(request)
+
+    def key(self):
+        request = self.factory.get('/swr/')
+        request.user = AnonymousUser()
+        return page_key(request, 'view', tag_versions(['swr']))
+
+    def test_fresh_page_is_served_from_cache(self):
+        self.assertEqual(self.get()['X-Page-Cache'], 'miss')
+        response = self.get()
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertEqual(response.content, b'render 1')
+
+    def test_stale_page_is_served_while_other_worker_renders(self):
+        self.get()
+        cache.add(lock_key(self.key()), 1)
+        with mock.patch('posts.caching.time.time',
+                        return_value=time.time() + 15):
+            response = self.get()
+        self.assertEqual(response['X-Page-Cache'], 'stale')
+        self.assertEqual(response.content, b'render 1')
+        self.assertEqual(self.calls, 1)
+
+    def test_single_worker_regenerates_stale_page(self):
+        self.get()
+        with mock.patch('posts.caching.time.time',
+                        return_value=time.time() + 15):
+            response = self.get()
+            self.assertEqual(response.content, b'render 2')
+            self.assertEqual(self.get()['X-Page-Cache'], 'hit')
+        self.assertEqual(self.calls, 2)
+        self.assertIsNone(cache.get(lock_key(self.key())))
+
+    def test_miss_waits_for_lock_holder(self):
+        """При промахе без блокировки запрос ждёт чужую сборку страницы."""
+        cache.add(lock_key(self.key()), 1)
+        stored = (HttpResponse('other worker'), time.time() + 10)
+        with mock.patch('posts.caching.wait_for', return_value=stored):
+            response = self.get()
+        self.assertEqual(response.content, b'other worker')
+        self.assertEqual(self.calls, 0)
+
+    def test_counters(self):
+        self.get()
+        self.get()
+        self.assertEqual(page_cache_stats(['view'])['view'],
+                         {'hit': 1, 'miss': 1, 'stale': 0})
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Ivan')
+        cls.reader = User.objects.create_user(username='Petr')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.post = Post.objects.create(text='Текст',
+                                        author=ConditionalGetTest.user)
+
+    def revalidate(self, url, response):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_unchanged_feed_is_not_modified(self):
+        url = reverse('posts:main_page')
+        response = self.client.get(url)
+        self.assertEqual(response['Vary'], 'Cookie')
+        with mock.patch('posts.views.pages_per_page') as view_queryset:
+            again = self.revalidate(url, response)
+        view_queryset.assert_not_called()
+        self.assertEqual(again.status_code, 304)
+
+    def test_new_post_changes_feed_etag(self):
+        url = reverse('posts:main_page')
+        response = self.client.get(url)
+        Post.objects.create(text='Ещё пост', author=ConditionalGetTest.user)
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
+
+    def test_feed_etag_expires_with_page_cache(self):
+        # Новый комментарий теги лент не сбрасывает, а число в карточке
+        # меняет: ETag устаревает вместе с копией в кэше страниц.
+        url = reverse('posts:main_page')
+        response = self.client.get(url)
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text='Комментарий')
+        later = time.time() + PAGE_CACHE_TIMEOUT
+        with mock.patch('posts.caching.time.time', return_value=later):
+            again = self.revalidate(url, response)
+        self.assertEqual(again.status_code, 200)
+
+    def test_feed_etag_depends_on_user(self):
+        url = reverse('posts:main_page')
+        response = self.client.get(url)
+        self.client.force_login(ConditionalGetTest.reader)
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
+
+    def test_unchanged_post_is_not_modified(self):
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        response = self.client.get(url)
+        self.assertIn('Last-Modified', response)
+        with self.assertNumQueries(1):
+            again = self.revalidate(url, response)
+        self.assertEqual(again.status_code, 304)
+        again = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(again.status_code, 304)
+
+    def test_comment_changes_post_etag(self):
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        response = self.client.get(url)
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text='Комментарий')
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
@@ -0,0 +1,62 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.cards import card_key, render_cards
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class PostCardCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Ivan')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.post = Post.objects.create(text='Первый текст',
+                                        author=PostCardCacheTest.user,
+                                        group=PostCardCacheTest.group)
+
+    def fetch(self):
+        return Post.objects.select_related('author', 'group').get(
+            pk=self.post.pk)
+
+    def test_card_is_rendered_once_for_all_feeds(self):
+        self.client.get(reverse('posts:main_page'))
+        with mock.patch('posts.cards.render_to_string') as render:
+            response = self.client.get(
+                reverse('posts:group_list', args=['group']))
+        render.assert_not_called()
+        self.assertContains(response, 'Первый текст')
+
+    def test_page_cards_are_read_in_one_call(self):
+        Post.objects.create(text='Второй текст', author=self.user)
+        posts = list(Post.objects.select_related('author', 'group'))
+        render_cards(posts)
+        with mock.patch.object(cache, 'get_many',
+                               wraps=cache.get_many) as get_many:
+            cards = render_cards(posts)
+        get_many.assert_called_once()
+        self.assertIn('Второй текст', cards[0])
+        self.assertIn('Первый текст', cards[1])
+
+    def test_edit_changes_card_key(self):
+        old_key = card_key(self.fetch())
+        self.post.text = 'Новый текст'
+        self.post.save()
+        self.assertNotEqual(card_key(self.fetch()), old_key)
+        self.assertIn('Новый текст', render_cards([self.fetch()])[0])
+
+    def test_new_comment_changes_card_key(self):
+        old_key = card_key(self.fetch())
+        Comment.objects.create(post=self.post, author=self.user,
+                               text='Комментарий')
+        self.assertNotEqual(card_key(self.fetch()), old_key)
@@ -0,0 +1,77 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import AuthorStats, Comment, Follow, Post
+
+User = get_user_model()
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Ivan')
+        cls.reader = User.objects.create_user(username='Petr')
+
+    def stats(self, user):
+        return AuthorStats.objects.get(user=user)
+
+    def test_posts_count_follows_create_and_delete(self):
+        post = Post.objects.create(text='Текст', author=CountersTest.author)
+        Post.objects.create(text='Текст_2', author=CountersTest.author)
+        self.assertEqual(self.stats(CountersTest.author).posts_count, 2)
+        post.delete()
+        self.assertEqual(self.stats(CountersTest.author).posts_count, 1)
+
+    def test_follow_counters(self):
+        follow = Follow.objects.create(user=CountersTest.reader,
+                                       author=CountersTest.author)
+        self.assertEqual(self.stats(CountersTest.author).followers_count, 1)
+        self.assertEqual(self.stats(CountersTest.reader).following_count, 1)
+        follow.delete()
+        self.assertEqual(self.stats(CountersTest.author).followers_count, 0)
+        self.assertEqual(self.stats(CountersTest.reader).following_count, 0)
+
+    def test_comments_count(self):
+        post = Post.objects.create(text='Текст', author=CountersTest.author)
+        comment = Comment.objects.create(post=post, author=CountersTest.reader,
+                                         text='Привет')
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+
+    def test_missing_stats_row_is_recounted(self):
+        Post.objects.create(text='Текст', author=CountersTest.author)
+        AuthorStats.objects.filter(user=CountersTest.author).delete()
+        Post.objects.create(text='Текст_2', author=CountersTest.author)
+        self.assertEqual(self.stats(CountersTest.author).posts_count, 2)
+
+    def test_reconcile_command_fixes_drift(self):
+        post = Post.objects.create(text='Текст', author=CountersTest.author)
+        Comment.objects.create(post=post, author=CountersTest.reader,
+                               text='Привет')
+        AuthorStats.objects.filter(user=CountersTest.author).update(
+            posts_count=7, followers_count=3)
+        AuthorStats.objects.filter(user=CountersTest.reader).delete()
+        Post.objects.filter(pk=post.pk).update(comments_count=0)
+        out = StringIO()
+        call_command('reconcile_counters', batch_size=1, stdout=out)
+        self.assertEqual(self.stats(CountersTest.author).posts_count, 1)
+        self.assertEqual(self.stats(CountersTest.author).followers_count, 0)
+        self.assertTrue(
+            AuthorStats.objects.filter(user=CountersTest.reader).exists())
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertIn('авторов 2, постов 1', out.getvalue())
+
+    def test_profile_reads_counters_without_count(self):
+        Post.objects.create(text='Текст', author=CountersTest.author)
+        response = Client().get(reverse(
+            'posts:profile', kwargs={'username': CountersTest.author}))
+        self.assertContains(response, 'Всего постов: 1')
@@ -0,0 +1,123 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.jobs import work
+from posts.models import FeedEntry, Follow, Post
+
+User = get_user_model()
+
+
+class FollowFeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Petr')
+        cls.author = User.objects.create_user(username='Ivan')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(FollowFeedTest.reader)
+
+    def feed(self, query=''):
+        response = self.client.get(reverse('posts:follow_index') + query)
+        return response.context['page_obj']
+
+    def test_new_post_is_fanned_out_in_background(self):
+        Follow.objects.create(user=FollowFeedTest.reader,
+                              author=FollowFeedTest.author)
+        post = Post.objects.create(text='Текст', author=FollowFeedTest.author)
+        self.assertFalse(FeedEntry.objects.exists())
+        self.assertEqual(list(self.feed()), [post])
+        work(burst=True)
+        self.assertTrue(FeedEntry.objects.filter(
+            user=FollowFeedTest.reader, post=post).exists())
+        self.assertTrue(Post.objects.get(pk=post.pk).fanned_out)
+        cache.clear()
+        self.assertEqual(list(self.feed()), [post])
+
+    def test_follow_backfills_and_unfollow_trims(self):
+        posts = [Post.objects.create(text=f'Текст {number}',
+                                     author=FollowFeedTest.author)
+                 for number in range(3)]
+        follow = Follow.objects.create(user=FollowFeedTest.reader,
+                                       author=FollowFeedTest.author)
+        self.assertEqual(set(self.feed()), set(posts))
+        follow.delete()
+        self.assertFalse(FeedEntry.objects.exists())
+        self.assertEqual(len(self.feed()), 0)
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_popular_author_is_read_on_request(self):
+        """Посты популярного автора не раскладываются по ящикам."""
+        fan = User.objects.create_user(username='Gena')
+        Follow.objects.create(user=fan, author=FollowFeedTest.author)
+        Follow.objects.create(user=FollowFeedTest.reader,
+                              author=FollowFeedTest.author)
+        post = Post.objects.create(text='Хит', author=FollowFeedTest.author)
+        work(burst=True)
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        self.assertEqual(list(self.feed()), [post])
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_author_below_limit_is_backfilled(self):
+        fan = User.objects.create_user(username='Gena')
+        follow = Follow.objects.create(user=fan, author=FollowFeedTest.author)
+        Follow.objects.create(user=FollowFeedTest.reader,
+                              author=FollowFeedTest.author)
+        post = Post.objects.create(text='Хит', author=FollowFeedTest.author)
+        work(burst=True)
+        follow.delete()
+        work(burst=True)
+        self.assertTrue(FeedEntry.objects.filter(
+            user=FollowFeedTest.reader, post=post).exists())
+        self.assertEqual(list(self.feed()), [post])
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_feed_pages_merge_inbox_and_popular_posts(self):
+        other = User.objects.create_user(username='Gena')
+        fan = User.objects.create_user(username='Fan')
+        Follow.objects.create(user=fan, author=FollowFeedTest.author)
+        for author in (FollowFeedTest.author, other):
+            Follow.objects.create(user=FollowFeedTest.reader, author=author)
+        for number in range(13):
+            Post.objects.create(text=f'Текст {number}',
+                                author=(FollowFeedTest.author, other)[
+                                    number % 2])
+        work(burst=True)
+        self.assertEqual(FeedEntry.objects.count(), 6)
+        first = self.feed()
+        second = self.feed(first.paginator.next_link)
+        texts = [post.text for post in list(first) + list(second)]
+        self.assertEqual(len(first), 10)
+        self.assertEqual(texts, [f'Текст {number}'
+                                 for number in reversed(range(13))])
+
+    def test_feed_queries_do_not_grow_with_follows(self):
+        for number in range(5):
+            author = User.objects.create_user(username=f'author_{number}')
+            Follow.objects.create(user=FollowFeedTest.reader, author=author)
+            Post.objects.create(text='Текст', author=author)
+        cache.clear()
+        with CaptureQueriesContext(connection) as few:
+            self.feed()
+        for number in range(5, 15):
+            author = User.objects.create_user(username=f'author_{number}')
+            Follow.objects.create(user=FollowFeedTest.reader, author=author)
+            Post.objects.create(text='Текст', author=author)
+        cache.clear()
+        with CaptureQueriesContext(connection) as many:
+            self.feed()
+        self.assertEqual(len(few), len(many))
+
+    @override_settings(FEED_INBOX_ENABLED=False)
+    def test_feed_without_inbox(self):
+        Follow.objects.create(user=FollowFeedTest.reader,
+                              author=FollowFeedTest.author)
+        post = Post.objects.create(text='Текст', author=FollowFeedTest.author)
+        self.assertFalse(FeedEntry.objects.exists())
+        self.assertEqual(list(self.feed()), [post])
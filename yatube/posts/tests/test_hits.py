@@ -0,0 +1,116 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.hits import ViewBuffer, buffer, view_count
+from posts.models import Post
+
+User = get_user_model()
+
+
+@override_settings(VIEW_FLUSH_INTERVAL=3600, VIEW_FLUSH_SIZE=1000)
+class PostViewsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        buffer.take()
+        self.author = User.objects.create_user(username='Ivan')
+        self.posts = [Post.objects.create(text=f'Пост {number}',
+                                          author=self.author)
+                      for number in range(3)]
+
+    def tearDown(self):
+        buffer.take()
+
+    def visit(self, post, client=None):
+        client = client or Client()
+        return client.get(reverse('posts:post_detail', args=[post.pk]))
+
+    def views(self, post):
+        return Post.objects.get(pk=post.pk).views_count
+
+    def test_views_are_buffered_and_merged(self):
+        post = self.posts[0]
+        with CaptureQueriesContext(connection) as queries:
+            self.visit(post)
+        self.assertFalse([query for query in queries.captured_queries
+                          if query['sql'].startswith('UPDATE')])
+        self.assertEqual(self.views(post), 0)
+        self.assertEqual(view_count(Post.objects.get(pk=post.pk)), 1)
+        self.assertContains(self.visit(post, Client(
+            HTTP_USER_AGENT='other')), 'Просмотров: 2')
+
+    def test_repeated_view_of_one_viewer_is_counted_once(self):
+        client = Client()
+        client.force_login(self.author)
+        for _ in range(3):
+            self.visit(self.posts[0], client)
+        self.visit(self.posts[1], client)
+        self.assertEqual(buffer.pending, {self.posts[0].pk: 1,
+                                          self.posts[1].pk: 1})
+
+    def test_flush_writes_all_posts_in_one_update(self):
+        for post, amount in zip(self.posts, (3, 1, 2)):
+            for _ in range(amount):
+                buffer.add(post.pk)
+        with CaptureQueriesContext(connection) as queries:
+            buffer.flush()
+        self.assertEqual(len(queries), 1)
+        self.assertIn('CASE', queries[0]['sql'])
+        self.assertEqual([self.views(post) for post in self.posts],
+                         [3, 1, 2])
+        self.assertEqual(buffer.pending, {})
+
+    def test_buffer_flushes_by_interval_and_size(self):
+        views = ViewBuffer()
+        with override_settings(VIEW_FLUSH_SIZE=2):
+            views.add(self.posts[0].pk)
+            self.assertEqual(self.views(self.posts[0]), 0)
+            views.add(self.posts[1].pk)
+        self.assertEqual(self.views(self.posts[0]), 1)
+        with override_settings(VIEW_FLUSH_INTERVAL=0):
+            views.add(self.posts[2].pk)
+        self.assertEqual(self.views(self.posts[2]), 1)
+
+    def test_background_flush_without_new_views(self):
+        views = ViewBuffer()
+        with override_settings(VIEW_FLUSH_BACKGROUND=True), \
+                mock.patch('posts.hits.threading.Thread') as thread:
+            views.add(self.posts[0].pk)
+            views.add(self.posts[1].pk)
+        thread.assert_called_once()
+        with mock.patch('posts.hits.time.sleep',
+                        side_effect=[None, SystemExit]), \
+                mock.patch('posts.hits.close_old_connections'):
+            with self.assertRaises(SystemExit):
+                views.run()
+        self.assertEqual([self.views(post) for post in self.posts[:2]],
+                         [1, 1])
+        self.assertEqual(views.pending, {})
+
+    def test_failed_flush_keeps_views(self):
+        buffer.add(self.posts[0].pk)
+        with mock.patch('posts.hits.write_views',
+                        side_effect=DatabaseError):
+            with self.assertLogs('posts.hits', 'ERROR'):
+                buffer.flush()
+        self.assertEqual(buffer.get(self.posts[0].pk), 1)
+
+    def test_listing_cards_show_merged_views(self):
+        Post.objects.filter(pk=self.posts[0].pk).update(views_count=5)
+        buffer.add(self.posts[0].pk)
+        self.client.force_login(self.author)
+        for url in (reverse('posts:main_page'),
+                    reverse('posts:profile', args=[self.author.username])):
+            self.assertContains(self.client.get(url), 'Просмотров: 6')
+
+    def test_api_returns_merged_views(self):
+        post = self.posts[0]
+        Post.objects.filter(pk=post.pk).update(views_count=5)
+        buffer.add(post.pk)
+        response = self.client.get(
+            reverse('api:post_detail', args=[post.pk]) + '?fields=views')
+        self.assertEqual(response.json(), {'views': 6})
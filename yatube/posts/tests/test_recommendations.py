@@ -0,0 +1,96 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.cofollow import recommend
+from posts.models import Comment, Follow, Post, Recommendations
+
+User = get_user_model()
+
+
+class RecommendationsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = {name: User.objects.create_user(username=name)
+                      for name in ('ann', 'bob', 'eve', 'kim', 'leo', 'max')}
+        # ann и bob читают kim; bob, eve и leo читают max; eve читает leo.
+        for user, author in (('ann', 'kim'), ('bob', 'kim'),
+                             ('bob', 'max'), ('eve', 'max'),
+                             ('leo', 'max'), ('eve', 'leo')):
+            Follow.objects.create(user=self.users[user],
+                                  author=self.users[author])
+
+    def ids(self, *names):
+        return [self.users[name].pk for name in names]
+
+    def refresh(self, *args):
+        call_command('refresh_recommendations', *args, stdout=StringIO())
+
+    def test_co_followed_author_goes_first(self):
+        result = recommend(self.ids('ann'), top=2)
+        self.assertEqual(result[self.users['ann'].pk], self.ids('max', 'leo'))
+
+    def test_followed_authors_and_self_are_excluded(self):
+        result = recommend(self.ids('bob', 'max'), top=10)
+        self.assertNotIn(self.users['kim'].pk, result[self.users['bob'].pk])
+        self.assertNotIn(self.users['max'].pk, result[self.users['bob'].pk])
+        self.assertNotIn(self.users['bob'].pk, result[self.users['bob'].pk])
+        self.assertNotIn(self.users['max'].pk, result[self.users['max'].pk])
+
+    def test_comment_counts_as_interaction(self):
+        newcomer = User.objects.create_user(username='new')
+        post = Post.objects.create(text='Текст', author=self.users['kim'])
+        Comment.objects.create(text='Отлично', author=newcomer, post=post)
+        result = recommend([newcomer.pk], top=2)
+        self.assertEqual(result[newcomer.pk],
+                         self.ids('kim', 'max'))
+
+    def test_user_without_history_gets_popular_authors(self):
+        newcomer = User.objects.create_user(username='new')
+        result = recommend([newcomer.pk], top=2)
+        self.assertEqual(result[newcomer.pk], self.ids('max', 'kim'))
+
+    def test_pool_gives_same_result(self):
+        user_ids = list(User.objects.values_list('pk', flat=True))
+        self.assertEqual(recommend(user_ids, top=3, chunk_size=2,
+                                   processes=2),
+                         recommend(user_ids, top=3))
+
+    def test_command_refreshes_only_stale_users(self):
+        self.refresh()
+        self.assertEqual(Recommendations.objects.filter(stale=False).count(),
+                         len(self.users))
+        ann = Recommendations.objects.get(user=self.users['ann'])
+        self.assertEqual(ann.author_ids()[:2], self.ids('max', 'leo'))
+        Follow.objects.create(user=self.users['ann'],
+                              author=self.users['max'])
+        self.assertEqual(list(Recommendations.objects.filter(
+            stale=True).values_list('user_id', flat=True)), self.ids('ann'))
+        self.refresh()
+        self.assertFalse(Recommendations.objects.filter(stale=True).exists())
+        ann.refresh_from_db()
+        self.assertNotIn(self.users['max'].pk, ann.author_ids())
+
+    def test_pages_show_recommendations(self):
+        self.refresh()
+        client = Client()
+        client.force_login(self.users['ann'])
+        for url in (reverse('posts:follow_index'),
+                    reverse('posts:profile', args=['ann'])):
+            with self.subTest(url=url):
+                response = client.get(url)
+                self.assertEqual(
+                    [author.username
+                     for author in response.context['recommended']][:2],
+                    ['max', 'leo'])
+
+    def test_followed_author_is_hidden_before_refresh(self):
+        self.refresh()
+        client = Client()
+        client.force_login(self.users['ann'])
+        client.get(reverse('posts:profile_follow', args=['max']))
+        response = client.get(reverse('posts:follow_index'))
+        self.assertNotIn(self.users['max'], response.context['recommended'])
@@ -0,0 +1,120 @@
+from io import StringIO
+
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+
+from posts.admin import PostAdmin
+from posts.models import Post
+from posts.search import highlight, search_queryset, terms
+from posts.stemmer import stem
+
+User = get_user_model()
+
+
+class StemmerTest(TestCase):
+    def test_word_forms_share_stem(self):
+        forms = ('рассказ', 'рассказы', 'рассказом', 'рассказами')
+        self.assertEqual({stem(word) for word in forms}, {'рассказ'})
+
+    def test_known_stems(self):
+        for word, expected in (('августовской', 'августовск'),
+                               ('важности', 'важност'),
+                               ('прекраснейшая', 'прекрасн'),
+                               ('ёлка', 'елк')):
+            with self.subTest(word=word):
+                self.assertEqual(stem(word), expected)
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Ivan')
+
+    def setUp(self):
+        self.client = Client()
+
+    def search(self, query, extra=''):
+        response = self.client.get(reverse('posts:search'),
+                                   {'q': query, **dict(extra)})
+        return response.context['page_obj']
+
+    def create(self, text):
+        return Post.objects.create(text=text, author=SearchTest.user)
+
+    def test_finds_other_word_forms(self):
+        post = self.create('Дракон спал в пещере среди рассказов о битвах')
+        self.create('Совсем про другое')
+        self.assertEqual(list(self.search('рассказ')), [post])
+
+    def test_more_relevant_post_comes_first(self):
+        once = self.create('Один дракон и много людей вокруг замка')
+        twice = self.create('Дракон, дракон и ещё раз дракон')
+        self.assertEqual(list(self.search('драконы')), [twice, once])
+
+    def test_index_follows_edit_and_delete(self):
+        post = self.create('Старый текст про рыцаря')
+        post.text = 'Новый текст про волшебника'
+        post.save()
+        self.assertEqual(len(self.search('рыцарь')), 0)
+        self.assertEqual(list(self.search('волшебник')), [post])
+        post.delete()
+        self.assertEqual(len(self.search('волшебник')), 0)
+
+    def test_results_are_highlighted(self):
+        self.create('В замке жил <b>дракон</b>')
+        response = self.client.get(reverse('posts:search'), {'q': 'драконы'})
+        self.assertContains(response, '<mark>дракон</mark>')
+        self.assertContains(response, '&lt;b&gt;')
+
+    def test_cursor_pages(self):
+        posts = [self.create(f'Дракон номер {number}') for number in range(25)]
+        first = self.search('дракон')
+        second = self.client.get(
+            reverse('posts:search') + first.paginator.next_link
+        ).context['page_obj']
+        self.assertEqual(len(first), 20)
+        self.assertEqual(len(second), 5)
+        self.assertEqual(set(first) | set(second), set(posts))
+        back = self.client.get(
+            reverse('posts:search') + second.paginator.previous_link
+        ).context['page_obj']
+        self.assertEqual(list(back), list(first))
+
+    def test_oversized_cursor_gives_first_page(self):
+        post = self.create('Дракон')
+        response = self.client.get(reverse('posts:search'), {
+            'q': 'дракон', 'after': f'1.0_{2 ** 64}'})
+        self.assertEqual(list(response.context['page_obj']), [post])
+
+    def test_rebuild_restores_index(self):
+        post = self.create('Сказка о потерянном времени')
+        call_command('rebuild_search_index', batch_size=1,
+                     stdout=StringIO())
+        self.assertEqual(list(self.search('сказки')), [post])
+
+    def test_admin_search_uses_index(self):
+        post = self.create('Повесть о летающих кораблях')
+        self.create('Рассказ о другом')
+        request = RequestFactory().get('/admin/posts/post/')
+        model_admin = PostAdmin(Post, admin.site)
+        found, distinct = model_admin.get_search_results(
+            request, Post.objects.all(), 'корабли')
+        self.assertEqual(list(found), [post])
+        self.assertFalse(distinct)
+
+    def test_empty_query(self):
+        self.create('Текст')
+        self.assertEqual(len(self.search('')), 0)
+        self.assertEqual(terms('!!!'), [])
+        self.assertEqual(search_queryset(Post.objects, '').count(), 0)
+
+    def test_highlight_snippet(self):
+        text = ' '.join(['слово'] * 40 + ['дракон'] + ['слово'] * 40)
+        snippet = highlight(text, terms('дракон'))
+        self.assertTrue(snippet.startswith('…'))
+        self.assertTrue(snippet.endswith('…'))
+        self.assertIn('<mark>дракон</mark>', snippet)
@@ -0,0 +1,70 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import (AuthorStats, Comment, FeedEntry, Follow, Group,
+                          Post, User)
+
+OPTIONS = {'users': 30, 'groups': 3, 'posts': 60, 'comments': 60,
+           'seed': 7, 'chunk_size': 25}
+
+
+def seed_blog(**options):
+    call_command('seed_blog', stdout=StringIO(), **{**OPTIONS, **options})
+
+
+def snapshot():
+    return list(Post.objects.order_by('pub_date', 'text').values_list(
+        'author__username', 'group__slug', 'pub_date', 'text'))
+
+
+class SeedBlogTest(TestCase):
+    def test_creates_requested_amounts(self):
+        seed_blog()
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Post.objects.count(), 60)
+        self.assertEqual(Comment.objects.count(), 60)
+        self.assertTrue(Follow.objects.exists())
+        self.assertGreater(min(len(post.text) for post in Post.objects.all()),
+                           200)
+
+    def test_same_seed_gives_same_data(self):
+        seed_blog()
+        first = snapshot()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        seed_blog()
+        self.assertEqual(snapshot(), first)
+
+    def test_followers_are_skewed(self):
+        seed_blog(users=200, posts=10, comments=0)
+        counts = sorted(AuthorStats.objects.values_list(
+            'followers_count', flat=True), reverse=True)
+        self.assertGreater(counts[0], 10 * max(counts[len(counts) // 2], 1))
+
+    def test_derived_data_is_rebuilt(self):
+        seed_blog()
+        stats = AuthorStats.objects.get(user__username='seed_7_0')
+        self.assertEqual(stats.posts_count, Post.objects.filter(
+            author__username='seed_7_0').count())
+        self.assertTrue(FeedEntry.objects.exists())
+
+    def test_seeded_comments_are_thread_roots(self):
+        seed_blog()
+        self.assertFalse(Comment.objects.filter(path='').exists())
+        parent = Comment.objects.order_by('pk').first()
+        client = Client()
+        client.force_login(parent.author)
+        client.post(reverse('posts:add_comment', args=[parent.post_id]),
+                    {'text': 'Ответ', 'parent': parent.pk})
+        reply = Comment.objects.get(text='Ответ')
+        self.assertEqual(reply.parent_id, parent.pk)
+        self.assertTrue(reply.path.startswith(parent.path))
+        parent.refresh_from_db()
+        self.assertEqual(parent.replies_count, 1)
+        thread = client.get(reverse(
+            'posts:comment_thread', args=[parent.post_id, parent.pk]))
+        self.assertEqual([comment.pk for comment in thread.context[
+            'comments']], [parent.pk, reply.pk])
@@ -0,0 +1,122 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.models import Group, Post, RelatedPost
+from posts.similarity import pending, refresh, stems
+
+User = get_user_model()
+
+
+class RelatedPostsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='Ivan')
+        self.sea = Group.objects.create(title='Море', slug='sea')
+        self.posts = [
+            Post.objects.create(text=text, author=self.author, group=group)
+            for text, group in (
+                ('Корабль вышел в море на рассвете', self.sea),
+                ('Корабли стояли в гавани у моря', self.sea),
+                ('Рецепт пирога с яблоками', None),
+                ('Пирог с яблоками и корицей', None),
+            )]
+
+    def related(self, post):
+        return list(RelatedPost.objects.filter(post=post).order_by(
+            'rank').values_list('related_id', flat=True))
+
+    def refresh(self, *args):
+        call_command('refresh_related_posts', *args, stdout=StringIO())
+
+    def test_neighbours_share_words_and_group(self):
+        refresh(top=1)
+        first, second, pie, cake = self.posts
+        self.assertEqual(self.related(first), [second.pk])
+        self.assertEqual(self.related(pie), [cake.pk])
+
+    def test_unrelated_posts_are_not_stored(self):
+        refresh()
+        self.assertNotIn(self.posts[2].pk, self.related(self.posts[0]))
+        self.assertNotIn(self.posts[0].pk, self.related(self.posts[0]))
+
+    def test_chunks_give_same_result(self):
+        refresh(chunk_size=1)
+        chunked = list(RelatedPost.objects.order_by(
+            'post', 'rank').values_list('post', 'related'))
+        refresh()
+        self.assertEqual(chunked, list(RelatedPost.objects.order_by(
+            'post', 'rank').values_list('post', 'related')))
+
+    def test_new_post_is_added_incrementally(self):
+        self.refresh()
+        pie = self.posts[2]
+        stored = RelatedPost.objects.exclude(post=pie).values_list(
+            'pk', flat=True)
+        untouched = set(stored)
+        new = Post.objects.create(text='Рецепт яблочного пирога',
+                                  author=self.author)
+        self.refresh()
+        self.assertEqual(self.related(new)[0], pie.pk)
+        self.assertIn(new.pk, self.related(pie))
+        self.assertTrue(untouched & set(RelatedPost.objects.values_list(
+            'pk', flat=True)))
+
+    def test_post_without_neighbours_is_not_pending(self):
+        lonely = Post.objects.create(text='Астрономия звёздных скоплений',
+                                     author=self.author)
+        self.refresh()
+        self.assertEqual(self.related(lonely), [])
+        self.assertEqual(pending(), [])
+
+    def test_only_new_texts_are_parsed(self):
+        self.refresh()
+        new = Post.objects.create(text='Рецепт яблочного пирога',
+                                  author=self.author)
+        with mock.patch('posts.similarity.stems',
+                        side_effect=stems) as parsed:
+            self.refresh()
+        self.assertEqual(parsed.call_args_list, [mock.call(new.text)])
+        post = self.posts[0]
+        post.text = 'Пирог с корицей'
+        post.save()
+        self.assertEqual(pending(), [post.pk])
+
+    def test_edit_drops_stale_neighbours(self):
+        self.refresh()
+        post = self.posts[0]
+        post.text = 'Пирог с корицей'
+        post.group = None
+        post.save()
+        self.assertEqual(self.related(post), [])
+        self.refresh()
+        self.assertIn(self.posts[3].pk, self.related(post))
+
+    def test_post_page_shows_related_in_one_query(self):
+        self.refresh()
+        first = self.posts[0]
+        url = reverse('posts:post_detail', args=[first.pk])
+        client = Client()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        related = [entry.related for entry in response.context[
+            'related_posts']]
+        self.assertEqual(related[0], self.posts[1])
+        self.assertEqual(
+            sum(query['sql'].startswith('SELECT "posts_relatedpost".')
+                for query in queries.captured_queries), 1)
+        self.assertContains(response, 'Похожие записи')
+
+    def test_refresh_changes_post_etag(self):
+        url = reverse('posts:post_detail', args=[self.posts[0].pk])
+        client = Client()
+        etag = client.get(url)['ETag']
+        self.refresh()
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
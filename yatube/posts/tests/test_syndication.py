@@ -0,0 +1,84 @@
+from unittest import mock
+from xml.etree import ElementTree
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.models import Group, Post
+
+User = get_user_model()
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+
+
+class SyndicationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Ivan',
+                                              first_name='Иван')
+        cls.group = Group.objects.create(title='Повести', slug='tales',
+                                         description='Описание')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        for number in range(3):
+            Post.objects.create(text=f'Глава {number}', author=self.author,
+                                group=self.group)
+
+    def read(self, response):
+        self.assertTrue(response.streaming)
+        return ElementTree.fromstring(b''.join(response.streaming_content))
+
+    def test_atom_feed_lists_newest_posts(self):
+        response = self.client.get(reverse('posts:site_feed', args=['atom']))
+        self.assertEqual(response['Content-Type'],
+                         'application/atom+xml; charset=utf-8')
+        entries = self.read(response).findall(f'{ATOM}entry')
+        self.assertEqual([entry.find(f'{ATOM}title').text
+                          for entry in entries],
+                         ['Глава 2', 'Глава 1', 'Глава 0'])
+        self.assertEqual(entries[0].find(f'{ATOM}author/{ATOM}name').text,
+                         'Иван')
+
+    def test_rss_feeds_of_group_and_author(self):
+        for url in (reverse('posts:group_feed', args=['tales', 'rss']),
+                    reverse('posts:author_feed', args=['Ivan', 'rss'])):
+            with self.subTest(url=url):
+                items = self.read(self.client.get(url)).findall(
+                    'channel/item')
+                self.assertEqual(len(items), 3)
+                self.assertEqual(items[0].find('category').text, 'Повести')
+
+    def test_unknown_feed_is_not_found(self):
+        for url in (reverse('posts:site_feed', args=['json']),
+                    reverse('posts:group_feed', args=['none', 'atom']),
+                    reverse('posts:author_feed', args=['none', 'rss'])):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_feed_is_cached_until_new_post(self):
+        url = reverse('posts:site_feed', args=['atom'])
+        self.read(self.client.get(url))
+        with mock.patch('posts.syndication.post_item') as post_item:
+            response = self.client.get(url)
+        post_item.assert_not_called()
+        self.assertFalse(response.streaming)
+        self.assertIn('Глава 2', response.content.decode())
+        Post.objects.create(text='Глава 3', author=self.author)
+        self.assertIn('Глава 3', b''.join(
+            self.client.get(url).streaming_content).decode())
+
+    def test_unchanged_feed_is_not_modified(self):
+        url = reverse('posts:group_feed', args=['tales', 'atom'])
+        response = self.client.get(url)
+        self.assertIn('public', response['Cache-Control'])
+        with self.assertNumQueries(0):
+            again = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+        Post.objects.create(text='Глава 3', author=self.author,
+                            group=self.group)
+        again = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 200)
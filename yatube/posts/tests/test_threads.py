@@ -0,0 +1,124 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.hits import buffer
+from posts.models import Comment, Post
+from posts.threads import MAX_DEPTH, SHOWN_REPLIES, segment
+
+User = get_user_model()
+
+
+class CommentThreadsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        buffer.take()
+        self.user = User.objects.create_user(username='Ivan')
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.post = Post.objects.create(text='Глава', author=self.user)
+
+    def tearDown(self):
+        buffer.take()
+
+    def comment(self, parent=None, post=None):
+        return Comment.objects.create(post=post or self.post,
+                                      author=self.user, text='Реплика',
+                                      parent=parent)
+
+    def fresh(self, comment):
+        return Comment.objects.get(pk=comment.pk)
+
+    def test_path_thread_and_counts(self):
+        root = self.comment()
+        reply = self.comment(root)
+        nested = self.comment(reply)
+        nested = self.fresh(nested)
+        self.assertEqual(self.fresh(root).path, segment(root.pk))
+        self.assertEqual(nested.path, segment(root.pk) + segment(reply.pk)
+                         + segment(nested.pk))
+        self.assertEqual((nested.depth, nested.thread_id, nested.position),
+                         (2, root.pk, 2))
+        self.assertEqual(self.fresh(root).replies_count, 2)
+        self.assertEqual(self.fresh(reply).replies_count, 1)
+
+    def test_subtree_delete_updates_counts(self):
+        root = self.comment()
+        reply = self.comment(root)
+        self.comment(reply)
+        self.comment(root)
+        reply.delete()
+        self.assertEqual(self.fresh(root).replies_count, 1)
+        self.assertEqual(Post.objects.get(pk=self.post.pk).comments_count, 2)
+
+    def test_position_is_not_reused_after_delete(self):
+        root = self.comment()
+        first, second = self.comment(root), self.comment(root)
+        first.delete()
+        third = self.comment(root)
+        positions = [self.fresh(reply).position for reply in (second, third)]
+        self.assertEqual(positions, [2, 3])
+
+    def test_depth_is_limited(self):
+        comment = self.comment()
+        for _ in range(MAX_DEPTH + 2):
+            comment = self.comment(comment)
+        depths = Comment.objects.values_list('depth', flat=True)
+        self.assertEqual(max(depths), MAX_DEPTH - 1)
+
+    def test_post_page_shows_first_replies(self):
+        root = self.comment()
+        replies = [self.comment(root) for _ in range(SHOWN_REPLIES + 2)]
+        self.comment(replies[0])
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        with CaptureQueriesContext(connection) as few:
+            response = Client().get(url)
+        shown = response.context['comments'][0]
+        self.assertEqual([reply.pk for reply in shown.replies],
+                         [reply.pk for reply in replies[:SHOWN_REPLIES]])
+        self.assertEqual(shown.hidden_replies, 3)
+        for _ in range(3):
+            self.comment(self.comment(self.comment()))
+        cache.clear()
+        with CaptureQueriesContext(connection) as many:
+            Client().get(url)
+        self.assertEqual(len(few), len(many))
+
+    def test_thread_page_loads_subtree(self):
+        root = self.comment()
+        reply = self.comment(root)
+        nested = self.comment(reply)
+        self.comment(root)
+        response = self.client.get(reverse(
+            'posts:comment_thread', args=[self.post.pk, reply.pk]))
+        comments = response.context['comments']
+        self.assertEqual([comment.pk for comment in comments],
+                         [reply.pk, nested.pk])
+        self.assertEqual([comment.indent for comment in comments], [0, 1])
+
+    def test_reply_is_added_to_thread(self):
+        root = self.comment()
+        response = self.client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Ответ', 'parent': root.pk})
+        self.assertRedirects(response, reverse(
+            'posts:comment_thread', args=[self.post.pk, root.pk]))
+        self.assertEqual(self.fresh(root).replies_count, 1)
+
+    def test_reply_to_other_post_is_rejected(self):
+        other = Post.objects.create(text='Другая глава', author=self.user)
+        foreign = self.comment(post=other)
+        self.client.post(reverse('posts:add_comment', args=[self.post.pk]),
+                         {'text': 'Ответ', 'parent': foreign.pk})
+        self.assertFalse(Comment.objects.filter(text='Ответ').exists())
+
+    def test_parent_without_path_is_refused(self):
+        root = self.comment()
+        Comment.objects.filter(pk=root.pk).update(path='')
+        with self.assertRaises(ValueError):
+            self.comment(self.fresh(root))
+        response = self.client.get(reverse(
+            'posts:comment_thread', args=[self.post.pk, root.pk]))
+        self.assertEqual(response.status_code, 404)
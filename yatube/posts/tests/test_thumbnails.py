@@ -0,0 +1,106 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post, PostImageVariant
+from posts.thumbnails import (generate_thumbnails, ready_thumbnail,
+                              variant_widths)
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def uploaded_gif():
+    return SimpleUploadedFile(name='test.gif', content=SMALL_GIF,
+                              content_type='image/gif')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Ivan')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(ThumbnailTest.user)
+
+    def test_page_shows_original_until_thumbnail_is_ready(self):
+        post = Post.objects.create(text='Текст', author=ThumbnailTest.user,
+                                   image=uploaded_gif())
+        with mock.patch('sorl.thumbnail.base.ThumbnailBackend'
+                        '._create_thumbnail') as create:
+            response = self.client.get(reverse('posts:main_page'))
+        create.assert_not_called()
+        self.assertContains(response, post.image.url)
+
+    def test_page_shows_thumbnail_until_variants_are_ready(self):
+        post = Post.objects.create(text='Текст', author=ThumbnailTest.user,
+                                   image=uploaded_gif())
+        self.client.get(reverse('posts:main_page'))
+        # Само масштабирование здесь не важно, проверяется только то,
+        # что готовая миниатюра подхватывается шаблоном.
+        with mock.patch('sorl.thumbnail.engines.pil_engine.Engine._scale',
+                        lambda engine, image, width, height: image), \
+                mock.patch('posts.thumbnails.generate_variants'):
+            generate_thumbnails(post.pk)
+        thumbnail = ready_thumbnail(post.image, 'card')
+        self.assertNotEqual(thumbnail, post.image)
+        self.assertContains(self.client.get(reverse('posts:main_page')),
+                            f'src="{thumbnail.url}"')
+
+    def test_variants_are_rendered_as_srcset(self):
+        post = Post.objects.create(text='Текст', author=ThumbnailTest.user,
+                                   image=uploaded_gif())
+        with mock.patch('sorl.thumbnail.engines.pil_engine.Engine._scale',
+                        lambda engine, image, width, height: image):
+            generate_thumbnails(post.pk)
+        variants = {(variant.format, variant.width, variant.height)
+                    for variant in post.image_variants.all()}
+        self.assertEqual(variants, {(PostImageVariant.JPEG, 320, 113),
+                                    (PostImageVariant.WEBP, 320, 113)})
+        webp = post.image_variants.get(format=PostImageVariant.WEBP)
+        for name, kwargs in (('posts:main_page', {}),
+                             ('posts:post_detail', {'post_id': post.pk})):
+            with self.subTest(name=name):
+                response = self.client.get(reverse(name, kwargs=kwargs))
+                self.assertContains(response, f'{webp.image.url} 320w')
+                self.assertContains(response, 'width="320" height="113"')
+                self.assertContains(response, 'loading="lazy"')
+
+    def test_variant_widths_do_not_upscale(self):
+        self.assertEqual(variant_widths(800), [320, 640])
+        self.assertEqual(variant_widths(100), [320])
+
+    def test_upload_schedules_thumbnails(self):
+        with mock.patch('posts.views.schedule_thumbnails') as schedule:
+            self.client.post(reverse('posts:post_create'),
+                             data={'text': 'Без картинки'})
+            schedule.assert_not_called()
+            self.client.post(reverse('posts:post_create'),
+                             data={'text': 'С картинкой',
+                                   'image': uploaded_gif()})
+        schedule.assert_called_once_with(Post.objects.get(text='С картинкой'))
@@ -7,8 +7,10 @@ from django.contrib.auth import get_user_model
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django import forms
-from posts.models import Post, Group, Follow
+from posts.models import Comment, Post, Group, Follow
 from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 User = get_user_model()
 
@@ -302,6 +304,7 @@ class PaginatorViewsTest(TestCase):
                 author=cls.user, group=cls.group)
 
     def setUp(self):
+        cache.clear()
         self.authorized_client = Client()
         self.authorized_client.force_login(PaginatorViewsTest.user)
 
@@ -339,3 +342,99 @@ class PaginatorViewsTest(TestCase):
             reverse('posts:profile',
                     kwargs={'username': PaginatorViewsTest.user}) + '?page=2')
         self.assertEqual(len(response.context['page_obj']), 3)
+
+    def test_cursor_pages_cover_all_posts(self):
+        """Курсорные ссылки «Старее»/«Новее» обходят ленту без пропусков."""
+        url = reverse('posts:group_list',
+                      kwargs={'slug': PaginatorViewsTest.group.slug})
+        first = self.authorized_client.get(url).context['page_obj']
+        second = self.authorized_client.get(
+            url + first.paginator.next_link).context['page_obj']
+        self.assertEqual(len(second), 3)
+        self.assertFalse(second.has_next())
+        texts = [post.text for post in list(first) + list(second)]
+        self.assertEqual(len(set(texts)), 13)
+        back = self.authorized_client.get(
+            url + second.paginator.previous_link).context['page_obj']
+        self.assertEqual(list(back), list(first))
+        self.assertFalse(back.has_previous())
+
+    def test_oversized_cursor_falls_back_to_first_page(self):
+        url = reverse('posts:group_list',
+                      kwargs={'slug': PaginatorViewsTest.group.slug})
+        first = self.authorized_client.get(url).context['page_obj']
+        for cursor in ('1000-99999999999999999999999',
+                       f'1000-{2 ** 63}', '9' * 20 + '-1', '1' * 5000):
+            with self.subTest(cursor=cursor):
+                response = self.authorized_client.get(
+                    url, {'after': cursor})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(list(response.context['page_obj']),
+                                 list(first))
+
+    def test_cursor_page_without_count_and_offset(self):
+        cache.clear()
+        url = reverse('posts:group_list',
+                      kwargs={'slug': PaginatorViewsTest.group.slug})
+        first = self.authorized_client.get(url).context['page_obj']
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_client.get(url + first.paginator.next_link)
+        sql = ' '.join(query['sql'] for query in queries).upper()
+        self.assertNotIn('OFFSET', sql)
+        self.assertNotIn('COUNT(', sql)
+
+
+class PostDetailCommentsTest(TestCase):
+    # Пост, его ETag/Last-Modified, страница веток и их первые ответы.
+    MAX_QUERIES = 5
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Ivan')
+        cls.post = Post.objects.create(text='Тестовый текст', author=cls.user)
+        cls.other_post = Post.objects.create(
+            text='Чужой пост', author=cls.user)
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.url = reverse('posts:post_detail',
+                           kwargs={'post_id': PostDetailCommentsTest.post.id})
+
+    def add_comments(self, post, amount):
+        for number in range(amount):
+            author = User.objects.create_user(
+                username=f'reader_{User.objects.count()}')
+            Comment.objects.create(
+                post=post, author=author, text=f'Комментарий {number}')
+
+    def test_only_post_comments_in_context(self):
+        self.add_comments(PostDetailCommentsTest.post, 2)
+        self.add_comments(PostDetailCommentsTest.other_post, 3)
+        response = self.guest_client.get(self.url)
+        comments = response.context['comments']
+        self.assertEqual(len(comments), 2)
+        for comment in comments:
+            self.assertEqual(comment.post_id, PostDetailCommentsTest.post.id)
+
+    def test_queries_do_not_grow_with_comments(self):
+        """Число запросов страницы поста не зависит от числа комментариев."""
+        self.add_comments(PostDetailCommentsTest.post, 1)
+        with CaptureQueriesContext(connection) as few:
+            self.guest_client.get(self.url)
+        self.add_comments(PostDetailCommentsTest.post, 15)
+        with CaptureQueriesContext(connection) as many:
+            self.guest_client.get(self.url)
+        self.assertEqual(len(few), len(many))
+        self.assertLessEqual(len(many), self.MAX_QUERIES)
+
+    def test_show_more_comments(self):
+        self.add_comments(PostDetailCommentsTest.post, 25)
+        response = self.guest_client.get(self.url)
+        first = response.context['comments']
+        self.assertEqual(len(first), 20)
+        self.assertTrue(first.has_next())
+        more = self.guest_client.get(
+            self.url + first.paginator.next_link).context['comments']
+        self.assertEqual(len(more), 5)
+        self.assertEqual(more[0].text, 'Комментарий 20')
@@ -0,0 +1,151 @@
+"""Ветки комментариев: материализованный путь и счётчики ответов.
+
+Путь комментария — id всех его предков и его самого, каждый в SEGMENT
+цифр с ведущими нулями, поэтому сортировка по path даёт обход дерева в
+глубину, а поддерево — диапазон path одного индекса. У ответа есть
+thread — корень ветки — и position — его порядковый номер в ветке, так
+что первые ответы страницы веток выбираются одним запросом по индексу
+(thread, position). Номер только растёт: удалённые ответы его не
+освобождают. replies_count каждого комментария — число всех его
+потомков; он сдвигается при записи и удалении ответов.
+"""
+from django.db.models import F, Max, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment
+
+SEGMENT: int = 10
+MAX_DEPTH: int = 6
+SHOWN_REPLIES: int = 5
+SUBTREE_LIMIT: int = 500
+# Символ после всех цифр: верхняя граница диапазона путей поддерева.
+PATH_END = '~'
+
+
+def segment(pk):
+    return f'{pk:0{SEGMENT}d}'
+
+
+def ancestor_ids(path):
+    """id предков комментария с путём path, от корня, без него самого."""
+    return [int(path[start:start + SEGMENT])
+            for start in range(0, len(path) - SEGMENT, SEGMENT)]
+
+
+def require_path(comment):
+    if not comment.path:
+        raise ValueError(f'У комментария {comment.pk} не заполнен путь')
+
+
+def fill_root_paths(batch_size=1000):
+    """Пишет пути корней, созданных bulk_create без сигналов.
+
+    Возвращает число исправленных комментариев.
+    """
+    filled = 0
+    while True:
+        comments = list(Comment.objects.filter(
+            path='', parent__isnull=True).order_by('pk').only('pk')[
+            :batch_size])
+        if not comments:
+            return filled
+        for comment in comments:
+            comment.path = segment(comment.pk)
+        Comment.objects.bulk_update(comments, ['path'])
+        filled += len(comments)
+
+
+def place(comment):
+    """Заполняет глубину и ветку нового комментария до записи.
+
+    Ответ на комментарий предельной глубины становится ответом его
+    родителю, чтобы ветка не уходила глубже MAX_DEPTH уровней.
+    """
+    parent = comment.parent
+    if parent is None:
+        comment.depth = 0
+        comment.thread_id = None
+        return
+    require_path(parent)
+    if parent.depth >= MAX_DEPTH - 1:
+        parent = comment.parent = parent.parent
+    comment.depth = parent.depth + 1
+    comment.thread_id = parent.thread_id or parent.pk
+    comment.parent_path = parent.path
+
+
+def attach(comment):
+    """Пишет путь нового комментария и сдвигает счётчики его предков.
+
+    Номер в ветке — следующий после наибольшего в ней. Корень ветки уже
+    заблокирован сдвигом счётчиков, так что параллельный ответ в ту же
+    ветку дождётся коммита и возьмёт номер дальше.
+    """
+    comment.path = getattr(comment, 'parent_path', '') + segment(comment.pk)
+    ancestors = ancestor_ids(comment.path)
+    updates = {'path': comment.path}
+    if ancestors:
+        Comment.objects.filter(pk__in=ancestors).update(
+            replies_count=F('replies_count') + 1)
+        last = Comment.objects.filter(thread_id=comment.thread_id).order_by(
+        ).values('thread_id').annotate(last=Max('position')).values('last')
+        updates['position'] = Coalesce(Subquery(last), 0) + 1
+    Comment.objects.filter(pk=comment.pk).update(**updates)
+    if ancestors:
+        comment.position = Comment.objects.filter(
+            pk=comment.pk).values_list('position', flat=True).get()
+
+
+def detach(comment):
+    """Уменьшает счётчики предков удалённого комментария.
+
+    При удалении поддерева сигнал приходит для каждого его комментария,
+    так что каждый выживший предок уменьшается на размер поддерева.
+    """
+    ancestors = ancestor_ids(comment.path)
+    if ancestors:
+        Comment.objects.filter(pk__in=ancestors).update(
+            replies_count=Greatest(F('replies_count') - 1, 0))
+
+
+def subtree(comment):
+    """Комментарий и все его ответы в порядке обхода дерева."""
+    require_path(comment)
+    return Comment.objects.filter(
+        post_id=comment.post_id, path__gte=comment.path,
+        path__lt=comment.path + PATH_END).select_related(
+        'author').order_by('path')[:SUBTREE_LIMIT]
+
+
+def collapse(comments, top_depth=0):
+    """Отступ и число скрытых ответов для комментариев в порядке path.
+
+    Скрытые ответы — те из replies_count, которых нет среди comments.
+    """
+    shown = {comment.pk: comment for comment in comments}
+    for comment in comments:
+        comment.indent = comment.depth - top_depth
+        comment.hidden_replies = comment.replies_count
+    for comment in comments:
+        for pk in ancestor_ids(comment.path):
+            if pk in shown:
+                shown[pk].hidden_replies -= 1
+    return comments
+
+
+def with_replies(roots, shown=SHOWN_REPLIES):
+    """Корни страницы, у каждого в .replies первые shown ответов ветки.
+
+    Ответы всех веток страницы выбираются одним запросом.
+    """
+    roots = list(roots)
+    replies = {root.pk: [] for root in roots}
+    if roots:
+        for reply in Comment.objects.filter(
+                thread_id__in=list(replies),
+                position__lte=shown).select_related('author').order_by(
+                'path'):
+            replies[reply.thread_id].append(reply)
+    for root in roots:
+        root.replies = collapse([root] + replies[root.pk])[1:]
+    return roots
@@ -0,0 +1,106 @@
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from PIL import Image, ImageOps
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+from core.jobs import enqueue
+from core.timing import timed
+
+from .caching import invalidate, post_tags
+from .models import Post, PostImageVariant
+
+# Все размеры, в которых шаблоны показывают картинку поста.
+GEOMETRIES = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+
+# Ширины вариантов для srcset; высота следует пропорциям карточки.
+VARIANT_WIDTHS = (320, 640, 960)
+VARIANT_RATIO = 339 / 960
+VARIANT_QUALITY = {PostImageVariant.JPEG: 82, PostImageVariant.WEBP: 78}
+
+
+class ReadyThumbnailBackend(ThumbnailBackend):
+    """Ищет готовую миниатюру в хранилище ключей sorl, не создавая её."""
+
+    def lookup(self, file_, geometry_string, **options):
+        source = ImageFile(file_)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return default.kvstore.get(ImageFile(name, default.storage))
+
+
+ready_backend = ReadyThumbnailBackend()
+
+
+@timed('thumbnail')
+def ready_thumbnail(image, size):
+    """Готовая миниатюра или сама картинка, если миниатюры ещё нет."""
+    if not image:
+        return None
+    geometry, options = GEOMETRIES[size]
+    return ready_backend.lookup(image, geometry, **options) or image
+
+
+def variant_widths(source_width):
+    """Ширины не больше исходной; самая узкая есть всегда."""
+    return [width for width in VARIANT_WIDTHS
+            if width <= source_width] or [VARIANT_WIDTHS[0]]
+
+
+def encode(image, image_format):
+    buffer = BytesIO()
+    image.save(buffer, image_format.upper(),
+               quality=VARIANT_QUALITY[image_format], optimize=True)
+    return buffer.getvalue()
+
+
+def generate_variants(post):
+    """Пересоздаёт JPEG- и WebP-варианты картинки поста всех ширин."""
+    for variant in post.image_variants.all():
+        variant.image.delete(save=False)
+    post.image_variants.all().delete()
+    with post.image.open('rb') as file:
+        source = ImageOps.exif_transpose(Image.open(file)).convert('RGB')
+    variants = []
+    for width in variant_widths(source.width):
+        size = (width, round(width * VARIANT_RATIO))
+        resized = ImageOps.fit(source, size, Image.LANCZOS)
+        for image_format, _ in PostImageVariant.FORMATS:
+            variant = PostImageVariant(post=post, format=image_format)
+            variant.image.save(
+                f'{post.pk}_{width}.{image_format}',
+                ContentFile(encode(resized, image_format)), save=False)
+            variants.append(variant)
+    PostImageVariant.objects.bulk_create(variants)
+
+
+def generate_thumbnails(post_id):
+    post = Post.objects.select_related('author', 'group').filter(
+        pk=post_id).first()
+    if post is None or not post.image:
+        return
+    generate_variants(post)
+    for geometry, options in GEOMETRIES.values():
+        get_thumbnail(post.image, geometry, **options)
+    # Карточки в кэше лент адресуются датой изменения поста.
+    Post.objects.filter(pk=post.pk).update(updated=timezone.now())
+    invalidate(post_tags(post))
+
+
+def schedule_thumbnails(post):
+    """Ставит подготовку миниатюр в очередь фоновых задач."""
+    enqueue('posts.generate_thumbnails', post.pk)
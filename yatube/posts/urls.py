@@ -13,7 +13,15 @@ urlpatterns = [
          name='post_edit'),
     path('posts/<int:post_id>/comment/',
          views.add_comment, name='add_comment'),
+    path('posts/<int:post_id>/comments/<int:comment_id>/',
+         views.comment_thread, name='comment_thread'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('search/', views.search, name='search'),
+    path('feed/<str:kind>/', views.site_feed, name='site_feed'),
+    path('group/<slug:slug>/feed/<str:kind>/', views.group_feed,
+         name='group_feed'),
+    path('profile/<str:username>/feed/<str:kind>/', views.author_feed,
+         name='author_feed'),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
@@ -1,8 +1,221 @@
-from django.core.paginator import Paginator
+import calendar
+import datetime
+import hashlib
+import re
 
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.functional import cached_property
 
-def pages_per_page(request, objects, amount_per_page):
-    paginator = Paginator(objects, amount_per_page)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    return page_obj
+CURSOR_RE = re.compile(r'^(\d{1,20})-(\d{1,19})$')
+PK_CURSOR_RE = re.compile(r'^\d{1,19}$')
+# Ключи больше bigint база не примет, и запрос упадёт вместо пустой страницы.
+MAX_PK: int = 2 ** 63 - 1
+LEGACY_PAGES: int = 10
+EXACT_COUNT_LIMIT: int = 10000
+COUNT_CACHE_TIMEOUT: int = 60 * 5
+
+
+def encode_cursor(moment, pk):
+    micro = calendar.timegm(moment.utctimetuple()) * 10 ** 6
+    return f'{micro + moment.microsecond}-{pk}'
+
+
+def decode_cursor(cursor):
+    match = CURSOR_RE.match(cursor or '')
+    if match is None:
+        return None
+    micro, pk = map(int, match.groups())
+    if pk > MAX_PK:
+        return None
+    try:
+        moment = datetime.datetime.fromtimestamp(
+            micro // 10 ** 6, tz=timezone.utc)
+    except (OverflowError, OSError, ValueError):
+        return None
+    return moment.replace(microsecond=micro % 10 ** 6), pk
+
+
+def decode_pk(cursor):
+    """Курсор из одного первичного ключа или None."""
+    if not PK_CURSOR_RE.match(cursor or ''):
+        return None
+    pk = int(cursor)
+    return pk if pk <= MAX_PK else None
+
+
+def keyset(queryset, keys, values=None, descending=True):
+    """Сортирует queryset по паре ключей (или одному уникальному) и
+    отбрасывает всё до values."""
+    queryset = queryset.order_by(*(f'-{key}' if descending else key
+                                   for key in keys))
+    if values is None:
+        return queryset
+    lookup = 'lt' if descending else 'gt'
+    first = keys[0]
+    condition = Q(**{f'{first}__{lookup}': values[0]})
+    if len(keys) > 1:
+        condition |= Q(**{first: values[0], f'{keys[1]}__{lookup}': values[1]})
+    return queryset.filter(condition)
+
+
+class CursorPaginator(Paginator):
+    """Постраничный вывод по ключу (дата, id) без COUNT и OFFSET.
+
+    Ссылки строятся на курсоры ?after=/?before=, старые адреса ?page=N
+    продолжают работать для первых LEGACY_PAGES страниц.
+    """
+
+    def __init__(self, object_list, per_page, keys=('pub_date', 'id'),
+                 newest_first=True, prefix=''):
+        super().__init__(object_list, per_page)
+        self.keys = keys
+        self.newest_first = newest_first
+        self.prefix = prefix
+        self.number = 1
+        self.has_more = False
+        self.next_cursor = None
+        self.previous_cursor = None
+        self.query = None
+
+    @property
+    def num_pages(self):
+        return self.number + 1 if self.has_more else self.number
+
+    @property
+    def page_range(self):
+        return range(1, self.num_pages + 1)
+
+    def fetch(self, values, forward, limit, offset=0):
+        descending = self.newest_first == forward
+        queryset = keyset(self.object_list, self.keys, values, descending)
+        return list(queryset[offset:offset + limit])
+
+    def cursor(self, obj):
+        first, second = (getattr(obj, key) for key in self.keys)
+        return encode_cursor(first, second)
+
+    def decode(self, cursor):
+        return decode_cursor(cursor)
+
+    def link(self, **cursors):
+        query = self.query.copy()
+        for name, value in cursors.items():
+            query[self.prefix + name] = value
+        return '?' + query.urlencode()
+
+    @property
+    def first_link(self):
+        return self.link()
+
+    @property
+    def next_link(self):
+        return self.link(after=self.next_cursor)
+
+    @property
+    def previous_link(self):
+        return self.link(before=self.previous_cursor)
+
+    def get_page(self, request):
+        params = request.GET
+        self.query = params.copy()
+        for name in ('page', 'after', 'before'):
+            self.query.pop(self.prefix + name, None)
+        after = self.decode(params.get(self.prefix + 'after'))
+        before = self.decode(params.get(self.prefix + 'before'))
+        if after is not None:
+            rows = self.fetch(after, True, self.per_page + 1)
+            if rows:
+                return self.build(rows, 2)
+            return self.last_page()
+        if before is not None:
+            rows = self.fetch(before, False, self.per_page + 1)
+            if len(rows) > self.per_page:
+                return self.build(rows[:self.per_page][::-1], 2, True)
+            return self.first_page()
+        number = params.get(self.prefix + 'page')
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            number = 1
+        if not 1 < number <= LEGACY_PAGES:
+            return self.first_page()
+        rows = self.fetch(None, True, self.per_page + 1,
+                          offset=(number - 1) * self.per_page)
+        if not rows:
+            return self.first_page()
+        return self.build(rows, number)
+
+    def first_page(self):
+        return self.build(self.fetch(None, True, self.per_page + 1), 1)
+
+    def last_page(self):
+        rows = self.fetch(None, False, self.per_page + 1)
+        number = 2 if len(rows) > self.per_page else 1
+        return self.build(rows[:self.per_page][::-1], number, False)
+
+    def build(self, rows, number, has_more=None):
+        if has_more is None:
+            has_more = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+        self.number = number
+        self.has_more = has_more
+        if rows:
+            self.previous_cursor = self.cursor(rows[0])
+            self.next_cursor = self.cursor(rows[-1])
+        return Page(rows, number, self)
+
+
+def pk_batches(queryset, size):
+    """Идёт по queryset пачками первичных ключей, без OFFSET."""
+    last_pk = 0
+    while True:
+        ids = list(queryset.filter(pk__gt=last_pk).order_by('pk')
+                   .values_list('pk', flat=True)[:size])
+        if not ids:
+            return
+        yield ids
+        last_pk = ids[-1]
+
+
+def pages_per_page(request, objects, amount_per_page, **options):
+    paginator = CursorPaginator(objects, amount_per_page, **options)
+    return paginator.get_page(request)
+
+
+def planner_estimate(queryset):
+    """Оценка числа строк таблицы из статистики PostgreSQL или None."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql' or queryset.query.where:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+            [queryset.model._meta.db_table])
+        row = cursor.fetchone()
+    return int(row[0]) if row and row[0] > EXACT_COUNT_LIMIT else None
+
+
+def estimated_count(queryset):
+    """Число строк queryset без COUNT(*) по большой таблице на каждый вызов.
+
+    Для таблицы без фильтров берётся оценка планировщика, остальные числа
+    считаются точно и кэшируются на COUNT_CACHE_TIMEOUT по тексту запроса.
+    """
+    estimate = planner_estimate(queryset)
+    if estimate is not None:
+        return estimate
+    sql = str(queryset.order_by().query)
+    key = f'count:{hashlib.md5(sql.encode()).hexdigest()}'
+    return cache.get_or_set(key, queryset.count, COUNT_CACHE_TIMEOUT)
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator, у которого count — оценка из estimated_count()."""
+
+    @cached_property
+    def count(self):
+        return estimated_count(self.object_list)
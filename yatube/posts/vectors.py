@@ -0,0 +1,33 @@
+"""Общие операции над разреженными матрицами SciPy."""
+import numpy as np
+from scipy import sparse
+
+
+def normalize_rows(matrix):
+    """Строки матрицы, приведённые к единичной длине."""
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)))
+    norms = norms.ravel()
+    norms[norms == 0] = 1
+    return (sparse.diags(1 / norms) @ matrix).tocsr()
+
+
+def without(scores, mask):
+    """scores с обнулёнными позициями ненулевых элементов mask."""
+    scores = (scores - scores.multiply(mask.astype(bool))).tocsr()
+    scores.eliminate_zeros()
+    return scores
+
+
+def top_k(scores, row, top):
+    """Столбцы и значения top наибольших элементов строки CSR-матрицы.
+
+    Равные значения упорядочиваются по номеру столбца.
+    """
+    start, end = scores.indptr[row], scores.indptr[row + 1]
+    data, columns = scores.data[start:end], scores.indices[start:end]
+    if len(data) > top:
+        chosen = np.argpartition(-data, top)[:top]
+    else:
+        chosen = np.arange(len(data))
+    order = chosen[np.lexsort((columns[chosen], -data[chosen]))]
+    return columns[order], data[order]
@@ -1,75 +1,117 @@
+from django.http import Http404
 from django.shortcuts import render, get_object_or_404, redirect
-from .models import Post, Group, User, Comment, Follow
+from django.urls import reverse
+from .models import Comment, Post, Group, User, Follow, RelatedPost
 from django.contrib.auth.decorators import login_required
+from core.queries import query_budget
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_cookie
 from .forms import CommentForm, PostForm
-from django.views.decorators.cache import cache_page
-from django.core.cache import cache
+from .caching import (cache_tagged_page, follow_tags, group_tags,
+                      index_tags, post_etag, post_last_modified,
+                      profile_tags)
+from .feed import follow_feed_page
+from .hits import record_view, view_count
+from .recommendations import recommended_authors
+from .search import search_page
+from .syndication import FORMATS, feed_response
+from .threads import collapse, subtree, with_replies
+from .thumbnails import schedule_thumbnails
 from .utils import pages_per_page
 
 POST_PER_PAGE: int = 10
+SEARCH_PER_PAGE: int = 20
+COMMENTS_PER_PAGE: int = 20
 
 
-@cache_page(20 * 1, key_prefix='index_page')
+@query_budget(6)
+@cache_tagged_page(index_tags)
 def index(request):
     template = 'posts/index.html'
-    post_list = Post.objects.all()
+    post_list = Post.objects.select_related(
+        'author', 'group').prefetch_related('image_variants')
     context = {
         'page_obj': pages_per_page(request, post_list, POST_PER_PAGE)
     }
     return render(request, template, context)
 
 
+@query_budget(7)
+@cache_tagged_page(group_tags)
 def group_posts(request, slug):
     template = 'posts/group_list.html'
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.select_related('group').all()
+    posts = group.posts.select_related('author', 'group').prefetch_related(
+        'image_variants')
     context = {'group': group,
                'page_obj': pages_per_page(request, posts, POST_PER_PAGE)
                }
     return render(request, template, context)
 
 
+@query_budget(10)
+@cache_tagged_page(profile_tags)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.select_related('author').all()
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username)
+    posts = author.posts.select_related('author', 'group').prefetch_related(
+        'image_variants')
     following = request.user.is_authenticated and Follow.objects.filter(
         user=request.user, author=author).exists()
     context = {
         'author': author,
         'page_obj': pages_per_page(request, posts, POST_PER_PAGE),
-        'following': following
+        'following': following,
+        'recommended': recommended_authors(request.user,
+                                           exclude={author.pk}),
     }
     template = 'posts/profile.html'
     return render(request, template, context)
 
 
+@query_budget(9)
+@vary_on_cookie
+@condition(etag_func=post_etag, last_modified_func=post_last_modified)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), pk=post_id)
+    record_view(request, post.pk)
     form = CommentForm()
-    comments_all = Comment.objects.all()
+    threads = post.comments.filter(parent=None).select_related(
+        'author').order_by('created', 'id')
+    comments = pages_per_page(
+        request, threads, COMMENTS_PER_PAGE, keys=('created', 'id'),
+        newest_first=False, prefix='comments_')
+    with_replies(comments.object_list)
     context = {
         'post': post,
+        'views': view_count(post),
         'form': form,
-        'comments': comments_all
+        'comments': comments,
+        'related_posts': RelatedPost.objects.filter(post=post).select_related(
+            'related__author').order_by('rank'),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@query_budget(15, duplicates=2)
 @login_required
 def post_create(request):
-    cache.clear()
     is_edit = False
     form = PostForm(request.POST or None, files=request.FILES or None)
     if form.is_valid():
-        form = form.save(commit=False)
-        form.author = request.user
-        form.save()
+        post = form.save(commit=False)
+        post.author = request.user
+        post.save()
+        if post.image:
+            schedule_thumbnails(post)
         return redirect('posts:profile', username=request.user.username)
     return render(request, 'posts/create_post.html', {'form': form,
                   'is_edit': is_edit}
                   )
 
 
+@query_budget(15, duplicates=3)
 @login_required
 def post_edit(request, post_id):
     is_edit = True
@@ -80,33 +122,54 @@ def post_edit(request, post_id):
                     instance=post)
     if form.is_valid():
         form.save()
+        if 'image' in form.changed_data and post.image:
+            schedule_thumbnails(post)
         return redirect('posts:post_detail', post_id=post_id)
     return render(request, 'posts/create_post.html', {'form': form,
                   'is_edit': is_edit, 'post_id': post.pk, 'post': post}
                   )
 
 
+@query_budget(5)
+def comment_thread(request, post_id, comment_id):
+    comment = get_object_or_404(
+        Comment.objects.select_related('post__author').exclude(path=''),
+        pk=comment_id, post_id=post_id)
+    context = {
+        'post': comment.post,
+        'comment': comment,
+        'comments': collapse(list(subtree(comment)), comment.depth),
+        'form': CommentForm(initial={'parent': comment.pk}),
+    }
+    return render(request, 'posts/comment_thread.html', context)
+
+
+@query_budget(15)
 @login_required
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
-    form = CommentForm(request.POST or None)
+    form = CommentForm(request.POST or None, post=post)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
         comment.save()
+        if comment.parent_id:
+            return redirect('posts:comment_thread', post_id=post_id,
+                            comment_id=comment.parent_id)
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@query_budget(10)
 @login_required
+@cache_tagged_page(follow_tags)
 def follow_index(request):
-    followings_posts = Post.objects.filter(
-        author__following__user=request.user)
-    context = {'page_obj': pages_per_page(
-        request, followings_posts, POST_PER_PAGE)}
+    context = {'page_obj': follow_feed_page(request, POST_PER_PAGE),
+               'recommended': recommended_authors(request.user)}
     return render(request, 'posts/follow.html', context)
 
 
+@query_budget(15, duplicates=2)
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
@@ -121,6 +184,7 @@ def profile_follow(request, username):
     return redirect('posts:profile', username=username)
 
 
+@query_budget(15, duplicates=2)
 @login_required
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
@@ -129,3 +193,49 @@ def profile_unfollow(request, username):
     if following.exists():
         following.delete()
     return redirect('posts:profile', username=username)
+
+
+@query_budget(6)
+def search(request):
+    template = 'posts/search.html'
+    query, page_obj = search_page(request, SEARCH_PER_PAGE)
+    context = {'query': query, 'page_obj': page_obj}
+    return render(request, template, context)
+
+
+def site_feed(request, kind):
+    if kind not in FORMATS:
+        raise Http404
+
+    def describe():
+        return ('Yatube: последние записи', reverse('posts:main_page'),
+                'Новые записи всех авторов', Post.objects.all())
+    return feed_response(request, kind, index_tags(request), describe)
+
+
+def group_feed(request, slug, kind):
+    if kind not in FORMATS:
+        raise Http404
+
+    def describe():
+        group = Group.objects.filter(slug=slug).first()
+        if group is None:
+            return None
+        return (f'Yatube: {group.title}',
+                reverse('posts:group_list', args=[slug]),
+                group.description, group.posts.all())
+    return feed_response(request, kind, group_tags(request, slug), describe)
+
+
+def author_feed(request, username, kind):
+    if kind not in FORMATS:
+        raise Http404
+
+    def describe():
+        author = User.objects.filter(username=username).first()
+        if author is None:
+            return None
+        name = author.get_full_name() or author.username
+        return (f'Yatube: {name}', reverse('posts:profile', args=[username]),
+                f'Записи автора {name}', author.posts.all())
+    return feed_response(request, kind, [f'author:{username}'], describe)
@@ -1,6 +1,8 @@
-from django.contrib.auth.forms import UserCreationForm
+from django.contrib.auth.forms import PasswordResetForm, UserCreationForm
 from django.contrib.auth import get_user_model
 
+from core.jobs import enqueue
+
 
 User = get_user_model()
 
@@ -9,3 +11,21 @@ class CreationForm(UserCreationForm):
     class Meta(UserCreationForm.Meta):
         model = User
         fields = ('first_name', 'last_name', 'username', 'email')
+
+
+class QueuedPasswordResetForm(PasswordResetForm):
+    """Письмо со ссылкой сброса собирает и отправляет фоновая задача.
+
+    В очередь кладётся только id пользователя и адрес сайта: токен
+    сброса появляется в исполнителе и в строке задачи не хранится.
+    """
+
+    def send_mail(self, subject_template_name, email_template_name,
+                  context, from_email, to_email,
+                  html_email_template_name=None):
+        site = {name: context[name]
+                for name in ('domain', 'site_name', 'protocol')}
+        templates = [subject_template_name, email_template_name,
+                     html_email_template_name]
+        enqueue('users.send_password_reset', context['user'].pk, to_email,
+                site, templates, from_email)
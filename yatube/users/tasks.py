@@ -0,0 +1,33 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.core.mail import EmailMultiAlternatives
+from django.template import loader
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from core.jobs import task
+
+User = get_user_model()
+
+
+@task('users.send_password_reset', priority=5, max_attempts=5)
+def send_password_reset(user_id, to_email, site, templates, from_email):
+    subject_template, body_template, html_template = templates
+    user = User.objects.filter(pk=user_id, is_active=True).first()
+    if user is None:
+        return
+    context = {
+        **site,
+        'email': to_email,
+        'user': user,
+        'uid': urlsafe_base64_encode(force_bytes(user.pk)),
+        'token': default_token_generator.make_token(user),
+    }
+    subject = ''.join(
+        loader.render_to_string(subject_template, context).splitlines())
+    body = loader.render_to_string(body_template, context)
+    message = EmailMultiAlternatives(subject, body, from_email, [to_email])
+    if html_template is not None:
+        message.attach_alternative(
+            loader.render_to_string(html_template, context), 'text/html')
+    message.send()
@@ -33,6 +33,7 @@ ALLOWED_HOSTS = [
 INSTALLED_APPS = [
     'debug_toolbar',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'core.apps.CoreConfig',
     'posts.apps.PostsConfig',
     'users.apps.UsersConfig',
@@ -46,6 +47,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ServerTimingMiddleware',
+    'core.middleware.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -57,6 +60,9 @@ MIDDLEWARE = [
 ]
 
 ROOT_URLCONF = 'yatube.urls'
+
+TEST_RUNNER = 'core.testing.TestRunner'
+
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
 TEMPLATES = [
@@ -135,13 +141,87 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 STATIC_ROOT = os.path.join(BASE_DIR, 'assets')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+# Профиль кэша: local — свой LocMemCache в каждом процессе; file, memcached
+# и redis — общий для всех воркеров кэш с локальным LRU-уровнем перед ним.
+# Для memcached и redis нужны pylibmc и django-redis: requirements-cache.txt.
+CACHE_PROFILE = os.getenv('YATUBE_CACHE_PROFILE', 'local')
+CACHE_LOCATION = os.getenv('YATUBE_CACHE_LOCATION')
+SHARED_CACHES = {
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': CACHE_LOCATION or os.path.join(BASE_DIR, 'cache'),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'memcached': {
+        'BACKEND': 'django.core.cache.backends.memcached.PyLibMCCache',
+        'LOCATION': CACHE_LOCATION or '127.0.0.1:11211',
+    },
+    'redis': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': CACHE_LOCATION or 'redis://127.0.0.1:6379/1',
+    },
 }
+if CACHE_PROFILE in SHARED_CACHES:
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.TwoTierCache',
+            'LOCATION': 'shared',
+            'OPTIONS': {
+                'LOCAL_TIMEOUT': 2,
+                'LOCAL_MAX_ENTRIES': 1000,
+                'LOCAL_PREFIXES': ('tag:', 'page:index:', 'user:'),
+            },
+        },
+        'shared': SHARED_CACHES[CACHE_PROFILE],
+    }
+    # Сброс копии пользователя виден всем воркерам только в общем кэше.
+    AUTHENTICATION_BACKENDS = ['core.backends.CachedModelBackend']
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+    AUTHENTICATION_BACKENDS = ['django.contrib.auth.backends.ModelBackend']
 INTERNAL_IPS = [
     '127.0.0.1',
     'www.mycoolblog.pythonanywhere.com',
     'mycoolblog.pythonanywhere.com',
 ]
+# Лента подписок: записи раскладываются по «почтовым ящикам» подписчиков
+# при публикации; у авторов с числом подписчиков больше FEED_FANOUT_LIMIT
+# посты подмешиваются при чтении. Когда автор опускается до предела, его
+# последние FEED_BACKFILL_SIZE постов раскладываются по ящикам задачей.
+FEED_INBOX_ENABLED = True
+FEED_FANOUT_LIMIT = 5000
+FEED_BACKFILL_SIZE = 200
+# Просмотры постов копятся в памяти процесса и пишутся в базу раз в
+# VIEW_FLUSH_INTERVAL секунд или при VIEW_FLUSH_SIZE разных постах в
+# буфере; повтор той же сессией за VIEW_DEDUP_TIMEOUT секунд не считается.
+# VIEW_FLUSH_BACKGROUND — сбрасывать по времени и без новых просмотров.
+VIEW_FLUSH_BACKGROUND = True
+VIEW_FLUSH_INTERVAL = 10
+VIEW_FLUSH_SIZE = 500
+VIEW_DEDUP_TIMEOUT = 60 * 30
+# Фоновые задачи (миниатюры, письма, массовые действия админки) лежат в
+# таблице core_job и исполняются командой run_jobs. Задача, которую
+# исполнитель держит дольше JOB_LOCK_TIMEOUT секунд, возвращается в
+# очередь; повтор после ошибки — через JOB_RETRY_DELAY * 2^(попытка - 1).
+JOB_LOCK_TIMEOUT = 60 * 10
+JOB_RETRY_DELAY = 30
+JOB_KEEP_DAYS = 7
+# Периодические задачи: имя задачи — интервал между запусками в секундах.
+JOB_SCHEDULE = {
+    'posts.refresh_recommendations': 60 * 60,
+    'posts.refresh_related_posts': 60 * 15,
+    'core.purge_jobs': 60 * 60 * 24,
+}
+# Учёт SQL-запросов каждой страницы: заголовки X-Query-* и проверка
+# бюджетов из @query_budget. 'warn' — предупреждение в лог core.queries,
+# 'raise' — исключение (для тестов и разработки).
+QUERY_STATS_HEADERS = True
+QUERY_BUDGET_ACTION = os.getenv('YATUBE_QUERY_BUDGET_ACTION', 'warn')
+# Доля запросов, для которых время раскладывается по фазам в заголовок
+# Server-Timing и лог core.timing.
+SERVER_TIMING_SAMPLE_RATE = float(
+    os.getenv('YATUBE_SERVER_TIMING_SAMPLE_RATE', '0.05'))